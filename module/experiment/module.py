@@ -20,6 +20,21 @@ line='****************************************************************'
 
 cache_data={}
 
+get_cache=None # LRU cache of contributions of entries to tables in "get" (hash of input -> entry UID -> contribution)
+
+points_cache=None # LRU cache of manifests of points of entries (path -> manifest validated by mtime of entry directory)
+
+features_index_dir='features_index' # index of points by digest of flat features (inside entry)
+
+point_sidecars=['stats', 'summary', 'samples'] # internal json files of points (not returned by "load_point")
+
+# Keys of "add" input recorded to journal (to record points later by "compact")
+journal_keys=['search_point_by_features', 'features_keys_to_process', 'ignore_update', 'sort_keys',
+              'skip_flatten', 'skip_stat_analysis', 'batch_stat_analysis', 'kde_mode', 'sample_store', 'sample_store_exp_refresh',
+              'process_multi_keys', 'record_all_subpoints', 'max_range_percent_threshold',
+              'record_desc_at_each_point', 'record_deps_at_each_point', 'skip_record_pipeline',
+              'skip_record_desc', 'record_permanent']
+
 ##############################################################################
 # Initialize module
 
@@ -114,6 +129,27 @@ def add(i):
               (skip_flatten)                - if 'yes', skip flattening and analyzing data (including stat analysis) ...
 
               (skip_stat_analysis)          - if 'yes', just flatten array and add #min
+              (batch_stat_analysis)         - if 'no', process characteristics_list one by one
+                                              (by default, process all of them at once via NumPy if available)
+              (kde_mode)                    - KDE mode to calculate expected values: 'exact' (default), 'binned' or 'fft'
+                                              (see "math.variation analyze")
+
+              (lock_timeout)                - max time in seconds to wait for locked entry (lock_timeout from module meta by default)
+              (lock_queue)                  - if 'yes', wait in a local FIFO queue of writers to the same entry (tickets held via flock)
+                                              before trying to lock entry (lock_queue from module meta by default)
+
+              (journal)                     - if 'yes', append points to journal of this writer (process) in the entry
+                                              without locking entry and without stat analysis,
+                                              they will be recorded later by "compact" (or when reading entry by "get" with compact_journals=yes)
+                                              (journal from module meta by default)
+
+              (sample_store)                - if 'yes', keep all values (#all, #all_unique) of numerical keys
+                                              in append-only binary file ckp-<uid>.samples.bin instead of flat json
+                                              (sample_store from module meta by default, always used if point already has it)
+              (sample_store_exp_refresh)    - new values are appended to sample store of a point without loading recorded ones
+                                              and expected values are recalculated only when the number of values grew
+                                              by this fraction since the last calculation (sample_store_exp_refresh from module meta
+                                              by default, 0 - at each add)
 
               (process_multi_keys)          - list of keys (starts with) to perform stat analysis on flat array,
                                               by default ['##characteristics#*', '##features#*' '##choices#*'],
@@ -143,7 +179,9 @@ def add(i):
               (error)       - error text if return > 0
 
               update_dict   - dict after updating entry
-              dict_flat     - flat dict with stat analysis (if performed)
+              dict_flat     - flat dict with stat analysis (if performed);
+                              if new values were appended to sample store of a point (see sample_store_exp_refresh),
+                              #all and #all_unique of keys in sample store have only these values
               stat_analysis - whole output of stat analysis (with warnings)
 
               flat_features - flat dict of real features of the recorded point (can be later used to search the same points)
@@ -153,6 +191,9 @@ def add(i):
               sub_point     - recorded subpoint
 
               elapsed_time  - elapsed time (useful for debugging - to speed up processing of "big data" ;) )
+              lock_wait_time - time spent waiting for locked entry (seconds)
+
+              (journal)     - if journal='yes', path to journal with recorded point (point is empty in such case)
             }
 
     """
@@ -162,56 +203,89 @@ def add(i):
 
     start_time = time.time()
 
-    o=i.get('out','')
+    ii=copy.copy(i)
+    ii['dicts']=[i.get('dict',{})]
+    if 'dict' in ii: del(ii['dict'])
 
-    oo=''
-    if o=='con': oo=o
+    r=add_batch(ii)
+    if r['return']>0: return r
 
-    ssa=i.get('skip_stat_analysis','')
+    rp=r['points'][0]
 
-    srp=i.get('skip_record_pipeline','')
-    srd=i.get('skip_record_desc','')
+    et=time.time() - start_time
 
-    dd=i.get('dict',{})
-    ddx=copy.deepcopy(dd) # To avoid changing original input !!! 
+    rr={'return':0, 'elapsed_time':str(et), 
+                        'lock_wait_time':r['lock_wait_time'],
+                        'update_dict':r['update_dict'], 
+                        'dict_flat':rp['dict_flat'], 
+                        'stat_analysis':rp['stat_analysis'], 
+                        'flat_features':rp['flat_features'],
+                        'recorded_uid':r['recorded_uid'],
+                        'point':rp['point'],
+                        'sub_point':rp['sub_point']}
+
+    if 'journal' in r: rr['journal']=r['journal']
 
-    ddd=ddx.get('dict','')
-    if ddd=='': ddd={}
+    return rr
 
-    dddc=dd.get('dict_to_compare', {})
+##############################################################################
+# process and add multiple experiments (points) to the same entry at once
 
-    meta=ddx.get('meta','')
-    if meta=='': meta={}
+def add_batch(i):
+    """
 
-    tags=ddx.get('tags','')
-    if tags=='': tags=[]
+    Input:  {
+              dicts                         - list of dicts in format of "add" (all points should belong to the same entry,
+                                              meta, tags and pipeline of the entry are taken from the first dict where present)
 
-    ft=ddx.get('features', {})
-    choices=ddx.get('choices', {})
-    choices_order=ddx.get('choices_order', [])
+              (all other keys from "add")
+            }
 
-    ddeps=ddx.get('dependencies',{})
+    Output: {
+              return          - return code =  0, if successful
+                                            >  0, if error
+              (error)         - error text if return > 0
 
-    ch=ddx.get('characteristics', {})
+              update_dict     - dict after updating entry
+              recorded_uid    - UID of a recorded experiment
 
-    recp=i.get('record_permanent','')
+              points          - list of recorded points (for each input dict):
+                                {
+                                  dict_flat     - flat dict with stat analysis (if performed)
+                                  stat_analysis - whole output of stat analysis (with warnings)
+                                  flat_features - flat dict of real features of the recorded point
+                                  point         - recorded point
+                                  sub_point     - recorded subpoint
+                                }
 
-    # Check if characteristics lits (to add a number of experimental results at the same time,
-    #   otherwise point by point processing can become very slow
-    chl=ddx.get('characteristics_list', [])
-    if len(ch)>0: chl.append(ch)
+              recorded_points - list of recorded point UIDs (for each input dict)
+
+              elapsed_time    - elapsed time
+              lock_wait_time  - time spent waiting for locked entry (seconds)
 
-    ft_desc=ddx.get('features_desc', {})
-    choices_desc=ddx.get('choices_desc', {})
-    ch_desc=ddx.get('characteristics_desc',{})
+              (journal)       - if journal='yes', path to journal with recorded points
+                                (points are empty in such case)
+            }
+
+    """
+
+    import time
+    import copy
+
+    start_time = time.time()
 
-    pipeline=ck.get_from_dicts(ddx, 'pipeline', {}, None) # get pipeline and remove from individual points,
-                                                         #  otherwise can be very large duplicates ...
-    pipeline_uoa=ck.get_from_dicts(ddx, 'pipeline_uoa', '', None)
-    pipeline_uid=ck.get_from_dicts(ddx, 'pipeline_uid', '', None)
+    o=i.get('out','')
+
+    dds=i.get('dicts',[])
+    if len(dds)==0:
+       return {'return':1, 'error':'no data provided ("dicts" list is empty)'}
 
-    if len(ddx)==0:
-       return {'return':1, 'error':'no data provided ("dict" key is empty)'}
+    # Prepare all points (and get meta, tags and pipeline of the entry)
+    rp=prepare_points(dds)
+    if rp['return']>0: return rp
+
+    ddd=rp['entry_dict']
+    meta=rp['meta']
 
     an=i.get('force_new_entry','')
 
@@ -228,124 +302,356 @@ def add(i):
 
     spbf=i.get('search_point_by_features','')
 
-    cmpr=i.get('features_keys_to_process','') # keys to search similar and already existing points 
-    if cmpr=='': cmpr=['##features#*', '##choices#*', '##choices_order#*']
+    lto=i.get('lock_timeout','')
+    if lto=='': lto=cfg.get('lock_timeout',120)
+    lto=float(lto)
 
-    sf=i.get('skip_flatten','')
+    lqueue=i.get('lock_queue','')
+    if lqueue=='': lqueue=cfg.get('lock_queue','')
 
-    sak=i.get('process_multi_keys','') # Keys to perform stat analysis
-    if sak=='': sak=['##characteristics#*', '##features#*', '##choices#*', '##pipeline_state#*']
+    lwt=0.0 # time spent waiting for locks
 
-    dpoint={}
-    point=0
+    jm=i.get('journal','')
+    if jm=='': jm=cfg.get('journal','')
 
-    ras=i.get('record_all_subpoints','')
-    rdesc=i.get('record_desc_at_each_point','')
-    rdeps=i.get('record_deps_at_each_point','')
+    # Wait in local queue of writers to this entry (if requested)
+    lq=None
+    if lqueue=='yes':
+       import json
 
-    # Search for an entry to aggregate, if needed
-    lock_uid=''
-    lst=[]
-    if an!='yes' and (euoa=='' and euid==''):
-       if o=='con':
-          ck.out('Searching existing experiments in the repository with given meta info ...')
-          ck.out('')
+       lqk=euid
+       if lqk=='': lqk=euoa
+       if lqk=='': lqk=json.dumps(meta, sort_keys=True)
+
+       r=lock_queue({'key':lqk, 'timeout':lto, 'out':o})
+       if r['return']>0: return r
+       lq=r['handle']
+       lwt+=r['lock_wait_time']
+
+    # Local queue is left on any return
+    try:
+       # Search for an entry to aggregate, if needed
+       lock_uid=''
+       lst=[]
+       if an!='yes' and (euoa=='' and euid==''):
+          if o=='con':
+             ck.out('Searching existing experiments in the repository with given meta info ...')
+             ck.out('')
 
-       if len(meta)==0:
-          return {'return':1, 'error':'meta is not defined - can\'t aggregate'}
+          if len(meta)==0:
+             return {'return':1, 'error':'meta is not defined - can\'t aggregate'}
 
-       ii={'action':'search',
+          ii={'action':'search',
+              'common_func':'yes',
+              'repo_uoa': ruoa,
+              'remote_repo_uoa': rruoa,
+              'module_uoa': work['self_module_uoa'],
+              'search_dict':{'meta':meta}}
+          r=ck.access(ii)
+          if r['return']>0: return r
+
+          lst=r['lst']
+          if len(lst)>1:
+             x=''
+             for q in lst:
+                 if x!='': x+=', '
+                 x+=q['data_uoa']
+             return {'return':1, 'error':'more than one meta was returned ('+x+') - ambiguity'}
+
+          if len(lst)==1:
+             euoa=lst[0]['data_uoa']
+             euid=lst[0]['data_uid']
+
+             if o=='con': 
+                ck.out('  Existing experiment was found: '+euoa+' ('+euid+') ...')
+
+       # In journal mode, do not touch already existing entry (entry meta is updated by "compact")
+       pj=''
+       if jm=='yes' and an!='yes' and len(lst)==0 and (euoa!='' or euid!=''):
+          x=euid
+          if x=='': x=euoa
+
+          r=ck.access({'action':'load',
+                       'common_func':'yes',
+                       'repo_uoa': ruoa,
+                       'remote_repo_uoa': rruoa,
+                       'module_uoa': work['self_module_uoa'],
+                       'data_uoa':x})
+          if r['return']==0:
+             pj=r['path']
+             euoa=r['data_uoa']
+             euid=r['data_uid']
+          elif r['return']!=16:
+             return r
+
+       # If not found, add dummy entry
+       if (an=='yes' or len(lst)==0) and pj=='':
+
+          ii={'common_func':'yes',
+              'repo_uoa': ruoa,
+              'remote_repo_uoa': rruoa,
+              'data_uoa':euoa,
+              'data_uid':euid,
+              'module_uoa': work['self_module_uoa'],
+              'dict':ddd}
+
+          # In journal mode, entry is not updated until "compact", hence record meta and tags now
+          # to find this entry by meta in next calls
+          if jm=='yes':
+             x=copy.deepcopy(ddd)
+             if len(meta)>0: x['meta']=meta
+             if len(rp['tags'])>0: x['tags']=rp['tags']
+             ii['dict']=x
+
+          if euoa=='' and euid=='':
+             ii['action']='add'
+             x='  Existing experiments were not found. Adding new entry ...'
+          elif euid=='':
+             ii['action']='update'
+             x='  Adding/updating entry ...'
+
+          else:
+             ii['action']='update'
+             x='  Updating entry ...'
+
+          if o=='con': ck.out(x)
+
+          # If entry exists, we just touch it. Hence if it is locked, we can wait here ...
+          r=access_with_backoff({'ck_input':ii, 'timeout':lto-lwt, 'out':o})
+          lwt+=r.get('lock_wait_time',0)
+          if r['return']>0: return r
+
+          euoa=r['data_uoa']
+          euid=r['data_uid']
+
+       # Append points to journal of this writer without locking entry (merged to points by "compact")
+       if jm=='yes':
+          p=pj
+          if p=='':
+             ii={'action':'load',
+                 'common_func':'yes',
+                 'repo_uoa': ruoa,
+                 'remote_repo_uoa': rruoa,
+                 'module_uoa': work['self_module_uoa'],
+                 'data_uoa':euid}
+             r=ck.access(ii)
+             if r['return']>0: return r
+
+             p=r['path']
+
+          opts={}
+          for k in journal_keys:
+              if k in i: opts[k]=i[k]
+
+          r=append_to_journal({'path':p, 'record':{'dicts':dds, 'options':opts}, 'out':o})
+          if r['return']>0: return r
+
+          et=time.time() - start_time
+
+          return {'return':0, 'elapsed_time':str(et), 
+                              'lock_wait_time':lwt,
+                              'update_dict':{}, 
+                              'recorded_uid':euid,
+                              'journal':r['journal'],
+                              'points':[{'dict_flat':{}, 'stat_analysis':{}, 'flat_features':{}, 'point':'', 'sub_point':0} for q in dds],
+                              'recorded_points':[]}
+
+       # Load and lock
+       if o=='con': 
+          ck.out('  Loading and locking entry ('+euoa+') ...')
+
+       # Loading existing experiment
+       ii={'action':'load',
            'common_func':'yes',
            'repo_uoa': ruoa,
            'remote_repo_uoa': rruoa,
            'module_uoa': work['self_module_uoa'],
-           'search_dict':{'meta':meta}}
-       r=ck.access(ii)
+           'data_uoa':euid,
+           'get_lock':'yes',
+           'lock_retries':0,
+           'lock_expire_time':120
+          }
+       r=access_with_backoff({'ck_input':ii, 'timeout':lto-lwt, 'out':o})
+       lwt+=r.get('lock_wait_time',0)
        if r['return']>0: return r
 
-       lst=r['lst']
-       if len(lst)>1:
-          x=''
-          for q in lst:
-              if x!='': x+=', '
-              x+=q['data_uoa']
-          return {'return':1, 'error':'more than one meta was returned ('+x+') - ambiguity'}
+       p=r['path']
+       dde=r['dict']
+       lock_uid=r['lock_uid']
 
-       if len(lst)==1:
-          euoa=lst[0]['data_uoa']
-          euid=lst[0]['data_uid']
+       rl=r
 
-          if o=='con': 
-             ck.out('  Existing experiment was found: '+euoa+' ('+euid+') ...')
+       if o=='con': 
+          ck.out('  Loaded and locked successfully (lock UID='+lock_uid+') ...')
+
+       # Load index of points by features (to find related points without rescanning all points)
+       # only when searching points by features (otherwise remove it - it is rebuilt when needed)
+       fidx=None
+       if spbf=='yes':
+          r=load_features_index({'path':p, 'entry_points':dde.get('points','0'), 'rebuild':True})
+          if r['return']>0: return r
+          fidx=r['index']
+       else:
+          pinfo=os.path.join(p, features_index_dir, 'info.json')
+          if os.path.isfile(pinfo): os.remove(pinfo)
+
+       # Load schema of flat keys of points (to get all keys without parsing all points) if used
+       ksch=None
+       if cfg.get('keys_schema','')=='yes':
+          r=load_keys_schema({'path':p, 'entry_points':dde.get('points','0'), 'rebuild':True})
+          if r['return']>0: return r
+          ksch=r['schema']
+       else:
+          pk=os.path.join(p, cfg.get('keys_schema_file','keys.json'))
+          if os.path.isfile(pk): os.remove(pk)
+
+       # Record all points
+       ii=copy.copy(i)
+       ii['path']=p
+       ii['entry_dict']=dde
+       ii['entry_uid']=euid
+       ii['features_index']=fidx
+       ii['keys_schema']=ksch
+       ii['prepared']=rp
+
+       r=record_points_in_entry(ii)
+       if r['return']>0: return r
+
+       points=r['points']
+       rpoints=r['recorded_points']
+
+       # Save updated index of points by features
+       if fidx!=None and (len(fidx['changed'])>0 or fidx['entry_points']!=dde.get('points','0')):
+          fidx['entry_points']=dde.get('points','0')
 
-    # If not found, add dummy entry
-    if an=='yes' or len(lst)==0:
+          r=save_features_index(fidx)
+          if r['return']>0: return r
+
+       if ksch!=None:
+          ksch['entry_points']=dde.get('points','0')
+
+          r=save_keys_schema(ksch)
+          if r['return']>0: return r
 
-       ii={'common_func':'yes',
+       # Updating and unlocking entry *****************************************************
+       if o=='con': 
+          ck.out('  Updating entry and unlocking ...')
+
+       ii={'action':'update',
+           'common_func':'yes',
            'repo_uoa': ruoa,
            'remote_repo_uoa': rruoa,
-           'data_uoa':euoa,
-           'data_uid':euid,
            'module_uoa': work['self_module_uoa'],
-           'dict':ddd}
+           'data_uoa':euid,
+           'dict':dde,
+           'ignore_update':i.get('ignore_update',''),
+           'sort_keys':sk,
+           'unlock_uid':lock_uid
+          }
+       r=ck.access(ii)
+       if r['return']>0: return r
 
-       if euoa=='' and euid=='':
-          ii['action']='add'
-          x='  Existing experiments were not found. Adding new entry ...'
-       elif euid=='':
-          ii['action']='update'
-          x='  Adding/updating entry ...'
+       # Update catalog of points (if used)
+       rl['dict']=dde
+       rx=update_catalog({'entry':rl, 'points':rpoints})
+       if rx['return']>0: return rx
 
-       else:
-          ii['action']='update'
-          x='  Updating entry ...'
+       et=time.time() - start_time
 
-       if o=='con': ck.out(x)
+       return {'return':0, 'elapsed_time':str(et), 
+                           'lock_wait_time':lwt,
+                           'update_dict':r, 
+                           'recorded_uid':euid,
+                           'points':points,
+                           'recorded_points':rpoints}
+    finally:
+       if lq!=None:
+          unlock_queue(lq)
 
-       # If entry exists, we just touch it. Hence if it is locked, we can wait here ...
-       success=False
-       start_time1 = time.time()
-       while not success:
-             r=ck.access(ii)
+##############################################################################
+# internal function to prepare points from a list of dicts in format of "add"
+# (and get dict, meta, tags, pipeline and descriptions of the entry)
 
-             if r['return']==0:
-                success=True
-             elif r['return']==32:
-                tm = time.time()-start_time1
-                if tm>120:
-                   return r
-                if o=='con':
-                   ck.out('    Entry exists ('+r['data_uoa']+') and locked - waiting 5 sec ...')
-                   time.sleep(5)   
-             else:
-                return r
+def prepare_points(dds):
 
-       if r['return']>0: return r
-       euoa=r['data_uoa']
-       euid=r['data_uid']
+    import copy
 
-    # Load and lock
-    if o=='con': 
-       ck.out('  Loading and locking entry ('+euoa+') ...')
+    ddd={}
+    meta={}
+    tags=[]
 
-    # Loading existing experiment
-    ii={'action':'load',
-        'common_func':'yes',
-        'repo_uoa': ruoa,
-        'remote_repo_uoa': rruoa,
-        'module_uoa': work['self_module_uoa'],
-        'data_uoa':euid,
-        'get_lock':'yes',
-        'lock_expire_time':120
-       }
-    r=ck.access(ii)
-    if r['return']>0: return r
+    pipeline={}
+    pipeline_uoa=''
+    pipeline_uid=''
+
+    ddesc={}
+
+    xdds=[]
+    for dd in dds:
+        ddx=copy.deepcopy(dd) # To avoid changing original input !!! 
+
+        x=ddx.get('dict','')
+        if x!='': ddd.update(x)
+
+        x=ddx.get('meta','')
+        if x!='' and len(meta)==0: meta=x
+
+        x=ddx.get('tags','')
+        if x!='' and len(tags)==0: tags=x
+
+        x=ck.get_from_dicts(ddx, 'pipeline', {}, None) # get pipeline and remove from individual points,
+                                                       #  otherwise can be very large duplicates ...
+        if len(x)>0 and len(pipeline)==0: pipeline=x
+
+        x=ck.get_from_dicts(ddx, 'pipeline_uoa', '', None)
+        if x!='' and pipeline_uoa=='': pipeline_uoa=x
+
+        x=ck.get_from_dicts(ddx, 'pipeline_uid', '', None)
+        if x!='':
+           if pipeline_uid!='' and pipeline_uid!=x:
+              return {'return':1, 'error':'points have different pipeline UID ('+pipeline_uid+' vs. '+x+')'}
+           pipeline_uid=x
+
+        if len(ddx)==0:
+           return {'return':1, 'error':'no data provided ("dict" key is empty)'}
+
+        if len(ddesc)==0:
+           ddesc={'features_desc':ddx.get('features_desc', {}),
+                  'choices_desc':ddx.get('choices_desc', {}),
+                  'characteristics_desc':ddx.get('characteristics_desc',{})}
+
+        xdds.append({'dict':ddx, 'dict_to_compare':dd.get('dict_to_compare', {})})
+
+    return {'return':0, 'entry_dict':ddd, 'meta':meta, 'tags':tags,
+                        'pipeline':pipeline, 'pipeline_uoa':pipeline_uoa, 'pipeline_uid':pipeline_uid,
+                        'desc':ddesc, 'points':xdds}
+
+##############################################################################
+# internal function to record prepared points in an already loaded and locked entry
+
+def record_points_in_entry(i):
+
+    import copy
+
+    p=i['path']
+    dde=i['entry_dict']
+    fidx=i.get('features_index',None)
+
+    rp=i['prepared']
+
+    ddd=rp['entry_dict']
+    meta=rp['meta']
+    tags=rp['tags']
+    pipeline=rp['pipeline']
+    pipeline_uoa=rp['pipeline_uoa']
+    pipeline_uid=rp['pipeline_uid']
+    ddesc=rp['desc']
+    xdds=rp['points']
+
+    srp=i.get('skip_record_pipeline','')
+    srd=i.get('skip_record_desc','')
 
-    p=r['path']
-    dde=r['dict']
     if len(ddd)>0: dde.update(ddd)
-    lock_uid=r['lock_uid']
-    ipoints=int(dde.get('points','0'))
 
     # Check old and new pipeline UID if exists
     opipeline_uid=dde.get('pipeline_uid','')
@@ -354,9 +660,6 @@ def add(i):
     if pipeline_uoa!='': dde['pipeline_uoa']=pipeline_uoa
     if pipeline_uid!='': dde['pipeline_uid']=pipeline_uid
 
-    if o=='con': 
-       ck.out('  Loaded and locked successfully (lock UID='+lock_uid+') ...')
-
     # Check if pipeline was recorded or record new
     if len(pipeline)>0 and srp!='yes':
        ppf=os.path.join(p,'pipeline.json')
@@ -366,51 +669,11 @@ def add(i):
 
     # Check key descriptions
     ppfd=os.path.join(p,'desc.json')
-    ddesc={'features_desc':ft_desc,
-           'choices_desc':choices_desc,
-           'characteristics_desc':ch_desc}
 
     if srd!='yes' and not os.path.isfile(ppfd):
        r=ck.save_json_to_file({'json_file':ppfd, 'dict':ddesc})
        if r['return']>0: return r
 
-    # If existing experiment found, check if search point by feature
-    ddft={'features':ft, 'choices':choices, 'choices_order':choices_order}
-
-    # Flatten and prune features and choices (to be able to faster detect related points for a given experiment later)
-    r=ck.flatten_dict({'dict':ddft, 'prune_keys':cmpr})
-    if r['return']>0: return r
-    fddft=r['dict']
-
-    # Find related point by features and/or choices
-    fpoint=''
-    fpoint_uid=''
-    if euid!='' and spbf=='yes':
-       if o=='con': ck.out('    Searching points by features (and choices if needed) ...')
-
-       rx=list_points({'path':p, 
-                       'prune_by_features':fddft})
-       if rx['return']>0: return rx
-
-       points=rx['points']
-
-       if len(points)>1:
-          return {'return':1, 'error':'ambiguity - more than one point found with the same features'}
-
-       if len(points)==1:
-          fpoint_uid=points[0]
-          fpoint='ckp-'+fpoint_uid
-
-       if fpoint!='':
-          if o=='con': 
-             ck.out('      Found point by features: '+str(fpoint))
-
-          # Reload feature file from this point to get number of subpoints
-          px=os.path.join(p, fpoint+'.features.json')
-          rx=ck.load_json_file({'json_file':px})
-          if rx['return']>0: return rx
-          ddft=rx['dict']
-
     # Add information about user
     ri=ck.prepare_special_info_about_entry({})
     if ri['return']>0: return ri
@@ -423,1051 +686,4577 @@ def add(i):
     if len(tags)!=0:
        dde['tags']=tags
 
-    # Prepare new point (if not found by features)
-    if fpoint=='':
-       ipoints+=1
+    # Record all points
+    points=[]
+    rpoints=[]
 
-       rx=ck.gen_uid({})
-       if rx['return']>0: return rx
-       uid=rx['data_uid']
- 
-       fpoint_uid=uid
-       fpoint='ckp-'+uid
+    for q in xdds:
+        ii=copy.copy(i)
+        ii.update(q)
+        ii['features_index']=fidx
 
-       dde['points']=str(ipoints)
+        r=record_point(ii)
+        if r['return']>0: return r
 
-       if o=='con': ck.out('  Prepared new point '+uid+' ...')
+        del(r['return'])
+        points.append(r)
+        rpoints.append(r['point'])
 
-    # Check if need to flat and basic perform analysis
-    mdpt=i.get('max_range_percent_threshold',-1)
-    mmin=''
-    mmax=''
+    return {'return':0, 'points':points, 'recorded_points':rpoints}
 
-    ddflat={}
-    rsa={}
-    if sf!='yes':
-       # Pre-load flattened data, if already exists
-       fpflat1=os.path.join(p, fpoint+'.flat.json')
+##############################################################################
+# internal function to append record to journal of this writer (process) in the entry
+#
+# Journal is a file journal-<host>-<pid>.jsonl with one JSON record per line.
+# Shared flock is taken while appending and file is reopened if it was renamed
+# by "compact" meanwhile (compact takes exclusive flock before reading it).
 
-       if os.path.isfile(fpflat1):
-          r=ck.load_json_file({'json_file':fpflat1})
-          if r['return']>0: return r
-          ddflat=r['dict']
+def append_to_journal(i):
 
-       # Perform statistical analysis of (multiple statistical) characteristics
-       rsa=multi_stat_analysis({'flat_dict':ddflat,
-                                'dict_to_add':ddx,
-                                'dict_to_compare':dddc,
-                                'process_multi_keys':sak,
-                                'skip_stat_analysis':ssa,
-                                'out':oo})
-       if rsa['return']>0: return rsa
+    import time
+    import json
+    import socket
 
-       ddflat=rsa['dict_flat']
-       mdp=rsa['max_range_percent']
-       mmin=rsa['min']
-       mmax=rsa['max']
+    p=i['path']
+    rec=i['record']
 
-       # Save updated flat file
-       r=ck.save_json_to_file({'json_file':fpflat1, 'dict':ddflat, 'sort_keys':sk})
-       if r['return']>0: return r
+    try:
+       import fcntl
+    except ImportError:
+       fcntl=None
 
-    # Check if record all points or only with max_range_percent > max_range_percent_threshold
-    sp=ddft.get('sub_points',0)
-    if sp==0 or ras=='yes' or ((mdpt!=-1 and mdp>mdpt) or mmin=='yes' or mmax=='yes'):
-       sp+=1
-#       if sp>9999:
-#          return {'return':1, 'error':'max number of subpoints is reached (9999)'}
+    rec['time']=time.time()
 
-       if o=='con': ck.out('      Subpoint: '+str(sp))
+    host=socket.gethostname().replace(os.sep,'_').replace('-','_')
+    pj=os.path.join(p, 'journal-'+host+'-'+str(os.getpid())+'.jsonl')
 
-       ddft['sub_points']=sp
-       ssp='.'+str(sp).zfill(4)
+    try:
+       line=json.dumps(rec, sort_keys=True)+'\n'
+    except Exception as e:
+       return {'return':1, 'error':'can\'t record point to journal ('+format(e)+')'}
 
-       fssp=fpoint+ssp+'.json'
-       fssp1=os.path.join(p, fssp)
+    while True:
+        f=open(pj, 'a')
 
-       # Prepare what to write
-       dds={'features':ft,
-            'choices':choices,
-            'choices_order':choices_order,
-            'characteristics_list':chl}
+        if fcntl!=None:
+           fcntl.flock(f.fileno(), fcntl.LOCK_SH)
 
-       # Save subpoint dict to file
-       r=ck.save_json_to_file({'json_file':fssp1, 'dict':dds, 'sort_keys':sk})
-       if r['return']>0: return r
+           # Check that journal was not renamed by "compact" while waiting for lock
+           try:
+              same=(os.fstat(f.fileno()).st_ino==os.stat(pj).st_ino)
+           except OSError:
+              same=False
 
-    if recp=='yes':
-       ddft['permanent']='yes'
+           if not same:
+              f.close()
+              continue
 
-    # Save features file (that include subpoint)
-    pfp=os.path.join(p, fpoint)+'.features.json'
-    r=ck.save_json_to_file({'json_file':pfp, 'dict':ddft, 'sort_keys':sk})
-    if r['return']>0: return r
+        f.write(line)
+        f.flush()
+        f.close()
+        break
 
-    # Save flattened features file
-    pfpf=os.path.join(p, fpoint)+'.features_flat.json'
-    r=ck.save_json_to_file({'json_file':pfpf, 'dict':fddft, 'sort_keys':sk})
-    if r['return']>0: return r
+    # Change mtime of entry directory to invalidate cached tables (see "get")
+    os.utime(p, None)
 
-    # Save universal descriptions of (all) dimensions
-    pfpd=os.path.join(p, fpoint)+'.desc.json'
-    if rdesc=='yes':
-       r=ck.save_json_to_file({'json_file':pfpd, 'dict':ddesc})
+    if i.get('out','')=='con':
+       ck.out('  Recorded to journal '+pj+' ...')
 
-    # Save dependencies for experiment
-    pfpds=os.path.join(p, fpoint)+'.deps.json'
-    if rdeps=='yes':
-       r=ck.save_json_to_file({'json_file':pfpds, 'dict':ddeps})
+    return {'return':0, 'journal':pj}
 
-    # Updating and unlocking entry *****************************************************
-    if o=='con': 
-       ck.out('  Updating entry and unlocking ...')
+##############################################################################
+# merge journals of all writers to points of the entry
 
-    ii={'action':'update',
-        'common_func':'yes',
-        'repo_uoa': ruoa,
-        'remote_repo_uoa': rruoa,
-        'module_uoa': work['self_module_uoa'],
-        'data_uoa':euid,
-        'dict':dde,
-        'ignore_update':i.get('ignore_update',''),
-        'sort_keys':sk,
-        'unlock_uid':lock_uid
-       }
-    r=ck.access(ii)
-    if r['return']>0: return r
+def compact(i):
+    """
+    Input:  {
+              data_uoa or experiment_uoa - experiment entry
+              (repo_uoa)                 - experiment repo UOA
+              (module_uoa)
 
-    et=time.time() - start_time
+              (lock_timeout)             - max time in seconds to wait for locked entry
 
-    return {'return':0, 'elapsed_time':str(et), 
-                        'update_dict':r, 
-                        'dict_flat':ddflat, 
-                        'stat_analysis':rsa, 
-                        'flat_features':fddft,
-                        'recorded_uid':euid,
-                        'point':fpoint_uid,
-                        'sub_point':sp}
+              (parallel)                 - if 'threads', remove files of points marked as deleted in a thread pool
+              (workers)                  - number of threads (8 by default)
+            }
 
-##############################################################################
-# get points from multiple entries
+    Output: {
+              return          - return code =  0, if successful
+                                            >  0, if error
+              (error)         - error text if return > 0
 
-def get(i):
-    """
+              journals        - number of merged journals
+              records         - number of merged records (calls of "add" or "add_batch")
+              recorded_points - list of recorded point UIDs
 
-    Input:  {
-              Select entries or table:
-                 (repo_uoa) or (experiment_repo_uoa)     - can be wild cards
-                 (remote_repo_uoa)                       - if remote access, use this as a remote repo UOA
-                 (module_uoa) or (experiment_module_uoa) - can be wild cards
-                 (data_uoa) or (experiment_uoa) or (experiment_data_uoa)     - can be wild cards
+              removed_points  - list of removed point UIDs (marked as deleted by "delete_points" with soft=yes)
+              removed_files   - number of removed files
 
-                 (repo_uoa_list)                       - list of repos to search
-                 (module_uoa_list)                     - list of module to search
-                 (data_uoa_list)                       - list of data to search
+              lock_wait_time  - time spent waiting for locked entry (seconds)
+            }
 
-                 (prune_points)                        - list of points to get
+    """
 
-                 (search_dict)                         - search dict
-                 (ignore_case)                         - if 'yes', ignore case when searching
+    o=i.get('out','')
 
-                       OR
-                 (meta)                                - search by meta in the entry (adds search_dict['meta'])
-                 (tags)                                - search by tags in the entry
+    duoa=i.get('data_uoa','')
+    if duoa=='': duoa=i.get('experiment_uoa','')
 
-                 (features)                            - search by features in the entry
-                       OR
-                 (flat_features)                       - search by flat features in the entry (faster) ...
+    muoa=i.get('module_uoa','')
+    if muoa=='': muoa=work['self_module_uoa']
 
-                 (features_keys_to_ignore)             - list of keys to remove from features (can be wildcards) - useful for frontier detection
+    lto=i.get('lock_timeout','')
+    if lto=='': lto=cfg.get('lock_timeout',120)
 
-                       OR 
+    # Load and lock entry
+    ii={'action':'load',
+        'repo_uoa':i.get('repo_uoa',''),
+        'module_uoa':muoa,
+        'data_uoa':duoa,
+        'get_lock':'yes',
+        'lock_retries':0,
+        'lock_expire_time':120}
+    r=access_with_backoff({'ck_input':ii, 'timeout':lto, 'out':o})
+    if r['return']>0: return r
 
-                 (table)                               - experiment table (if drawing from other functions)
-                 (mtable)                              - misc or meta table related to above table
-                                                         may be useful, when doing labeling for machine learning
+    lwt=r['lock_wait_time']
 
-              (skip_processing)                        - if 'yes', do not load data (useful to return points for frontier detection)
-              (get_all_points)                         - if 'yes', add all points
-              (load_json_files)                        - list of json files to load for a given point 
-                                                         (features, features_flat, flat, 0001, 0002, etc ...)
-              (get_keys_from_json_files)               - which keys to get from json files (useful for frontier) ...
+    p=r['path']
+    lock_uid=r['lock_uid']
 
-              (flat_keys_list)                      - list of flat keys to extract from points into table
-              (flat_keys_list_ext)                  - add this extension to all above keys (useful to add #min)
+    rl=r
 
-              (flat_keys_list_separate_graphs)      - [ [keys], [keys], ...] - several graphs ...
+    # Merge journals and update entry (entry is unlocked on error)
+    handles=[]
 
-                                                      (order is important: for example, for plot -> X,Y,Z)
-              (flat_keys_index)                     - add all flat keys starting from this index 
-              (flat_keys_index_end)                 - add all flat keys ending with this index (default #min)
-              (flat_keys_index_end_range)           - add range after key (+-)
+    r=merge_journals({'path':p, 'entry':rl, 'handles':handles, 'out':o,
+                      'parallel':i.get('parallel',''), 'workers':i.get('workers','')})
+    if r['return']>0:
+       ck.set_lock({'path':p, 'unlock_uid':lock_uid})
 
-              (substitute_x_with_loop)              - if 'yes', substitute first vector dimension with a loop
-              (add_x_loop)                          - if 'yes', insert first vector dimension with a loop
-              (sort_index)                          - if !='', sort by this number within vector (i.e. 0 - X, 1 - Y, etc)
+    for f in handles:
+        f.close()
 
-              (ignore_point_if_none)                - if 'yes', ignore points where there is a None
-              (ignore_point_if_empty_string)        - if 'yes', ignore points where there is a None
-              (ignore_graph_separation)             - if 'yes', ignore separating different entries into graphs 
-              (separate_subpoints_to_graphs)        - if 'yes', separate each subpoint of entry into a new graph
+    if r['return']>0: return r
 
-              (separate_permanent_to_graphs)        - if 'yes', separate permanent to new graphs (first is always non-permanent ...)(
+    # Remove merged journals (they are recorded in entry and skipped if not removed here)
+    for pj in r['journal_files']:
+        try:
+           os.remove(pj)
+        except OSError:
+           pass # already removed by another compaction
 
-              (vector_thresholds)                   - List of values: if a given value in this vector is !=None and more than
-                                                        a value in a processed vector - skip it
-              (vector_thresholds_conditions)        - specify threshold conditions for above vector values ("<" - default or ">")
+    return {'return':0, 'journals':len(r['journal_files']), 'records':r['records'], 'recorded_points':r['recorded_points'],
+                        'removed_points':r['removed_points'], 'removed_files':r['removed_files'], 'lock_wait_time':lwt}
 
-              (expand_list)                         - if 'yes', expand list to separate values (useful for histogram)
-                                                         (all checks for valid vectors or thresholds are currently turned off)
+##############################################################################
+# internal function to merge journals of all writers to points of the loaded and locked entry
+#
+# Names of merged journals are recorded in entry meta (merged_journals) together with points,
+# so journals which were merged but not removed (e.g. compaction was killed) are never merged twice.
 
-              (skip_scenario_info)                  - if 'yes', do not attempt to pre-load info from the experiment scenario
-              (separate_permanent_points)           - if 'yes', add permanent points to ppoints ('features' file should be loaded)
-            }
+def merge_journals(i):
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
+    import json
 
-              table        - first dimension is for different graphs on one plot
-                             Second dimension: list of vectors [X,Y,Z,...]
+    try:
+       import fcntl
+    except ImportError:
+       fcntl=None
 
-              mtable       - misc table - misc info related to above table (UOA, point, etc)
-                             may be useful, when doing labeling for machine learning
+    o=i.get('out','')
 
-              points       - list of points {'repo_uoa','repo_uid','module_uoa','module_uid','data_uoa','data_uid','point_uid', '<file_extension_name>'=dict ...}}
+    p=i['path']
+    rl=i['entry']
+    handles=i['handles']
+
+    dde=rl['dict']
+    lock_uid=rl['lock_uid']
+
+    ruid=rl['repo_uid']
+    muid=rl['module_uid']
+    duid=rl['data_uid']
+
+    # Remove journals merged by previous compaction
+    mj=dde.get('merged_journals',[])
+    for fn in mj:
+        try:
+           os.remove(os.path.join(p, fn))
+        except OSError:
+           pass
+
+    # Take all journals (including not merged ones from previous failed compaction)
+    jfiles=[]
+    for fn in sorted(os.listdir(p)):
+        if fn.startswith('journal-') and fn not in mj:
+           pj=os.path.join(p, fn)
+
+           if fn.endswith('.jsonl'):
+              # Unique name (writer with the same PID may create new journal later)
+              pj1=pj+'.'+lock_uid+'.compact'
+              os.rename(pj, pj1)
+              pj=pj1
+           elif not fn.endswith('.compact'):
+              continue
+
+           jfiles.append(pj)
+
+    # Wait for unfinished appends and read records
+    records=[]
+    for pj in jfiles:
+        f=open(pj, 'r+')
+        handles.append(f)
+        if fcntl!=None:
+           fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+        lines=f.read().split('\n')
+        for q in range(0, len(lines)):
+            x=lines[q].strip()
+            if x=='': continue
+
+            try:
+               rec=json.loads(x)
+            except ValueError as e:
+               if q==len(lines)-1: continue # partially written record (writer was killed)
+               return {'return':1, 'error':'can\'t parse record '+str(q+1)+' in journal '+pj+' ('+format(e)+')'}
+
+            records.append((rec.get('time',0), pj, q, rec))
+
+    records=sorted(records, key=lambda x: (x[0], x[1], x[2]))
 
-              ppoints      - list of permanent points
+    if o=='con':
+       ck.out('Merging '+str(len(records))+' records from '+str(len(jfiles))+' journal(s) ...')
 
-              real_keys    - all added keys (useful when flat_keys_index is used)
+    # Remove files of points marked as deleted (before recording new points)
+    rmp=[]
+    nrf=0
 
-              merged_meta  - merged meta from all entries
-              plot_info_from_scenario - dict with plot info if experimental scenario is found in the first experiment entry
-            }
+    r=load_tombstones(p)
+    if r['return']>0: return r
+    tomb=r['tombstones']
 
-    """
+    if len(tomb)>0:
+       if o=='con':
+          ck.out('Removing '+str(len(tomb))+' point(s) marked as deleted ...')
 
-    o=i.get('out','')
+       nw=i.get('workers','')
+       if nw=='' or nw==None: nw=8
 
-    table=i.get('table',{})
-    mtable=i.get('mtable',{})
+       r=remove_points_in_entry({'path':p, 'dict':dde, 'point_uids':list(tomb.keys()),
+                                 'parallel':i.get('parallel',''), 'workers':int(nw)})
+       if r['return']>0: return r
 
-    prune_points=i.get('prune_points',[])
+       rmp=r['removed_points']
+       nrf=r['deleted_files']
 
-    spp=i.get('separate_permanent_points','')
+    # Record all points
+    rpoints=[]
 
-    fki=i.get('flat_keys_index','')
-    fkie=i.get('flat_keys_index_end','#min')
-    fkied=i.get('flat_keys_index_end_range','')
-    fkl=i.get('flat_keys_list',[])
-    xfkl=i.get('flat_keys_list_ext','')
+    if len(records)>0:
+       # Maintain index of points by features only if some records search points by features (see "add")
+       fidx=None
+       if len([q for q in records if q[3].get('options',{}).get('search_point_by_features','')=='yes'])>0:
+          r=load_features_index({'path':p, 'entry_points':dde.get('points','0'), 'rebuild':True})
+          if r['return']>0: return r
+          fidx=r['index']
+       else:
+          pinfo=os.path.join(p, features_index_dir, 'info.json')
+          if os.path.isfile(pinfo): os.remove(pinfo)
 
-    fkti=i.get('features_keys_to_ignore',[])
+       ksch=None
+       if cfg.get('keys_schema','')=='yes':
+          r=load_keys_schema({'path':p, 'entry_points':dde.get('points','0'), 'rebuild':True})
+          if r['return']>0: return r
+          ksch=r['schema']
+       else:
+          pk=os.path.join(p, cfg.get('keys_schema_file','keys.json'))
+          if os.path.isfile(pk): os.remove(pk)
 
-    fkls=i.get('flat_keys_list_separate_graphs','')
-    if fkls=='': fkls=[]
-    if len(fkls)==0 or len(fkl)>0: fkls.append(fkl) # at least one combination of keys, even empty!
+       for q in records:
+           rec=q[3]
 
-    rfkl=[] # real flat keys (if all)
-    trfkl=[]
+           rp=prepare_points(rec.get('dicts',[]))
+           if rp['return']>0: return rp
 
-    ipin=i.get('ignore_point_if_none','')
-    ipies=i.get('ignore_point_if_empty_string','')
-    igs=i.get('ignore_graph_separation','')
-    sstg=i.get('separate_subpoints_to_graphs','')
+           ii=dict(rec.get('options',{}))
+           ii['out']=o
+           ii['path']=p
+           ii['entry_dict']=dde
+           ii['entry_uid']=duid
+           ii['features_index']=fidx
+           ii['keys_schema']=ksch
+           ii['prepared']=rp
 
-    sl=i.get('skip_processing','')
-    gop=i.get('get_all_points','')
-    ljf=i.get('load_json_files',[])
-    gkjf=i.get('get_keys_from_json_files',[])
+           r=record_points_in_entry(ii)
+           if r['return']>0: return r
 
-    sptg=i.get('separate_permanent_to_graphs','')
-    if sptg=='yes':
-       if 'features' not in ljf: ljf.append('features')
+           rpoints+=r['recorded_points']
 
-    el=i.get('expand_list','') # useful for histograms
+       if fidx!=None and (len(fidx['changed'])>0 or fidx['entry_points']!=dde.get('points','0')):
+          fidx['entry_points']=dde.get('points','0')
 
-    vt=i.get('vector_thresholds',[])
-    vtc=i.get('vector_thresholds_conditions',[])
+          r=save_features_index(fidx)
+          if r['return']>0: return r
 
-    ssi=i.get('skip_scenario_info','')
+       if ksch!=None:
+          ksch['entry_points']=dde.get('points','0')
 
-    points=[]
-    ppoints=[]
+          r=save_keys_schema(ksch)
+          if r['return']>0: return r
 
-    mm={}
-    plot_info_from_scenario={}
+    if len(records)>0 or len(tomb)>0 or len(jfiles)>0 or len(mj)>0:
+       dde['merged_journals']=[os.path.basename(pj) for pj in jfiles]
 
-    si=i.get('sort_index','')
-    sxwl=i.get('substitute_x_with_loop','')
-    axl=i.get('add_x_loop','')
+       # Update and unlock entry
+       r=ck.access({'action':'update',
+                    'repo_uoa':ruid,
+                    'module_uoa':muid,
+                    'data_uoa':duid,
+                    'dict':dde,
+                    'unlock_uid':lock_uid})
+       if r['return']>0: return r
 
-    if len(table)==0:
-       ruoa=i.get('repo_uoa','')
-       xruoa=i.get('experiment_repo_uoa','')
-       if xruoa!='': ruoa=xruoa
+       # Update catalog of points (if used)
+       rl['dict']=dde
+       r=update_catalog({'entry':rl, 'points':rpoints, 'removed_points':rmp})
+       if r['return']>0: return r
+    else:
+       r=ck.set_lock({'path':p, 'unlock_uid':lock_uid})
+       if r['return']>0: return r
 
-       rruoa=i.get('remote_repo_uoa','')
+    return {'return':0, 'journal_files':jfiles, 'records':len(records), 'recorded_points':rpoints,
+                        'removed_points':rmp, 'removed_files':nrf}
 
-       muoa=i.get('experiment_module_uoa','')
-       if muoa=='':
-          muoa=i.get('module_uoa','')
+##############################################################################
+# internal function to call CK action for an entry and retry while entry is locked (return code 32)
+# with exponential backoff and random jitter (to avoid both busy waiting and long fixed delays)
 
-       duoa=i.get('experiment_data_uoa','')
-       if duoa=='':
-          duoa=i.get('data_uoa','')
-       if duoa=='':
-          duoa=i.get('experiment_uoa','')
+def access_with_backoff(i):
 
-       ruoal=i.get('repo_uoa_list',[])
-       muoal=i.get('module_uoa_list',[])
-       duoal=i.get('data_uoa_list',[])
+    import time
+    import random
 
-       sd=i.get('search_dict',{})
-       ic=i.get('ignore_case','')
+    ii=i['ck_input']
+    o=i.get('out','')
 
-       meta=i.get('meta',{})
-       if len(meta)>0: sd['meta']=meta
+    timeout=float(i.get('timeout',120))
 
-       tags=i.get('tags','')
+    delay=float(cfg.get('lock_backoff_min',0.05))
+    dmax=float(cfg.get('lock_backoff_max',5.0))
 
-       # Search entries
-       ii={'action':'search',
-           'common_func':'yes',
-           'repo_uoa':ruoa,
-           'remote_repo_uoa': rruoa,
-           'module_uoa':muoa,
-           'data_uoa':duoa,
-           'repo_uoa_list':ruoal,
-           'module_uoa_list':muoal,
-           'data_uoa_list':duoal,
-           'search_dict':sd,
-           'ignore_case':ic,
-           'tags':tags}
-       r=ck.access(ii)
-       if r['return']>0: return r
+    start_time=time.time()
 
-       lst=r['lst']
+    while True:
+        r=ck.access(ii)
+        if r['return']!=32: break
 
-       table={}
-       mtable={}
-       igraph=0
+        tm=time.time()-start_time
+        if tm>=timeout: break
 
-       features=i.get('features',{})
-       ffeatures=i.get('flat_features',{})
+        d=random.uniform(0, delay)
+        if d>timeout-tm: d=timeout-tm
 
-       if len(features)>0 and len(ffeatures)==0:
-          r=ck.flatten_dict({'dict':features})
-          if r['return']>0: return r
-          ffeatures=r['dict']
+        if o=='con':
+           ck.out('    Entry is locked - waiting '+('%.2f' % d)+' sec ...')
 
-       # Iterate over entries
-       for e in lst:
-           ruoa=e['repo_uoa']
-           ruid=e['repo_uid']
-           muoa=e['module_uoa']
-           muid=e['module_uid']
-           duoa=e['data_uoa']
-           duid=e['data_uid']
+        time.sleep(d)
 
-           # Load entry
-           if o=='con':
-              ck.out('Loading entry '+muoa+':'+duoa+' ...')
+        delay*=2
+        if delay>dmax: delay=dmax
 
-           ii={'action':'load',
-               'repo_uoa':ruid,
-               'module_uoa':muid,
-               'data_uoa':duid}
+    r['lock_wait_time']=time.time()-start_time
 
-           r=ck.access(ii)
-           if r['return']>0: return r
+    return r
 
-           p=r['path']
-           dd=r['dict']
+##############################################################################
+# internal function to wait in a local FIFO queue of writers to the same entry (via flock in temp directory)
+# to avoid all writers polling CK lock at the same time (skipped if fcntl is not available)
+#
+# Each writer takes a ticket (under short exclusive flock of queue file) and holds flock of its ticket file
+# while waiting and writing. A writer proceeds only when it could lock ticket files of all previous writers,
+# i.e. they finished, timed out or died (flock is released by OS), so writers are served in order of arrival
 
-           meta=dd.get('meta',{})
+def lock_queue(i):
 
-           cplot={} # customize plot
-           # Check if scenario
-           if ssi!='yes':
-              sm_uoa=meta.get('scenario_module_uoa','')
-              if sm_uoa!='':
-                 # Trying to pre-load graph params
-                 rx=ck.access({'action':'load',
-                               'module_uoa':cfg['module_deps']['module'],
-                               'data_uoa':sm_uoa})
-                 if rx['return']==0:
-                    dx=rx['dict']
-                    plot_info_from_scenario=dx.get('plot',{})
+    import time
+    import tempfile
+    import hashlib
 
-              mm.update(meta)
+    start_time=time.time()
 
-           if len(plot_info_from_scenario)>0:
-              cplot=plot_info_from_scenario
+    try:
+       import fcntl
+    except ImportError:
+       return {'return':0, 'handle':None, 'lock_wait_time':0.0}
 
-           cplot.update(i.get('customize_plot',{}))
+    o=i.get('out','')
+    timeout=float(i.get('timeout',120))
 
-           if len(cplot)>0:
-              if len(fkl)==0: 
-                 fkl=cplot.get('flat_keys_list',[])
-                 if i.get('flat_keys_list_separate_graphs','')=='' and len(fkl)>0: fkls=[fkl]
-              if xfkl=='': xfkl=cplot.get('flat_keys_list_ext','')
+    pq=os.path.join(tempfile.gettempdir(), 'ck-experiment-'+hashlib.sha1(i['key'].encode('utf8')).hexdigest()[:16])
 
-              if si=='': si=cplot.get('sort_index','')
-              if sxwl=='': sxwl=cplot.get('substitute_x_with_loop','')
-              if axl=='': axl=cplot.get('add_x_loop','')
-              if sptg=='': sptg=cplot.get('separate_permanent_to_graphs','')
-              if sptg=='yes':
-                 if 'features' not in ljf: ljf.append('features')
+    try:
+       f=open(pq+'.lock', 'a+')
+    except Exception as e:
+       return {'return':1, 'error':'can\'t open lock queue file '+pq+'.lock ('+format(e)+')'}
 
+    # Take ticket (queue file keeps next ticket and the first ticket which may be still active)
+    try:
+       fcntl.flock(f.fileno(), fcntl.LOCK_EX)
 
-           dirList=os.listdir(p)
+       f.seek(0)
+       x=f.read().split()
+       nt=int(x[0]) if len(x)>0 else 0
+       ft=int(x[1]) if len(x)>1 else 0
 
-           added=False
-           for fn in sorted(dirList):
-               permanent=False
-               xpermanent=False
-               if fn.endswith('.flat.json'):
-                  pp1=fn[:-10]
-                  pp2=pp1[4:]
-                  drz={}
+       t=open(pq+'-'+str(nt)+'.lock', 'w')
+       fcntl.flock(t.fileno(), fcntl.LOCK_EX)
 
-                  skip=False
+       f.seek(0)
+       f.truncate()
+       f.write(str(nt+1)+' '+str(ft))
+       f.flush()
+    except Exception as e:
+       f.close()
+       return {'return':1, 'error':'can\'t take ticket in lock queue '+pq+'.lock ('+format(e)+')'}
+    finally:
+       if not f.closed:
+          fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
-                  fpf1=os.path.join(p, pp1+'.features_flat.json')
-                  rz=ck.load_json_file({'json_file':fpf1})
-                  if rz['return']==0: 
-                     drz=rz['dict']
+    if o=='con':
+       ck.out('    Waiting in local lock queue ('+str(nt-ft)+' writer(s) ahead) ...')
 
-                  if len(prune_points)>0 and pp2 not in prune_points:
-                     skip=True
+    poll=float(cfg.get('lock_queue_poll',0.01))
 
-                  if not skip and (gop=='yes' or (len(drz)>0 and len(ffeatures)>0)):
-                     if gop!='yes':
-                        rx=ck.compare_flat_dicts({'dict1':drz, 'dict2':ffeatures, 'ignore_case':'yes', 'space_as_none':'yes', 'keys_to_ignore':fkti})
-                        if rx['return']>0: return rx
-                        equal=rx['equal']
-                        if equal!='yes': skip=True
+    # Wait for all previous writers in order of tickets
+    for m in range(ft, nt):
+        try:
+           pf=open(pq+'-'+str(m)+'.lock', 'r')
+        except (IOError, OSError):
+           continue # already finished
 
-                     if o=='con' and not skip:
-                        ck.out('     Found point with related features ('+ruoa+':'+muoa+':'+duoa+'/'+pp2+') ...')
+        while True:
+            try:
+               fcntl.flock(pf.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+               break
+            except (IOError, OSError):
+               pass
 
-                  if skip:
-                     continue
+            tm=time.time()-start_time
+            if tm>=timeout:
+               pf.close()
+               f.close()
+               unlock_queue(t)
+               return {'return':32, 'error':'timeout while waiting in local lock queue'}
 
-                  ppx={'repo_uoa':ruoa, 'repo_uid':ruid, 'module_uoa':muoa, 'module_uid':muid, 'data_uoa':duoa, 'data_uid':duid, 'point_uid':pp2}
+            time.sleep(min(poll, timeout-tm))
 
-                  # If load json files ...
-                  if len(ljf)>0:
-                     for jf in ljf:
-                         pj=os.path.join(p,pp1+'.'+jf+'.json')
+        pf.close()
 
-                         rx=ck.load_json_file({'json_file':pj})
-                         if rx['return']>0: return rx
+    # All previous tickets are finished
+    try:
+       fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+       f.seek(0)
+       x=f.read().split()
+       if len(x)>1 and int(x[1])<nt:
+          f.seek(0)
+          f.truncate()
+          f.write(x[0]+' '+str(nt))
+          f.flush()
+    except Exception:
+       pass
+    finally:
+       fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+       f.close()
 
-                         dpj=rx['dict']
+    return {'return':0, 'handle':t, 'lock_wait_time':time.time()-start_time}
 
-                         if len(gkjf)>0:
-                            x={}
-                            for k in gkjf:
-                                x[k]=dpj.get(k, None)
+##############################################################################
+# internal function to leave local queue of writers (ticket file is removed after releasing it)
 
-                            y=dpj.get('permanent','')
-                            if y!='': x['permanent']=y
+def unlock_queue(f):
 
-                            dpj=x
+    if f!=None:
+       import fcntl
+       fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+       f.close()
 
-                         ppx[jf]=dpj
+       try:
+          os.remove(f.name)
+       except OSError:
+          pass
 
-                  # If separate permanent points
-                  u1=ppx.get('features',{}).get('permanent','')
-                  if u1=='yes':
-                     xpermanent=True
-                     if sptg=='yes':
-                        permanent=True
+    return
 
-                  if spp=='yes' and u1=='yes':
-                     ppoints.append(ppx)
-                  else:
-                     points.append(ppx)
+##############################################################################
+# internal function to record one point (subpoint) in an already loaded and locked entry (see "add")
 
-                  added=True
+def record_point(i):
 
-                  if sl!='yes':
-                     fpflat1=os.path.join(p, fn)
+    o=i.get('out','')
 
-                     r=ck.load_json_file({'json_file':fpflat1})
-                     if r['return']>0: return r
-                     df=r['dict']
+    oo=''
+    if o=='con': oo=o
 
-                     # Iterate over combinations of keys
-                     for fkl in fkls:
-                         # Create final vector (X,Y,Z,...)
-                         vect=[]
-                         has_none=False
-                         has_empty_string=False
-                         if fki!='' or len(fkl)==0:
-                            # Add all sorted (otherwise there is no order in python dict)
-                            for k in sorted(df.keys()):
-                                if (fki=='' or k.startswith(fki)) and (fkie=='' or k.endswith(fkie)):
-                                   if len(rfkl)==0:
-                                      trfkl.append(k)
-                                   v=df[k]
-                                   if v==None: has_none=True
-                                   if v=='': has_empty_string=True
-                                   if v!=None and type(v)==list:
-                                      if len(v)==0: v=None
-                                      else: 
-                                         if el!='yes':
-                                            v=v[0]
-                                   vect.append(v)
+    p=i['path']
+    dde=i['entry_dict']
+    euid=i['entry_uid']
+    fidx=i.get('features_index',None)
 
-                                   # Check if range
-                                   if fkie!='' and fkied!='':
-                                      kb=k[:len(k)-len(fkie)]
-                                      kbd=kb+fkied
-                                      if len(rfkl)==0:
-                                         trfkl.append(kbd)
-                                      vd=df.get(kbd, None)
-                                      if vd==None: has_none=True
-                                      if vd=='': has_empty_string=True
-                                      if vd!=None and type(vd)==list:
-                                         if len(vd)==0: vd=None
-                                         else: 
-                                            if el!='yes':
-                                               vd=vd[0]
+    ssa=i.get('skip_stat_analysis','')
 
-                                      vect.append(vd)
+    ddx=i['dict']
+    dddc=i.get('dict_to_compare', {})
 
-                            if len(trfkl)!=0:
-                               rfkl=trfkl
-                         else:
-                            for kx in fkl:
-                                k=kx+xfkl
-                                v=df.get(k,None)
-                                if v==None: has_none=True
-                                if v=='': has_empty_string=True
-                                if v!=None and type(v)==list:
-                                   if len(v)==0: v=None
-                                   else: 
-                                      if el!='yes':
-                                         v=v[0]
-                                vect.append(v)
+    ft=ddx.get('features', {})
+    choices=ddx.get('choices', {})
+    choices_order=ddx.get('choices_order', [])
 
-                         # Add vector (if valid)
-                         sigraph=str(igraph)
+    ddeps=ddx.get('dependencies',{})
 
-                         if sigraph not in table: 
-                            table[sigraph]=[]
-                            mtable[sigraph]=[]
+    ch=ddx.get('characteristics', {})
 
-                         sigraph1=str(igraph+1)
-                         if permanent:
-                            table[sigraph1]=[]
-                            mtable[sigraph1]=[]
+    recp=i.get('record_permanent','')
 
-                         if el=='yes':
-                            max_length=0
-                            for ih in range(0, len(vect)):
-                                vih=vect[ih]
-                                if vih!=None:
-                                   max_length=max(max_length, len(vih))
+    # Check if characteristics lits (to add a number of experimental results at the same time,
+    #   otherwise point by point processing can become very slow
+    chl=ddx.get('characteristics_list', [])
+    if len(ch)>0: chl.append(ch)
 
-                            for q in range(0, max_length):
-                                vect1=[]
-                                for ih in range(0, len(vect)):
-                                    h=vect[ih]
-                                    if q<len(h): v1=h[q]
-                                    else: v1=h[len(h)-1]
-                                    vect1.append(v1)
-                                if permanent:
-                                   table[sigraph1].append(vect1)
-                                else:
-                                   table[sigraph].append(vect1)
-                         else:
-                            if (ipin!='yes' or not has_none) and (ipies!='yes' or not has_empty_string):
-                               skip=False
+    ddesc={'features_desc':ddx.get('features_desc', {}),
+           'choices_desc':ddx.get('choices_desc', {}),
+           'characteristics_desc':ddx.get('characteristics_desc',{})}
 
-                               if len(vt)>0:
-                                  for o in range(0, len(vt)):
-                                      vx=vt[o]
-                                      vxo=vect[o]
-                                      if vx!=None:
-                                         xvtc='<'
-                                         if len(vtc)>0 and o<len(vtc) and vtc[o]!=None:
-                                            xvtc=vtc[o]
+    sk=i.get('sort_keys','')
 
-                                         if (xvtc=='<' and vxo>vx) or (xvtc=='>' and vxo<vx): 
-                                            skip=True
-                                            break
+    spbf=i.get('search_point_by_features','')
 
-                               if not skip:
-                                  if permanent:
-                                     table[sigraph1].append(vect)
-                                  else:
-                                     table[sigraph].append(vect)
+    cmpr=i.get('features_keys_to_process','') # keys to search similar and already existing points 
+    if cmpr=='': cmpr=['##features#*', '##choices#*', '##choices_order#*']
 
-                         # Add misc info:
-                         mi={'repo_uoa':ruid, 'module_uoa':muid, 'data_uoa':duid,
-                             'point_uid':pp2, 'features':drz}
+    sf=i.get('skip_flatten','')
 
-                         if xpermanent:
-                            mi['permanent']='yes'
+    sak=i.get('process_multi_keys','') # Keys to perform stat analysis
+    if sak=='': sak=['##characteristics#*', '##features#*', '##choices#*', '##pipeline_state#*']
 
-                         if permanent:
-                            mtable[sigraph1].append(mi)
-                         else:
-                            mtable[sigraph].append(mi)
+    ras=i.get('record_all_subpoints','')
+    rdesc=i.get('record_desc_at_each_point','')
+    rdeps=i.get('record_deps_at_each_point','')
 
-                         if sstg=='yes' or len(fkls)>1:
-                            igraph+=1
+    # If existing experiment found, check if search point by feature
+    ddft={'features':ft, 'choices':choices, 'choices_order':choices_order}
 
-           if sstg!='yes' and added and igs!='yes':
-              igraph+=1
+    # Flatten and prune features and choices (to be able to faster detect related points for a given experiment later)
+    r=ck.flatten_dict({'dict':ddft, 'prune_keys':cmpr})
+    if r['return']>0: return r
+    fddft=r['dict']
 
-    if len(rfkl)==0 and len(fkls)!=0 and len(fkls[0])>0: 
-       rfkl=fkls[0]
+    # Find related point by features and/or choices
+    fpoint=''
+    fpoint_uid=''
+    if euid!='' and spbf=='yes':
+       if o=='con': ck.out('    Searching points by features (and choices if needed) ...')
 
-    # If sort/substitute
-    if si!='':
-       rx=sort_table({'table':table, 'sort_index':si})
-       if rx['return']>0: return rx
-       table=rx['table']
+       if fidx!=None:
+          r=get_points_by_features(fidx, features_digest(fddft))
+          if r['return']>0: return r
+          points=r['points']
 
-    # Substitute all X with a loop (usually to sort Y and compare with predictions in scatter graphs, etc)
-    ii={'table':table}
-    if sxwl=='yes' or axl=='yes':
-       if axl=='yes':
-          ii['add_x_loop']='yes'
-       rx=substitute_x_with_loop(ii)
-       if rx['return']>0: return rx
-       table=rx['table']
+          # Skip points marked as deleted (still in index until "compact")
+          if len(points)>0:
+             r=load_tombstones(p)
+             if r['return']>0: return r
+             tomb=r['tombstones']
 
-    return {'return':0, 'table':table, 'mtable':mtable, 'real_keys':rfkl, 'points':points, 'ppoints':ppoints, 
-                        'merged_meta':mm, 'plot_info_from_scenario':plot_info_from_scenario}
+             points=[x for x in points if x not in tomb]
+       else:
+          rx=list_points({'path':p, 
+                          'prune_by_features':fddft})
+          if rx['return']>0: return rx
 
-##############################################################################
-# Convert experiment table to CSV
+          points=rx['points']
 
-def convert_table_to_csv(i):
-    """
+       if len(points)>1:
+          return {'return':1, 'error':'ambiguity - more than one point found with the same features'}
 
-    Input:  {
-              table                - experiment table
-              (merge_multi_tables) - if 'yes', merge multiple tables to one
-              keys                 - list of keys
-              (keys_desc)          - dict with desc of keys
-              file_name            - output file for CSV
-              csv_no_header        - if 'yes', do not add header
-              (csv_separator)      - CSV entry separator (default ;)
-              (csv_decimal_mark)   - CSV decimal mark    (default .)
+       if len(points)==1:
+          fpoint_uid=points[0]
+          fpoint='ckp-'+fpoint_uid
 
-            }
+       if fpoint!='':
+          if o=='con': 
+             ck.out('      Found point by features: '+str(fpoint))
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
-            }
+          # Reload feature file from this point to get number of subpoints
+          px=os.path.join(p, fpoint+'.features.json')
+          rx=ck.load_json_file({'json_file':px})
+          if rx['return']>0: return rx
+          ddft=rx['dict']
 
-    """
+    # Prepare new point (if not found by features)
+    if fpoint=='':
+       ipoints=int(dde.get('points','0'))+1
 
-    tbl=i['table']
-    keys=i['keys']
-    keys_desc=i.get('keys_desc',{})
+       rx=ck.gen_uid({})
+       if rx['return']>0: return rx
+       uid=rx['data_uid']
+ 
+       fpoint_uid=uid
+       fpoint='ckp-'+uid
 
-    mmt=i.get('merge_multi_tables','')
-    if mmt=='yes':
-       tbl1=[]
-       for g in sorted(tbl, key=int):
-           for j in tbl[g]:
-               tbl1.append(j)
-       tbl=tbl1
+       dde['points']=str(ipoints)
 
-    fout=i['file_name']
+       if fidx!=None:
+          r=add_point_to_features_index(fidx, features_digest(fddft), uid)
+          if r['return']>0: return r
 
-    sep=i.get('csv_separator',';')
-    if sep=='': sep=';'
+       if o=='con': ck.out('  Prepared new point '+uid+' ...')
 
-    dec=i.get('csv_decimal_mark',',')
-    if dec=='': dec=','
+    # Check if need to flat and basic perform analysis
+    mdpt=i.get('max_range_percent_threshold',-1)
+    mmin=''
+    mmax=''
 
-    c=''
+    ddflat={}
+    rsa={}
+    if sf!='yes':
+       # Pre-load flattened data, if already exists
+       fpflat1=os.path.join(p, fpoint+'.flat.json')
 
-    # Prepare description line
-    line=''
-    if i.get('csv_no_header','')!='yes':
-       for k in keys:
-           if line!='': line+=sep
-           line+='"'+k+'"'
-       c+=line+'\n'
-
-    # Iterate over data
-    for t in tbl:
-        line=''
-        for k in range(0, len(keys)):
-            if line!='': line+=sep
-            v=t[k]
-
-            if type(v)==float:
-               v=str(v).replace(',', dec)
-            elif type(v)==int:
-               v=str(v)
-            else:
-               v='"'+str(v)+'"'
-            line+=v
-        c+=line+'\n'
+       okeys=None
+       if os.path.isfile(fpflat1):
+          r=ck.load_json_file({'json_file':fpflat1})
+          if r['return']>0: return r
+          ddflat=r['dict']
 
-    try:
-       f=open(fout,'wt')
-       f.write(c+'\n');
-       f.close()
-    except Exception as e:
-       return {'return':1, 'error':'problem writing csv file ('+format(e)+')'}
+       # Pre-load running statistics (to update min/max/mean without rescanning all values)
+       r=load_running_stats(p, fpoint)
+       if r['return']>0: return r
+       rss=r['stat_state']
 
-    return {'return':0}
+       # Check sample store of this point (if used)
+       r=load_samples(p, fpoint, ddflat, [])
+       if r['return']>0: return r
+       sidx=r['index']
+       skk=sidx.get('keys',{})
+
+       # New values are only appended to sample store if running statistics are in sync with it,
+       # otherwise all recorded values are loaded
+       sst={}
+       if len(skk)>0:
+          sapp=True
+          for k in skk:
+              if rss.get(k,{}).get('count',-1)!=skk[k]['count']:
+                 sapp=False
+                 break
 
-##############################################################################
-# Process multiple experiments (flatten array + apply statistics)
+          if sapp:
+             ser=i.get('sample_store_exp_refresh','')
+             if ser=='': ser=cfg.get('sample_store_exp_refresh',0)
 
-def stat_analysis(i):
-    """
+             sst={'path':p, 'point':fpoint, 'exp_refresh':float(ser), 'counts':{}}
+             for k in skk:
+                 sst['counts'][k]=skk[k]['count']
+          else:
+             r=load_samples(p, fpoint, ddflat)
+             if r['return']>0: return r
 
-    Input:  {
-              dict                  - existing flat dict 
-              dict1                 - new flat dict to add
-                                      if empty, no stat analysis
+       if os.path.isfile(fpflat1):
+          okeys=set(ddflat.keys())
+          if len(sst)>0:
+             okeys.update(samples_keys(skk))
+
+       uss=i.get('sample_store','')
+       if uss=='': uss=cfg.get('sample_store','')
+       if len(sidx)>0: uss='yes'
+       elif uss=='yes':
+          try:
+             import numpy
+          except ImportError:
+             uss='no'
 
-              (dict_compare)        - calculate improvements over this dict if present
+       # Perform statistical analysis of (multiple statistical) characteristics
+       rsa=multi_stat_analysis({'flat_dict':ddflat,
+                                'dict_to_add':ddx,
+                                'dict_to_compare':dddc,
+                                'process_multi_keys':sak,
+                                'skip_stat_analysis':ssa,
+                                'batch_stat_analysis':i.get('batch_stat_analysis',''),
+                                'kde_mode':i.get('kde_mode',''),
+                                'stat_state':rss,
+                                'sample_store':sst,
+                                'out':oo})
+       if rsa['return']>0: return rsa
 
-              (skip_expected_value) - if 'yes', do not calculute expected value
-              (skip_min_max)        - if 'yes', do not calculate min, max, mean, etc
+       ddflat=rsa['dict_flat']
+       mdp=rsa['max_range_percent']
+       mmin=rsa['min']
+       mmax=rsa['max']
 
-                 For expected value (via gaussian_kde):
+       # Load recorded values if new ones can't be appended to sample store (type of key changed)
+       if len(sst)>0 and not samples_fit(ddflat, skk):
+          dh={}
+          r=load_samples(p, fpoint, dh)
+          if r['return']>0: return r
 
-              (bins)                - number of bins (int, default = 100)
-              (cov_factor)          - float covariance factor
+          for k in skk:
+              k_all=k+'#all'
+              ddflat[k_all]=dh[k_all]+ddflat.get(k_all,[])
+              ddflat[k+'#all_unique']=list(dict.fromkeys(ddflat[k_all]))
 
-              (skip_stat_analysis)  - if 'yes', just flatten array and add #min
-            }
+          sst={}
 
-    Output: {
-              return            - return code =  0, if successful
-                                              >  0, if error
-              (error)           - error text if return > 0
+       # Save updated flat file (and append new values to sample store)
+       ddflat1=ddflat
+       if uss=='yes':
+          r=save_samples(p, fpoint, ddflat, sidx, append=(len(sst)>0))
+          if r['return']>0: return r
+          ddflat1=r['dict']
 
-              dict              - updated dict
-              max_range_percent - max % range in float/int data (useful to record points with unusual behavior)
-              min               - 'yes', if one of monitored values reached min
-              max               - 'yes', if one of monitored values reached max
-            }
+       # Keep names of lists from sample store (for summary and schema of keys)
+       dsum=ddflat
+       if len(sst)>0:
+          dsum=dict(ddflat)
+          for k in samples_keys(skk):
+              if k not in dsum: dsum[k]=[]
 
-    """
+       r=ck.save_json_to_file({'json_file':fpflat1, 'dict':ddflat1, 'sort_keys':sk})
+       if r['return']>0: return r
 
-    issa=False
-    ssa=i.get('skip_stat_analysis','')
-    if ssa=='yes': issa=True
+       # Save summary projection (scalar keys only) for fast tables (if used)
+       if cfg.get('summary','')=='yes':
+          r=save_summary(p, fpoint, dsum)
+          if r['return']>0: return r
 
-    d=i['dict']
-    d1=i['dict1']
+       # Update schema of flat keys of points (if used)
+       ksch=i.get('keys_schema',None)
+       if ksch!=None:
+          update_keys_schema(ksch, okeys, dsum)
 
-    dc=i.get('dict_compare',{})
+       if ssa!='yes':
+          r=save_running_stats(p, fpoint, rsa['stat_state'])
+          if r['return']>0: return r
 
-    compare=False
-    if len(dc)>0:
-       compare=True
+    # Check if record all points or only with max_range_percent > max_range_percent_threshold
+    sp=ddft.get('sub_points',0)
+    if sp==0 or ras=='yes' or ((mdpt!=-1 and mdp>mdpt) or mmin=='yes' or mmax=='yes'):
+       sp+=1
+#       if sp>9999:
+#          return {'return':1, 'error':'max number of subpoints is reached (9999)'}
 
-    max_range_percent=0
-    mmin=''
-    mmax=''
+       if o=='con': ck.out('      Subpoint: '+str(sp))
 
-    sev=i.get('skip_expected_value','')
-    smm=i.get('skip_min_max','')
+       ddft['sub_points']=sp
+       ssp='.'+str(sp).zfill(4)
 
-    bins=i.get('bins','')
-    cov_factor=i.get('cov_factor','')
+       fssp=fpoint+ssp+'.json'
+       fssp1=os.path.join(p, fssp)
 
-    for k in d1:
-        vv1=d1[k]
+       # Prepare what to write
+       dds={'features':ft,
+            'choices':choices,
+            'choices_order':choices_order,
+            'characteristics_list':chl}
 
-        # If float or int, perform basic analysis
-        if type(vv1)!=list: vv1=[vv1]
-        for v1 in vv1:
-            if not issa:
-               # Number of repetitions
-               k_repeats=k+'#repeats'
-               vr=d.get(k_repeats,0)
-               vr+=1
-               d[k_repeats]=vr
+       # Save subpoint dict to file
+       r=ck.save_json_to_file({'json_file':fssp1, 'dict':dds, 'sort_keys':sk})
+       if r['return']>0: return r
 
-               # Put all values (useful to calculate means, deviations, etc)
-               k_all=k+'#all'
-               v_all=d.get(k_all,[])
-               v_all.append(v1)
-               d[k_all]=v_all
+    if recp=='yes':
+       ddft['permanent']='yes'
 
-               # Put only unique values 
-               k_all_u=k+'#all_unique'
-               v=d.get(k_all_u,[])
-               if v1 not in v: v.append(v1)
-               d[k_all_u]=v
+    # Save features file (that include subpoint)
+    pfp=os.path.join(p, fpoint)+'.features.json'
+    r=ck.save_json_to_file({'json_file':pfp, 'dict':ddft, 'sort_keys':sk})
+    if r['return']>0: return r
 
-            if not issa and smm!='yes' and (type(v1)==float or type(v1)==int or type(v1)==ck.type_long):
-               # Calculate min
-               k_min=k+'#min'
-               vmin=d.get(k_min,v1)
+    # Save flattened features file
+    pfpf=os.path.join(p, fpoint)+'.features_flat.json'
+    r=ck.save_json_to_file({'json_file':pfpf, 'dict':fddft, 'sort_keys':sk})
+    if r['return']>0: return r
 
-               for b in v_all:
-                   if b<vmin: vmin=b
+    # Save universal descriptions of (all) dimensions
+    pfpd=os.path.join(p, fpoint)+'.desc.json'
+    if rdesc=='yes':
+       r=ck.save_json_to_file({'json_file':pfpd, 'dict':ddesc})
 
-               if v1<vmin: 
-                  vmin=v1
-                  mmin='yes'
-               d[k_min]=vmin
+    # Save dependencies for experiment
+    pfpds=os.path.join(p, fpoint)+'.deps.json'
+    if rdeps=='yes':
+       r=ck.save_json_to_file({'json_file':pfpds, 'dict':ddeps})
 
-               if compare:
-                  cvmin=dc.get(k_min, None)
-                  if cvmin!=None and vmin!=0 and vmin!=0.0:
-                     d[k+'#min_imp']=float(cvmin)/float(vmin)
+    return {'return':0, 'dict_flat':ddflat, 
+                        'stat_analysis':rsa, 
+                        'flat_features':fddft,
+                        'point':fpoint_uid,
+                        'sub_point':sp}
 
-               # Calculate max
-               k_max=k+'#max'
-               vmax=d.get(k_max,v1)
+##############################################################################
+# internal function to prepare matcher of points by flat features
+#
+# Matching is equivalent to ck.compare_flat_dicts of point features with given features
+# (with ignore_case, space_as_none and keys_to_ignore wildcards), but given features
+# are normalized once, wildcards are checked once per key and each point is compared
+# as a set of normalized (key, value) pairs
 
-               for b in v_all:
-                   if b>vmax: vmax=b
+def compile_features_matcher(i):
 
-               if v1>vmax: 
-                  vmax=v1
-                  mmax='yes'
-               d[k_max]=vmax
+    ic=(i.get('ignore_case','')=='yes')
 
-               if compare:
-                  cvmax=dc.get(k_max, None)
-                  if cvmax!=None and vmax!=0 and vmax!=0.0:
-                     d[k+'#max_imp']=float(cvmax)/float(vmax)
+    san=None
+    if i.get('space_as_none','')=='yes': san=''
 
-               # Calculate #range (max-min)
-               k_range=k+'#range'
-               vrange=vmax-vmin
-               d[k_range]=vrange
+    m={'ignore_case':ic, 'none':san, 'keys_to_ignore':i.get('keys_to_ignore',[]), 'ignored':{}}
 
-               # Calculate #halfrange (max-min)/2
-               k_halfrange=k+'#halfrange'
-               vhrange=vrange/2
-               d[k_halfrange]=vhrange
+    m['features']=normalize_features(m, i.get('features',{}))
 
-               # Calculate #halfrange (max-min)/2
-               k_center=k+'#center'
-               vcenter=vmin+vhrange
-               d[k_center]=vcenter
+    return {'return':0, 'matcher':m}
 
-               if compare:
-                  cvcenter=dc.get(k_center, None)
-                  if cvcenter!=None and vcenter!=0 and vcenter!=0.0:
-                     d[k+'#center_imp']=float(cvcenter)/float(vcenter)
+##############################################################################
+# internal function to normalize flat features for matcher (set of (key, value) without ignored keys and "none" values)
 
-               # Calculate #range percent (max-min)/min
-               if vmin!=0:
-                  vp=(vmax-vmin)/vmin
-                  k_range_p=k+'#range_percent'
-                  d[k_range_p]=vp
-                  if vp>max_range_percent: max_range_percent=vp
+def normalize_features(m, d):
 
-               # Calculate mean
-               k_mean=k+'#mean'
-               va=sum(d[k_all])/float(vr)
-               d[k_mean]=va
+    import fnmatch
 
-               if compare:
-                  cva=dc.get(k_mean, None)
-                  if cva!=None and va!=0 and va!=0.0:
-                     d[k+'#mean_imp']=float(cva)/float(va)
+    ic=m['ignore_case']
+    san=m['none']
+    kti=m['keys_to_ignore']
+    ignored=m['ignored']
 
-               if sev!='yes':
-                  # Check density, expected value and peaks
-                  rx=ck.access({'action':'analyze',
-                                'module_uoa':cfg['module_deps']['math.variation'],
-                                'characteristics_table':d[k_all],
-                                'bins':bins,
-                                'cov_factor':cov_factor,
-                                'skip_fail':'yes'})
-                  if rx['return']>0: return rx
+    x=[]
+    for k in d:
+        if len(kti)>0:
+           ik=ignored.get(k,None)
+           if ik==None:
+              ik=False
+              for q in kti:
+                  if fnmatch.fnmatch(k, q):
+                     ik=True
+                     break
+              ignored[k]=ik
+           if ik: continue
 
-                  valx=rx['xlist2s']
-                  valy=rx['ylist2s']
+        v=d[k]
+        if ic and type(v)==str: v=v.lower()
 
-                  if len(valx)>0:
-                     k_exp=k+'#exp'
-                     vexp=valx[0]
-                     d[k_exp]=vexp
+        if v==san and type(v)==type(san): continue
 
-                     if compare:
-                        cvexp=dc.get(k_exp, None)
-                        if cvexp!=None and vexp!=0 and vexp!=0.0:
-                           d[k+'#exp_imp']=float(cvexp)/float(vexp)
+        if type(v)==list or type(v)==dict:
+           import json
+           v=('#json', json.dumps(v, sort_keys=True))
 
-                     k_exp_allx=k+'#exp_allx'
-                     d[k_exp_allx]=valx
+        x.append((k, v))
 
-                     k_exp_ally=k+'#exp_ally'
-                     d[k_exp_ally]=valy
+    return frozenset(x)
 
-                     warning='no'
-                     if len(valx)>1: warning='yes'
-                     k_exp_war=k+'#exp_warning'
-                     d[k_exp_war]=warning
-            else:
-               # Add first value to min 
-               k_min=k+'#min'
-               vmin=d.get(k_min,'')
-               if vmin=='':
-                  mmin='yes'
-                  d[k_min]=v1
+##############################################################################
+# internal function to check if flat features of a point match matcher
 
-               if compare:
-                  cvmin=dc.get(k_min, None)
-                  if cvmin==vmin:
-                     d[k+'#min_imp']=1
-                  else:
-                     d[k+'#min_imp']=0
+def match_features(m, d):
 
-    return {'return':0, 'dict':d, 'max_range_percent':max_range_percent, 'min':mmin, 'max':mmax}
+    return normalize_features(m, d)==m['features']
 
 ##############################################################################
-# sort table
+# internal function to get digest of flat features of a point (equal for the same features
+# as compared by list_points with prune_by_features, i.e. missing keys and empty strings are the same)
 
-def sort_table(i):
-    """
-    Input:  {
-              table        - experiment table
-              sort_index   - if !='', sort by this number within vector (i.e. 0 - X, 1 - Y, etc)
-            }
+def features_digest(d):
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
+    import hashlib
+    import json
 
-              table        - updated experient table
-            }
+    dd={}
+    for k in d:
+        v=d[k]
+        if v!='':
+           dd[k]=canonical_feature_value(v)
 
-    """
+    return hashlib.sha1(json.dumps(dd, sort_keys=True).encode('utf8')).hexdigest()
 
-    table=i['table']
-    si=i['sort_index']
+##############################################################################
+# internal function to normalize feature value (1, 1.0 and True are equal)
 
-    isi=int(si)
-    for sg in table:
-        x=table[sg]
-        y=sorted(x, key=lambda var: 0 if var[isi] is None else var[isi])
-        table[sg]=y
+def canonical_feature_value(v):
 
-    return {'return':0, 'table':table}
+    if type(v)==bool or type(v)==int or type(v)==ck.type_long:
+       v=int(v)
+    elif type(v)==float:
+       if v==v and v not in [float('inf'), float('-inf')] and v==int(v):
+          v=int(v)
+       else:
+          v=v+0.0
+    elif type(v)==list:
+       v=[canonical_feature_value(q) for q in v]
+    elif type(v)==dict:
+       v={k:canonical_feature_value(v[k]) for k in v}
+
+    return v
 
 ##############################################################################
-# substitute x axis in table with loop
+# internal function to load index of points in an entry by digest of their flat features
+#
+# Index is kept in the entry in features_index/<first 2 chars of digest>.json
+# (digest -> list of point UIDs) with features_index/info.json (number of points in index
+# and value of "points" in the entry meta when index was saved), so that only one small file
+# should be loaded to find a point. Index is rebuilt if it is missing or the number of points
+# doesn't match (for example, when points were added or deleted without updating index).
 
-def substitute_x_with_loop(i):
+def load_features_index(i):
+
+    p=i['path']
+
+    pi=os.path.join(p, features_index_dir)
+    pinfo=os.path.join(pi, 'info.json')
+
+    valid=False
+    info={}
+    if os.path.isfile(pinfo):
+       r=ck.load_json_file({'json_file':pinfo})
+       if r['return']==0:
+          info=r['dict']
+
+          ep=i.get('entry_points',None)
+          nps=i.get('points',None)
+
+          if (ep!=None and info.get('entry_points','')==str(ep)) or \
+             (nps!=None and info.get('points',-1)==nps):
+             valid=True
+
+    fidx={'path':p, 'points':info.get('points',0), 'entry_points':info.get('entry_points',''),
+          'buckets':{}, 'changed':[]}
+
+    if not valid:
+       if i.get('rebuild','')!=True and i.get('rebuild','')!='yes':
+          return {'return':0, 'index':None}
+
+       # Rebuild index from all points
+       fidx['points']=0
+       fidx['entry_points']=str(i.get('entry_points',''))
+
+       dirList=os.listdir(p)
+       for fn in sorted(dirList):
+           if fn.startswith('ckp-') and fn.endswith('.features_flat.json') and len(fn)>20 and fn[20]=='.':
+              uid=fn[4:20]
+
+              rx=ck.load_json_file({'json_file':os.path.join(p, fn)})
+              if rx['return']>0: return rx
+
+              dg=features_digest(rx['dict'])
+
+              b=dg[:2]
+              if b not in fidx['buckets']: fidx['buckets'][b]={}
+              if dg not in fidx['buckets'][b]: fidx['buckets'][b][dg]=[]
+              fidx['buckets'][b][dg].append(uid)
+
+              fidx['points']+=1
+
+       # All buckets should be rewritten (including empty ones)
+       if os.path.isdir(pi):
+          for fn in os.listdir(pi):
+              if fn!='info.json' and fn.endswith('.json'):
+                 b=fn[:-5]
+                 if b not in fidx['buckets']: fidx['buckets'][b]={}
+
+       fidx['changed']=list(fidx['buckets'].keys())
+
+    return {'return':0, 'index':fidx, 'rebuilt':(not valid)}
+
+##############################################################################
+# internal function to get points from index by digest of flat features
+
+def get_points_by_features(fidx, dg):
+
+    b=dg[:2]
+    bb=fidx['buckets']
+
+    if b not in bb:
+       bb[b]={}
+
+       pb=os.path.join(fidx['path'], features_index_dir, b+'.json')
+       if os.path.isfile(pb):
+          r=ck.load_json_file({'json_file':pb})
+          if r['return']>0: return r
+          bb[b]=r['dict']
+
+    return {'return':0, 'points':bb[b].get(dg,[])}
+
+##############################################################################
+# internal function to add new point to index
+
+def add_point_to_features_index(fidx, dg, uid):
+
+    r=get_points_by_features(fidx, dg)
+    if r['return']>0: return r
+
+    b=dg[:2]
+    bb=fidx['buckets'][b]
+
+    if dg not in bb: bb[dg]=[]
+    bb[dg].append(uid)
+
+    fidx['points']+=1
+
+    if b not in fidx['changed']: fidx['changed'].append(b)
+
+    return {'return':0}
+
+##############################################################################
+# internal function to remove point from index
+
+def remove_point_from_features_index(fidx, dg, uid):
+
+    r=get_points_by_features(fidx, dg)
+    if r['return']>0: return r
+
+    b=dg[:2]
+    bb=fidx['buckets'][b]
+
+    if uid in bb.get(dg,[]):
+       bb[dg].remove(uid)
+       if len(bb[dg])==0: del(bb[dg])
+
+       fidx['points']-=1
+
+       if b not in fidx['changed']: fidx['changed'].append(b)
+
+    return {'return':0}
+
+##############################################################################
+# internal function to save changed buckets of index (info is saved the last)
+
+def save_features_index(fidx):
+
+    pi=os.path.join(fidx['path'], features_index_dir)
+    if not os.path.isdir(pi):
+       os.makedirs(pi)
+
+    for b in fidx['changed']:
+        pb=os.path.join(pi, b+'.json')
+
+        if len(fidx['buckets'][b])==0:
+           if os.path.isfile(pb): os.remove(pb)
+        else:
+           r=ck.save_json_to_file({'json_file':pb, 'dict':fidx['buckets'][b], 'sort_keys':'yes'})
+           if r['return']>0: return r
+
+    fidx['changed']=[]
+
+    return ck.save_json_to_file({'json_file':os.path.join(pi, 'info.json'), 
+                                 'dict':{'points':fidx['points'], 'entry_points':fidx['entry_points']}})
+
+##############################################################################
+# get points from multiple entries
+
+def get(i):
     """
+
     Input:  {
-              table        - experiment table
-              (add_x_loop) - if 'yes', insert first vector dimension with a loop
+              Select entries or table:
+                 (repo_uoa) or (experiment_repo_uoa)     - can be wild cards
+                 (remote_repo_uoa)                       - if remote access, use this as a remote repo UOA
+                 (module_uoa) or (experiment_module_uoa) - can be wild cards
+                 (data_uoa) or (experiment_uoa) or (experiment_data_uoa)     - can be wild cards
+
+                 (repo_uoa_list)                       - list of repos to search
+                 (module_uoa_list)                     - list of module to search
+                 (data_uoa_list)                       - list of data to search
+
+                 (prune_points)                        - list of points to get
+
+                 (search_dict)                         - search dict
+                 (ignore_case)                         - if 'yes', ignore case when searching
+
+                       OR
+                 (meta)                                - search by meta in the entry (adds search_dict['meta'])
+                 (tags)                                - search by tags in the entry
+
+                 (features)                            - search by features in the entry
+                       OR
+                 (flat_features)                       - search by flat features in the entry (faster) ...
+
+                 (features_keys_to_ignore)             - list of keys to remove from features (can be wildcards) - useful for frontier detection
+
+                       OR 
+
+                 (table)                               - experiment table (if drawing from other functions)
+                 (mtable)                              - misc or meta table related to above table
+                                                         may be useful, when doing labeling for machine learning
+
+              (skip_processing)                        - if 'yes', do not load data (useful to return points for frontier detection)
+              (get_all_points)                         - if 'yes', add all points
+              (load_json_files)                        - list of json files to load for a given point 
+                                                         (features, features_flat, flat, 0001, 0002, etc ...)
+              (get_keys_from_json_files)               - which keys to get from json files (useful for frontier) ...
+
+              (flat_keys_list)                      - list of flat keys to extract from points into table
+              (flat_keys_list_ext)                  - add this extension to all above keys (useful to add #min)
+
+              (flat_keys_list_separate_graphs)      - [ [keys], [keys], ...] - several graphs ...
+
+                                                      (order is important: for example, for plot -> X,Y,Z)
+              (flat_keys_index)                     - add all flat keys starting from this index 
+              (flat_keys_index_end)                 - add all flat keys ending with this index (default #min)
+              (flat_keys_index_end_range)           - add range after key (+-)
+
+              (substitute_x_with_loop)              - if 'yes', substitute first vector dimension with a loop
+              (add_x_loop)                          - if 'yes', insert first vector dimension with a loop
+              (sort_index)                          - if !='', sort by this number within vector (i.e. 0 - X, 1 - Y, etc)
+
+              (ignore_point_if_none)                - if 'yes', ignore points where there is a None
+              (ignore_point_if_empty_string)        - if 'yes', ignore points where there is a None
+              (ignore_graph_separation)             - if 'yes', ignore separating different entries into graphs 
+              (separate_subpoints_to_graphs)        - if 'yes', separate each subpoint of entry into a new graph
+
+              (separate_permanent_to_graphs)        - if 'yes', separate permanent to new graphs (first is always non-permanent ...)(
+
+              (vector_thresholds)                   - List of values: if a given value in this vector is !=None and more than
+                                                        a value in a processed vector - skip it
+              (vector_thresholds_conditions)        - specify threshold conditions for above vector values ("<" - default or ">")
+
+              (expand_list)                         - if 'yes', expand list to separate values (useful for histogram)
+                                                         (all checks for valid vectors or thresholds are currently turned off)
+
+              (skip_scenario_info)                  - if 'yes', do not attempt to pre-load info from the experiment scenario
+              (use_summary)                         - if 'no', always read whole flat json of points
+                                                      (otherwise only summary with scalar keys is read when lists are not needed)
+              (use_catalog)                         - if 'yes', select entries and points from catalogs of repos (see "reindex")
+                                                      instead of searching repos and loading files (if all repos have catalogs)
+              (use_cache)                           - if 'yes', reuse contributions of entries to the table cached in memory
+                                                      by previous calls with the same input (get_cache from module meta by default);
+                                                      cache is validated by names, sizes and mtimes of meta and all files of points
+              (cache_size)                          - max number of cached inputs (get_cache_size from module meta by default)
+              (parallel)                            - if 'threads' or 'processes', prefetch entries and their point files
+                                                      in parallel (table is the same as with sequential loading)
+              (workers)                             - number of parallel workers (number of CPUs by default)
+
+              (compact_journals)                    - if 'yes', merge journals of writers (see "add" with journal='yes')
+                                                      to points before reading them (takes entry lock and updates entry;
+                                                      compact_journals from module meta by default). Otherwise points
+                                                      recorded to journals are not visible until "compact"
+              (separate_permanent_points)           - if 'yes', add permanent points to ppoints ('features' file should be loaded)
             }
 
     Output: {
               return       - return code =  0, if successful
                                          >  0, if error
               (error)      - error text if return > 0
-              table        - updated experient table
+
+              table        - first dimension is for different graphs on one plot
+                             Second dimension: list of vectors [X,Y,Z,...]
+
+              mtable       - misc table - misc info related to above table (UOA, point, etc)
+                             may be useful, when doing labeling for machine learning
+
+              points       - list of points {'repo_uoa','repo_uid','module_uoa','module_uid','data_uoa','data_uid','point_uid', '<file_extension_name>'=dict ...}}
+
+              ppoints      - list of permanent points
+
+              real_keys    - all added keys (useful when flat_keys_index is used)
+
+              merged_meta  - merged meta from all entries
+              plot_info_from_scenario - dict with plot info if experimental scenario is found in the first experiment entry
+
+              cache_hits   - number of entries taken from cache
+              cache_misses - number of entries (re)loaded with cache
             }
 
     """
 
-    table=i['table']
+    import copy
 
-    axl=i.get('add_x_loop','')
+    global get_cache
 
-    if axl=='yes':
-       for q in table:
-           tq=table[q]
-           for iv in range(0, len(tq)):
-               v=tq[iv]
-               v.insert(0, 0.0)
+    o=i.get('out','')
 
-    for sg in table:
-        h=0
-        x=table[sg]
-        for q in range(0, len(x)):
-            h+=1
-            x[q][0]=h
-        table[sg]=x
+    table=i.get('table',{})
+    mtable=i.get('mtable',{})
 
-    return {'return':0, 'table':table}
+    # Find cached contributions of entries to the table for the same input (before input is changed below)
+    gch=None
+    chits=0
+    cmiss=0
 
-##############################################################################
-# filter function
+    ugc=i.get('use_cache','')
+    if ugc=='': ugc=cfg.get('get_cache','')
 
-def get_all_meta_filter(i):
+    if ugc=='yes' and len(table)==0:
+       import json
+       import hashlib
+       import collections
 
-    dd=i.get('dict',{})
-    d=i.get('dict_orig',{})
-    aggr=i.get('aggregation',{})
+       x={}
+       for k in i:
+           if k not in ['out', 'parallel', 'workers', 'use_cache', 'cache_size']:
+              x[k]=i[k]
 
-    ks=aggr.get('keys_start','')
-    ke=aggr.get('keys_end','')
+       ckey=hashlib.md5(json.dumps(x, sort_keys=True, default=str).encode('utf8')).hexdigest()
 
-    ameta=aggr.get('meta',{})
-    atags=aggr.get('tags',{})
-    akeys=aggr.get('keys',[])
+       if get_cache==None: get_cache=collections.OrderedDict()
 
-    # Process meta
-    meta=d.get('meta',{})
-    for k in meta:
-        v=meta[k]
+       # Move to the end of LRU (pop and insert to support Python 2)
+       gch=get_cache.pop(ckey, {})
+       get_cache[ckey]=gch
 
-        if k not in ameta:
-           ameta[k]=[v]
-        else:
-           if v not in ameta[k]:
-              ameta[k].append(v)
+       cs=i.get('cache_size','')
+       if cs=='': cs=cfg.get('get_cache_size',64)
+       cs=int(cs)
+       while len(get_cache)>cs:
+          get_cache.popitem(last=False)
 
-    # Process keys
-    for k in dd:
-        add=True
+    prune_points=i.get('prune_points',[])
 
-        if ks!='' and not k.startswith(ks): add=False
-        if add and ke!='' and not k.endswith(ke): add=False
+    spp=i.get('separate_permanent_points','')
+
+    fki=i.get('flat_keys_index','')
+    fkie=i.get('flat_keys_index_end','#min')
+    fkied=i.get('flat_keys_index_end_range','')
+    fkl=i.get('flat_keys_list',[])
+    xfkl=i.get('flat_keys_list_ext','')
+
+    fkti=i.get('features_keys_to_ignore',[])
+
+    fkls=i.get('flat_keys_list_separate_graphs','')
+    if fkls=='': fkls=[]
+    if len(fkls)==0 or len(fkl)>0: fkls.append(fkl) # at least one combination of keys, even empty!
+
+    rfkl=[] # real flat keys (if all)
+    trfkl=[]
+
+    ipin=i.get('ignore_point_if_none','')
+    ipies=i.get('ignore_point_if_empty_string','')
+    igs=i.get('ignore_graph_separation','')
+    sstg=i.get('separate_subpoints_to_graphs','')
+
+    sl=i.get('skip_processing','')
+    gop=i.get('get_all_points','')
+    ljf=i.get('load_json_files',[])
+    gkjf=i.get('get_keys_from_json_files',[])
+
+    sptg=i.get('separate_permanent_to_graphs','')
+    if sptg=='yes':
+       if 'features' not in ljf: ljf.append('features')
+
+    el=i.get('expand_list','') # useful for histograms
+
+    vt=i.get('vector_thresholds',[])
+    vtc=i.get('vector_thresholds_conditions',[])
+
+    ssi=i.get('skip_scenario_info','')
+
+    cjr=i.get('compact_journals','')
+    if cjr=='': cjr=cfg.get('compact_journals','')
+    usm=i.get('use_summary','')
+
+    points=[]
+    ppoints=[]
+
+    mm={}
+    plot_info_from_scenario={}
+
+    si=i.get('sort_index','')
+    sxwl=i.get('substitute_x_with_loop','')
+    axl=i.get('add_x_loop','')
+
+    if len(table)==0:
+       ruoa=i.get('repo_uoa','')
+       xruoa=i.get('experiment_repo_uoa','')
+       if xruoa!='': ruoa=xruoa
+
+       rruoa=i.get('remote_repo_uoa','')
+
+       muoa=i.get('experiment_module_uoa','')
+       if muoa=='':
+          muoa=i.get('module_uoa','')
+
+       duoa=i.get('experiment_data_uoa','')
+       if duoa=='':
+          duoa=i.get('data_uoa','')
+       if duoa=='':
+          duoa=i.get('experiment_uoa','')
+
+       ruoal=i.get('repo_uoa_list',[])
+       muoal=i.get('module_uoa_list',[])
+       duoal=i.get('data_uoa_list',[])
+
+       sd=i.get('search_dict',{})
+       ic=i.get('ignore_case','')
+
+       meta=i.get('meta',{})
+       if len(meta)>0: sd['meta']=meta
+
+       tags=i.get('tags','')
+
+       table={}
+       mtable={}
+       igraph=0
+
+       features=i.get('features',{})
+       ffeatures=i.get('flat_features',{})
+
+       if len(features)>0 and len(ffeatures)==0:
+          r=ck.flatten_dict({'dict':features})
+          if r['return']>0: return r
+          ffeatures=r['dict']
+
+       # Flat features of points are needed only to filter them or for mtable
+       lfeat=(sl!='yes' or (gop!='yes' and len(ffeatures)>0))
+
+       # Prepare matcher of points by flat features (once for all points)
+       r=compile_features_matcher({'features':ffeatures, 'ignore_case':'yes', 'space_as_none':'yes', 'keys_to_ignore':fkti})
+       if r['return']>0: return r
+       fmatch=r['matcher']
+
+       # Scalar keys to be read from summary of points instead of flat json (if known in advance)
+       pskl=None
+       if sl!='yes' and usm!='no' and fki=='' and el!='yes':
+          pskl=[]
+          for fklx in fkls:
+              if len(fklx)==0:
+                 pskl=None
+                 break
+              for kx in fklx:
+                  pskl.append(kx+xfkl)
+
+       # Select entries and points from catalogs of repos (if requested and possible)
+       lst=None
+       pfe={} # prefetched entries (index in lst -> entry)
+
+       ucat=i.get('use_catalog','')
+       if ucat=='': ucat=cfg.get('catalog','')
+
+       if ucat=='yes' and rruoa=='' and len(ruoal)==0 and len(muoal)==0 and ic!='yes' and \
+          '*' not in ruoa and '?' not in ruoa and \
+          (muoa=='' or muoa==work['self_module_uoa'] or muoa==work['self_module_uid']) and \
+          len([k for k in sd if k!='meta'])==0:
+
+          r=catalog_search({'repo_uoa':ruoa,
+                            'data_uoa':duoa,
+                            'data_uoa_list':duoal,
+                            'meta':sd.get('meta',{}),
+                            'tags':tags,
+                            'prune_points':prune_points,
+                            'flat_features':ffeatures,
+                            'features_keys_to_ignore':fkti,
+                            'all_points':(gop=='yes'),
+                            'load_features':lfeat,
+                            'summary_keys':pskl})
+          if r['return']>0: return r
+
+          if r['lst']!=None:
+             lst=r['lst']
+             for ie in range(0, len(lst)):
+                 pfe[ie]=r['entries'][ie]
+
+             if o=='con':
+                ck.out('Selected '+str(len(lst))+' entries from catalog ...')
+
+       # Search entries
+       if lst==None:
+          ii={'action':'search',
+              'common_func':'yes',
+              'repo_uoa':ruoa,
+              'remote_repo_uoa': rruoa,
+              'module_uoa':muoa,
+              'data_uoa':duoa,
+              'repo_uoa_list':ruoal,
+              'module_uoa_list':muoal,
+              'data_uoa_list':duoal,
+              'search_dict':sd,
+              'ignore_case':ic,
+              'tags':tags}
+          r=ck.access(ii)
+          if r['return']>0: return r
+
+          lst=r['lst']
+
+       # Get signatures of entries to validate cache (files of entry which may be read)
+       sigs={}
+       if gch!=None:
+          for ie in range(0, len(lst)):
+              pe=lst[ie].get('path','')
+              if pe!='':
+                 r=get_entry_signature(pe)
+                 if r['return']==0:
+                    sigs[ie]=r['signature']
+
+       # Prefetch entries and their point files in parallel (if requested) except cached ones
+       par=i.get('parallel','')
+       if len(pfe)==0 and par!='' and par!='no' and len(lst)>0:
+          plst=[]
+          for ie in range(0, len(lst)):
+              x=gch.get(lst[ie]['data_uid'],{}) if gch!=None else {}
+              if ie not in sigs or x.get('signature',None)!=sigs[ie]:
+                 plst.append(ie)
+
+          if o=='con':
+             ck.out('Prefetching '+str(len(plst))+' entries in parallel ('+par+') ...')
+
+          r=prefetch_entries({'lst':[lst[ie] for ie in plst],
+                              'parallel':par,
+                              'workers':i.get('workers',''),
+                              'prune_points':prune_points,
+                              'load_features':lfeat,
+                              'load_flat':(sl!='yes'),
+                              'summary_keys':pskl,
+                              'load_json_files':ljf})
+          if r['return']>0: return r
+
+          for q in range(0, len(plst)):
+              pfe[plst[q]]=r['entries'][q]
+
+       # Iterate over entries
+       for ie in range(0, len(lst)):
+           e=lst[ie]
+
+           ruoa=e['repo_uoa']
+           ruid=e['repo_uid']
+           muoa=e['module_uoa']
+           muid=e['module_uid']
+           duoa=e['data_uoa']
+           duid=e['data_uid']
+
+           # Reuse cached contribution of this entry to the table if entry and state of table were not changed
+           if gch!=None:
+              sin=json.dumps([fkl, fkls, xfkl, si, sxwl, axl, sptg, ljf, rfkl, trfkl, plot_info_from_scenario,
+                              sorted([int(q)-igraph for q in table if int(q)>=igraph]),
+                              sorted([int(q)-igraph for q in mtable if int(q)>=igraph])], sort_keys=True)
+
+              x=gch.get(duid,None)
+              if x!=None and ie in sigs and x['signature']==sigs[ie] and x['state_in']==sin:
+                 if o=='con':
+                    ck.out('Reusing cached entry '+muoa+':'+duoa+' ...')
+
+                 xd=copy.deepcopy(x['delta'])
+
+                 for tt in [(table, 'table'), (mtable, 'mtable')]:
+                     for q in xd[tt[1]]:
+                         sigraph=str(igraph+int(q))
+                         if xd[tt[1]][q]['replace'] or sigraph not in tt[0]:
+                            tt[0][sigraph]=[]
+                         tt[0][sigraph]+=xd[tt[1]][q]['rows']
+
+                 points+=xd['points']
+                 ppoints+=xd['ppoints']
+
+                 if xd['meta']!=None: mm.update(xd['meta'])
+
+                 fkl, fkls, xfkl, si, sxwl, axl, sptg, ljf, rfkl, trfkl, plot_info_from_scenario=xd['state_out']
+
+                 igraph+=xd['igraph']
+
+                 chits+=1
+                 continue
+
+              cmiss+=1
+
+              # Remember state before processing this entry
+              igraph0=igraph
+              lpoints0=len(points)
+              lppoints0=len(ppoints)
+              table0={}
+              for tt in [(table, 'table'), (mtable, 'mtable')]:
+                  table0[tt[1]]={}
+                  for q in tt[0]:
+                      if int(q)>=igraph: table0[tt[1]][q]=(tt[0][q], len(tt[0][q]))
+
+           # Load entry
+           if o=='con':
+              ck.out('Loading entry '+muoa+':'+duoa+' ...')
+
+           pf=pfe.get(ie,{})
+           if len(pf)>0:
+              r=pf
+           else:
+              ii={'action':'load',
+                  'repo_uoa':ruid,
+                  'module_uoa':muid,
+                  'data_uoa':duid}
+
+              r=ck.access(ii)
+              if r['return']>0: return r
+
+           p=r['path']
+           dd=r['dict']
+
+           dirList=pf.get('dir_list',None)
+           if dirList==None: dirList=os.listdir(p)
+
+           jc=pf.get('files',{}) # already loaded json files
+
+           # Merge journals of writers (if any) to points before reading them
+           if cjr=='yes':
+              for fn in dirList:
+                  if fn.startswith('journal-'):
+                     r=compact({'repo_uoa':ruid, 'module_uoa':muid, 'data_uoa':duid})
+                     if r['return']>0: return r
+
+                     dirList=os.listdir(p)
+                     jc={}
+                     break
+
+           # Skip points marked as deleted
+           r=load_tombstones(p, dirList)
+           if r['return']>0: return r
+           tomb=r['tombstones']
+
+           meta=dd.get('meta',{})
+
+           cplot={} # customize plot
+           # Check if scenario
+           if ssi!='yes':
+              sm_uoa=meta.get('scenario_module_uoa','')
+              if sm_uoa!='':
+                 # Trying to pre-load graph params
+                 rx=ck.access({'action':'load',
+                               'module_uoa':cfg['module_deps']['module'],
+                               'data_uoa':sm_uoa})
+                 if rx['return']==0:
+                    dx=rx['dict']
+                    plot_info_from_scenario=dx.get('plot',{})
+
+              mm.update(meta)
+
+           if len(plot_info_from_scenario)>0:
+              cplot=plot_info_from_scenario
+
+           cplot.update(i.get('customize_plot',{}))
+
+           if len(cplot)>0:
+              if len(fkl)==0: 
+                 fkl=cplot.get('flat_keys_list',[])
+                 if i.get('flat_keys_list_separate_graphs','')=='' and len(fkl)>0: fkls=[fkl]
+              if xfkl=='': xfkl=cplot.get('flat_keys_list_ext','')
+
+              if si=='': si=cplot.get('sort_index','')
+              if sxwl=='': sxwl=cplot.get('substitute_x_with_loop','')
+              if axl=='': axl=cplot.get('add_x_loop','')
+              if sptg=='': sptg=cplot.get('separate_permanent_to_graphs','')
+              if sptg=='yes':
+                 if 'features' not in ljf: ljf.append('features')
+
+           # Check if only scalar keys are needed (then read summary of points instead of flat json)
+           skl=None
+           if sl!='yes' and usm!='no' and fki=='' and el!='yes':
+              skl=[]
+              for fklx in fkls:
+                  if len(fklx)==0:
+                     skl=None
+                     break
+                  for kx in fklx:
+                      skl.append(kx+xfkl)
+
+           added=False
+           for fn in sorted(dirList):
+               permanent=False
+               xpermanent=False
+               if fn.endswith('.flat.json'):
+                  pp1=fn[:-10]
+                  pp2=pp1[4:]
+                  drz={}
+
+                  # Prune by point UID before any file I/O
+                  if len(prune_points)>0 and pp2 not in prune_points:
+                     continue
+
+                  if pp2 in tomb:
+                     continue
+
+                  skip=False
+
+                  # Load flat features only if needed to filter points or for mtable
+                  if lfeat:
+                     fpf1=os.path.join(p, pp1+'.features_flat.json')
+                     rz=jc.get(fpf1,None)
+                     if rz==None: rz=ck.load_json_file({'json_file':fpf1})
+                     if rz['return']==0: 
+                        drz=rz['dict']
+
+                  if gop=='yes' or (len(drz)>0 and len(ffeatures)>0):
+                     if gop!='yes':
+                        if not match_features(fmatch, drz): skip=True
+
+                     if o=='con' and not skip:
+                        ck.out('     Found point with related features ('+ruoa+':'+muoa+':'+duoa+'/'+pp2+') ...')
+
+                  if skip:
+                     continue
+
+                  ppx={'repo_uoa':ruoa, 'repo_uid':ruid, 'module_uoa':muoa, 'module_uid':muid, 'data_uoa':duoa, 'data_uid':duid, 'point_uid':pp2}
+
+                  # If load json files ...
+                  if len(ljf)>0:
+                     for jf in ljf:
+                         pj=os.path.join(p,pp1+'.'+jf+'.json')
+
+                         rx=jc.get(pj,None)
+                         if rx==None: rx=ck.load_json_file({'json_file':pj})
+                         if rx['return']>0: return rx
+
+                         dpj=rx['dict']
+
+                         if jf=='flat':
+                            rx=load_samples(p, pp1, dpj)
+                            if rx['return']>0: return rx
+
+                         if len(gkjf)>0:
+                            x={}
+                            for k in gkjf:
+                                x[k]=dpj.get(k, None)
+
+                            y=dpj.get('permanent','')
+                            if y!='': x['permanent']=y
+
+                            dpj=x
+
+                         ppx[jf]=dpj
+
+                  # If separate permanent points
+                  u1=ppx.get('features',{}).get('permanent','')
+                  if u1=='yes':
+                     xpermanent=True
+                     if sptg=='yes':
+                        permanent=True
+
+                  if spp=='yes' and u1=='yes':
+                     ppoints.append(ppx)
+                  else:
+                     points.append(ppx)
+
+                  added=True
+
+                  if sl!='yes':
+                     # Read only summary projection of point if possible
+                     df=None
+                     if skl!=None:
+                        fpsum1=os.path.join(p, pp1+'.summary.json')
+                        r=None
+                        if skl==pskl: r=jc.get(fpsum1,None)
+                        if r==None: r=load_summary(p, pp1, skl)
+                        if r['return']>0: return r
+                        df=r['dict']
+
+                     if df==None:
+                        fpflat1=os.path.join(p, fn)
+
+                        r=jc.get(fpflat1,None)
+                        if r==None: r=ck.load_json_file({'json_file':fpflat1})
+                        if r['return']>0: return r
+                        df=r['dict']
+
+                        # Load all values from sample store (if used) only for requested keys
+                        if os.path.isfile(os.path.join(p, pp1+'.samples.json')):
+                           skeys=[]
+                           for fklx in fkls:
+                               if fki!='' or len(fklx)==0:
+                                  skeys=None
+                                  break
+                               for kx in fklx:
+                                   k=kx+xfkl
+                                   if k.endswith('#all'): skeys.append(k[:-4])
+                                   elif k.endswith('#all_unique'): skeys.append(k[:-11])
+
+                           if skeys==None or len(skeys)>0:
+                              r=load_samples(p, pp1, df, skeys)
+                              if r['return']>0: return r
+
+                     # Iterate over combinations of keys
+                     for fkl in fkls:
+                         # Create final vector (X,Y,Z,...)
+                         vect=[]
+                         has_none=False
+                         has_empty_string=False
+                         if fki!='' or len(fkl)==0:
+                            # Add all sorted (otherwise there is no order in python dict)
+                            for k in sorted(df.keys()):
+                                if (fki=='' or k.startswith(fki)) and (fkie=='' or k.endswith(fkie)):
+                                   if len(rfkl)==0:
+                                      trfkl.append(k)
+                                   v=df[k]
+                                   if v==None: has_none=True
+                                   if v=='': has_empty_string=True
+                                   if v!=None and type(v)==list:
+                                      if len(v)==0: v=None
+                                      else: 
+                                         if el!='yes':
+                                            v=v[0]
+                                   vect.append(v)
+
+                                   # Check if range
+                                   if fkie!='' and fkied!='':
+                                      kb=k[:len(k)-len(fkie)]
+                                      kbd=kb+fkied
+                                      if len(rfkl)==0:
+                                         trfkl.append(kbd)
+                                      vd=df.get(kbd, None)
+                                      if vd==None: has_none=True
+                                      if vd=='': has_empty_string=True
+                                      if vd!=None and type(vd)==list:
+                                         if len(vd)==0: vd=None
+                                         else: 
+                                            if el!='yes':
+                                               vd=vd[0]
+
+                                      vect.append(vd)
+
+                            if len(trfkl)!=0:
+                               rfkl=trfkl
+                         else:
+                            for kx in fkl:
+                                k=kx+xfkl
+                                v=df.get(k,None)
+                                if v==None: has_none=True
+                                if v=='': has_empty_string=True
+                                if v!=None and type(v)==list:
+                                   if len(v)==0: v=None
+                                   else: 
+                                      if el!='yes':
+                                         v=v[0]
+                                vect.append(v)
+
+                         # Add vector (if valid)
+                         sigraph=str(igraph)
+
+                         if sigraph not in table: 
+                            table[sigraph]=[]
+                            mtable[sigraph]=[]
+
+                         sigraph1=str(igraph+1)
+                         if permanent:
+                            table[sigraph1]=[]
+                            mtable[sigraph1]=[]
+
+                         if el=='yes':
+                            max_length=0
+                            for ih in range(0, len(vect)):
+                                vih=vect[ih]
+                                if vih!=None:
+                                   max_length=max(max_length, len(vih))
+
+                            for q in range(0, max_length):
+                                vect1=[]
+                                for ih in range(0, len(vect)):
+                                    h=vect[ih]
+                                    if q<len(h): v1=h[q]
+                                    else: v1=h[len(h)-1]
+                                    vect1.append(v1)
+                                if permanent:
+                                   table[sigraph1].append(vect1)
+                                else:
+                                   table[sigraph].append(vect1)
+                         else:
+                            if (ipin!='yes' or not has_none) and (ipies!='yes' or not has_empty_string):
+                               skip=False
+
+                               if len(vt)>0:
+                                  for o in range(0, len(vt)):
+                                      vx=vt[o]
+                                      vxo=vect[o]
+                                      if vx!=None:
+                                         xvtc='<'
+                                         if len(vtc)>0 and o<len(vtc) and vtc[o]!=None:
+                                            xvtc=vtc[o]
+
+                                         if (xvtc=='<' and vxo>vx) or (xvtc=='>' and vxo<vx): 
+                                            skip=True
+                                            break
+
+                               if not skip:
+                                  if permanent:
+                                     table[sigraph1].append(vect)
+                                  else:
+                                     table[sigraph].append(vect)
+
+                         # Add misc info:
+                         mi={'repo_uoa':ruid, 'module_uoa':muid, 'data_uoa':duid,
+                             'point_uid':pp2, 'features':drz}
+
+                         if xpermanent:
+                            mi['permanent']='yes'
+
+                         if permanent:
+                            mtable[sigraph1].append(mi)
+                         else:
+                            mtable[sigraph].append(mi)
+
+                         if sstg=='yes' or len(fkls)>1:
+                            igraph+=1
+
+           if sstg!='yes' and added and igs!='yes':
+              igraph+=1
+
+           # Cache contribution of this entry to the table
+           if gch!=None and ie in sigs:
+              xd={'table':{}, 'mtable':{}, 'points':points[lpoints0:], 'ppoints':ppoints[lppoints0:],
+                  'meta':(meta if ssi!='yes' else None), 'igraph':igraph-igraph0,
+                  'state_out':[fkl, fkls, xfkl, si, sxwl, axl, sptg, ljf, rfkl, trfkl, plot_info_from_scenario]}
+
+              for tt in [(table, 'table'), (mtable, 'mtable')]:
+                  for q in tt[0]:
+                      if int(q)>=igraph0:
+                         x=table0[tt[1]].get(q,None)
+                         if x==None or x[0] is not tt[0][q]:
+                            xd[tt[1]][str(int(q)-igraph0)]={'replace':(x!=None), 'rows':tt[0][q]}
+                         elif len(tt[0][q])>x[1]:
+                            xd[tt[1]][str(int(q)-igraph0)]={'replace':False, 'rows':tt[0][q][x[1]:]}
+
+              gch[duid]={'signature':sigs[ie], 'state_in':sin, 'delta':copy.deepcopy(xd)}
+
+    if len(rfkl)==0 and len(fkls)!=0 and len(fkls[0])>0: 
+       rfkl=fkls[0]
+
+    # If sort/substitute
+    if si!='':
+       rx=sort_table({'table':table, 'sort_index':si})
+       if rx['return']>0: return rx
+       table=rx['table']
+
+    # Substitute all X with a loop (usually to sort Y and compare with predictions in scatter graphs, etc)
+    ii={'table':table}
+    if sxwl=='yes' or axl=='yes':
+       if axl=='yes':
+          ii['add_x_loop']='yes'
+       rx=substitute_x_with_loop(ii)
+       if rx['return']>0: return rx
+       table=rx['table']
+
+    return {'return':0, 'table':table, 'mtable':mtable, 'real_keys':rfkl, 'points':points, 'ppoints':ppoints, 
+                        'merged_meta':mm, 'plot_info_from_scenario':plot_info_from_scenario,
+                        'cache_hits':chits, 'cache_misses':cmiss}
+
+##############################################################################
+# internal function to load entries and their point files in parallel (threads or processes)
+# keeping the order of entries
+
+def prefetch_entries(i):
+
+    lst=i['lst']
+    par=i.get('parallel','')
+
+    nw=i.get('workers','')
+    if nw=='' or nw==None:
+       import multiprocessing
+       nw=multiprocessing.cpu_count()
+    nw=int(nw)
+    if nw>len(lst): nw=len(lst)
+    if nw<1: nw=1
+
+    jobs=[]
+    for e in lst:
+        jobs.append({'repo_uid':e['repo_uid'],
+                     'module_uid':e['module_uid'],
+                     'data_uid':e['data_uid'],
+                     'prune_points':i.get('prune_points',[]),
+                     'load_features':i.get('load_features',True),
+                     'load_flat':i.get('load_flat',True),
+                     'summary_keys':i.get('summary_keys',None),
+                     'load_json_files':i.get('load_json_files',[])})
+
+    pool=None
+    if par=='processes':
+       # Forked workers reuse already initialized CK kernel and this module
+       import multiprocessing
+       try:
+          ctx=multiprocessing.get_context('fork')
+          pool=ctx.Pool(nw)
+       except (AttributeError, ValueError):
+          pool=None
+
+    if pool==None:
+       from multiprocessing.pool import ThreadPool
+       pool=ThreadPool(nw)
+
+    try:
+       res=pool.map(prefetch_entry, jobs)
+    finally:
+       pool.close()
+       pool.join()
+
+    for r in res:
+        if r['return']>0: return r
+
+    return {'return':0, 'entries':res}
+
+##############################################################################
+# internal function to load entry and its point files (worker of prefetch_entries)
+
+def prefetch_entry(i):
+
+    r=ck.access({'action':'load',
+                 'repo_uoa':i['repo_uid'],
+                 'module_uoa':i['module_uid'],
+                 'data_uoa':i['data_uid']})
+    if r['return']>0: return r
+
+    p=r['path']
+    d=r['dict']
+
+    prune_points=i.get('prune_points',[])
+    ljf=i.get('load_json_files',[])
+
+    dirList=os.listdir(p)
+
+    r=load_tombstones(p, dirList)
+    if r['return']>0: return r
+    tomb=r['tombstones']
+
+    files={}
+    for fn in sorted(dirList):
+        if fn.endswith('.flat.json'):
+           pp1=fn[:-10]
+
+           if len(prune_points)>0 and pp1[4:] not in prune_points:
+              continue
+
+           if pp1[4:] in tomb:
+              continue
+
+           lf=i.get('load_flat',True)
+
+           skl=i.get('summary_keys',None)
+           if lf and skl!=None:
+              r=load_summary(p, pp1, skl)
+              if r['return']>0: return r
+              if r['dict']!=None:
+                 files[os.path.join(p, pp1+'.summary.json')]=r
+                 lf=False
+
+           fns=[]
+           if i.get('load_features',True): fns.append(pp1+'.features_flat.json')
+           if lf: fns.append(fn)
+           for jf in ljf:
+               fns.append(pp1+'.'+jf+'.json')
+
+           for fn1 in fns:
+               px=os.path.join(p, fn1)
+               files[px]=ck.load_json_file({'json_file':px})
+
+    return {'return':0, 'path':p, 'dict':d, 'dir_list':dirList, 'files':files}
+
+##############################################################################
+# iterate over experiment points (generator)
+
+def iter_points(i):
+    """
+    Input:  {
+              Select entries (as in "get"):
+                 (repo_uoa) or (experiment_repo_uoa)     - can be wild cards
+                 (remote_repo_uoa)                       - if remote access, use this as a remote repo UOA
+                 (module_uoa) or (experiment_module_uoa) - can be wild cards
+                 (data_uoa) or (experiment_uoa) or (experiment_data_uoa)     - can be wild cards
+
+                 (repo_uoa_list)                       - list of repos to search
+                 (module_uoa_list)                     - list of module to search
+                 (data_uoa_list)                       - list of data to search
+
+                 (search_dict)                         - search dict
+                 (ignore_case)                         - if 'yes', ignore case when searching
+                 (meta)                                - search by meta in the entry
+                 (tags)                                - search by tags in the entry
+
+              (prune_points)                        - list of points to get
+
+              (features)                            - select points by features
+                     OR
+              (flat_features)                       - select points by flat features
+
+              (features_keys_to_ignore)             - list of keys to remove from features (can be wildcards)
+
+              (flat_keys_list)                      - list of flat keys to get from points (all keys if empty)
+              (flat_keys_list_ext)                  - add this extension to all above keys (useful to add #min)
+              (flat_keys_index)                     - get all flat keys starting from this index
+
+              (load_features)                       - if 'yes', add flat features of points
+
+              (compact_journals)                    - if 'yes', merge journals of writers to points before reading them
+                                                      (compact_journals from module meta by default)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              points       - generator of points loaded lazily entry by entry (only when used from Python):
+                             {
+                               return         - return code (>0 if error, then iteration stops)
+                               (error)        - error text if return > 0
+
+                               repo_uoa, repo_uid, module_uoa, module_uid, data_uoa, data_uid, point_uid
+
+                               flat           - dict with requested flat keys of the point
+                               (features_flat) - flat features of the point (if load_features=='yes')
+                             }
+            }
+
+    """
+
+    ruoa=i.get('repo_uoa','')
+    xruoa=i.get('experiment_repo_uoa','')
+    if xruoa!='': ruoa=xruoa
+
+    muoa=i.get('experiment_module_uoa','')
+    if muoa=='':
+       muoa=i.get('module_uoa','')
+
+    duoa=i.get('experiment_data_uoa','')
+    if duoa=='':
+       duoa=i.get('data_uoa','')
+    if duoa=='':
+       duoa=i.get('experiment_uoa','')
+
+    sd=i.get('search_dict',{})
+
+    meta=i.get('meta',{})
+    if len(meta)>0: sd['meta']=meta
+
+    # Search entries (entries are few in comparison with points)
+    r=ck.access({'action':'search',
+                 'common_func':'yes',
+                 'repo_uoa':ruoa,
+                 'remote_repo_uoa':i.get('remote_repo_uoa',''),
+                 'module_uoa':muoa,
+                 'data_uoa':duoa,
+                 'repo_uoa_list':i.get('repo_uoa_list',[]),
+                 'module_uoa_list':i.get('module_uoa_list',[]),
+                 'data_uoa_list':i.get('data_uoa_list',[]),
+                 'search_dict':sd,
+                 'ignore_case':i.get('ignore_case',''),
+                 'tags':i.get('tags','')})
+    if r['return']>0: return r
+
+    lst=r['lst']
+
+    ffeatures=i.get('flat_features',{})
+    features=i.get('features',{})
+    if len(features)>0 and len(ffeatures)==0:
+       r=ck.flatten_dict({'dict':features})
+       if r['return']>0: return r
+       ffeatures=r['dict']
+
+    r=compile_features_matcher({'features':ffeatures, 'ignore_case':'yes', 'space_as_none':'yes', 
+                                'keys_to_ignore':i.get('features_keys_to_ignore',[])})
+    if r['return']>0: return r
+    fmatch=r['matcher']
+
+    xfkl=i.get('flat_keys_list_ext','')
+    keys=[]
+    for k in i.get('flat_keys_list',[]):
+        keys.append(k+xfkl)
+
+    return {'return':0, 'points':iter_points_of_entries({'lst':lst,
+                                                         'keys':keys,
+                                                         'flat_keys_index':i.get('flat_keys_index',''),
+                                                         'prune_points':i.get('prune_points',[]),
+                                                         'flat_features':ffeatures,
+                                                         'matcher':fmatch,
+                                                         'load_features':i.get('load_features',''),
+                                                         'compact_journals':i.get('compact_journals','')})}
+
+##############################################################################
+# internal generator of points of entries (see "iter_points")
+
+def iter_points_of_entries(i):
+
+    lst=i['lst']
+    keys=i['keys']
+    fki=i['flat_keys_index']
+    prune_points=i['prune_points']
+    ffeatures=i['flat_features']
+    fmatch=i['matcher']
+    lf=i['load_features']
+
+    cjr=i['compact_journals']
+    if cjr=='': cjr=cfg.get('compact_journals','')
+
+    skeys=[]
+    for k in keys:
+        if k.endswith('#all'): skeys.append(k[:-4])
+        elif k.endswith('#all_unique'): skeys.append(k[:-11])
+
+    for e in lst:
+        ruid=e['repo_uid']
+        muid=e['module_uid']
+        duid=e['data_uid']
+
+        r=ck.access({'action':'load',
+                     'repo_uoa':ruid,
+                     'module_uoa':muid,
+                     'data_uoa':duid})
+        if r['return']>0:
+           yield r
+           return
+
+        p=r['path']
+
+        dirList=os.listdir(p)
+
+        # Merge journals of writers (if any) to points before reading them
+        if cjr=='yes':
+           for fn in dirList:
+               if fn.startswith('journal-'):
+                  r=compact({'repo_uoa':ruid, 'module_uoa':muid, 'data_uoa':duid})
+                  if r['return']>0:
+                     yield r
+                     return
+
+                  dirList=os.listdir(p)
+                  break
+
+        r=load_tombstones(p, dirList)
+        if r['return']>0:
+           yield r
+           return
+        tomb=r['tombstones']
+
+        for fn in sorted(dirList):
+            if not fn.endswith('.flat.json'): continue
+
+            pp1=fn[:-10]
+            pp2=pp1[4:]
+
+            if len(prune_points)>0 and pp2 not in prune_points:
+               continue
+
+            if pp2 in tomb:
+               continue
+
+            rec={'return':0, 
+                 'repo_uoa':e['repo_uoa'], 'repo_uid':ruid, 
+                 'module_uoa':e['module_uoa'], 'module_uid':muid, 
+                 'data_uoa':e['data_uoa'], 'data_uid':duid, 
+                 'point_uid':pp2}
+
+            if len(ffeatures)>0 or lf=='yes':
+               drz={}
+               r=ck.load_json_file({'json_file':os.path.join(p, pp1+'.features_flat.json')})
+               if r['return']==0: drz=r['dict']
+
+               if len(ffeatures)>0 and len(drz)>0 and not match_features(fmatch, drz):
+                  continue
+
+               if lf=='yes': rec['features_flat']=drz
+
+            # Read summary of point if only scalar keys are needed
+            df=None
+            if len(keys)>0 and fki=='':
+               r=load_summary(p, pp1, keys)
+               if r['return']>0:
+                  yield r
+                  return
+               df=r['dict']
+
+            if df==None:
+               r=ck.load_json_file({'json_file':os.path.join(p, fn)})
+               if r['return']>0:
+                  yield r
+                  return
+               df=r['dict']
+
+               if len(keys)==0 or len(skeys)>0:
+                  r=load_samples(p, pp1, df, (skeys if len(keys)>0 else None))
+                  if r['return']>0:
+                     yield r
+                     return
+
+            if len(keys)>0:
+               x={}
+               for k in keys:
+                   x[k]=df.get(k, None)
+               if fki!='':
+                  for k in df:
+                      if k.startswith(fki): x[k]=df[k]
+            elif fki!='':
+               x={}
+               for k in df:
+                   if k.startswith(fki): x[k]=df[k]
+            else:
+               x=df
+
+            rec['flat']=x
+
+            yield rec
+
+##############################################################################
+# Convert experiment table to CSV
+
+def convert_table_to_csv(i):
+    """
+
+    Input:  {
+              table                - experiment table
+                   OR
+              points               - iterable of points (for example, from "iter_points"), written one by one
+                                     (values of keys are taken from 'flat' of each point)
+
+              (merge_multi_tables) - if 'yes', merge multiple tables to one
+              keys                 - list of keys
+              (keys_desc)          - dict with desc of keys
+              file_name            - output file for CSV
+              csv_no_header        - if 'yes', do not add header
+              (csv_separator)      - CSV entry separator (default ;)
+              (csv_decimal_mark)   - CSV decimal mark    (default .)
+
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+            }
+
+    """
+
+    tbl=i.get('table',[])
+    pts=i.get('points',None)
+    keys=i['keys']
+    keys_desc=i.get('keys_desc',{})
+
+    mmt=i.get('merge_multi_tables','')
+    if mmt=='yes' and pts==None:
+       tbl1=[]
+       for g in sorted(tbl, key=int):
+           for j in tbl[g]:
+               tbl1.append(j)
+       tbl=tbl1
+
+    fout=i['file_name']
+
+    sep=i.get('csv_separator',';')
+    if sep=='': sep=';'
+
+    dec=i.get('csv_decimal_mark',',')
+    if dec=='': dec=','
+
+    try:
+       f=open(fout,'wt')
+    except Exception as e:
+       return {'return':1, 'error':'problem writing csv file ('+format(e)+')'}
+
+    # Write lines one by one (to avoid keeping whole CSV in memory)
+    try:
+       # Prepare description line
+       line=''
+       if i.get('csv_no_header','')!='yes':
+          for k in keys:
+              if line!='': line+=sep
+              line+='"'+k+'"'
+          f.write(line+'\n')
+
+       # Iterate over data
+       if pts!=None:
+          for q in pts:
+              if q.get('return',0)>0:
+                 f.close()
+                 return q
+
+              dq=q.get('flat',{})
+              f.write(csv_line([dq.get(k, None) for k in keys], sep, dec)+'\n')
+       else:
+          for t in tbl:
+              f.write(csv_line([t[k] for k in range(0, len(keys))], sep, dec)+'\n')
+
+       f.write('\n')
+       f.close()
+    except Exception as e:
+       f.close()
+       return {'return':1, 'error':'problem writing csv file ('+format(e)+')'}
+
+    return {'return':0}
+
+##############################################################################
+# internal function to prepare CSV line from vector
+
+def csv_line(t, sep, dec):
+
+    line=''
+    for v in t:
+        if line!='': line+=sep
+
+        if type(v)==float:
+           v=str(v).replace(',', dec)
+        elif type(v)==int:
+           v=str(v)
+        else:
+           v='"'+str(v)+'"'
+        line+=v
+
+    return line
+
+##############################################################################
+# Process multiple experiments (flatten array + apply statistics)
+
+def stat_analysis(i):
+    """
+
+    Input:  {
+              dict                  - existing flat dict 
+              dict1                 - new flat dict to add
+                                      if empty, no stat analysis
+
+              (dict_compare)        - calculate improvements over this dict if present
+
+              (skip_expected_value) - if 'yes', do not calculute expected value
+              (skip_min_max)        - if 'yes', do not calculate min, max, mean, etc
+
+                 For expected value (via gaussian_kde):
+
+              (bins)                - number of bins (int, default = 100)
+              (cov_factor)          - float covariance factor
+              (kde_mode)            - 'exact' (default), 'binned' or 'fft' (see "math.variation analyze")
+
+              (skip_stat_analysis)  - if 'yes', just flatten array and add #min
+
+              (stat_state)          - running statistics per key (count, min, max, sum, sum2) to update
+                                      incrementally instead of rescanning #all (restored from dict if missing)
+
+              (sample_store)        - if not empty, #all of keys from 'counts' has only new values
+                                      and recorded ones are in sample store of a given point
+                                      {path, point, counts, exp_refresh} (see "add")
+            }
+
+    Output: {
+              return            - return code =  0, if successful
+                                              >  0, if error
+              (error)           - error text if return > 0
+
+              dict              - updated dict
+              max_range_percent - max % range in float/int data (useful to record points with unusual behavior)
+              min               - 'yes', if one of monitored values reached min
+              max               - 'yes', if one of monitored values reached max
+
+              stat_state        - updated running statistics
+            }
+
+    """
+
+    issa=False
+    ssa=i.get('skip_stat_analysis','')
+    if ssa=='yes': issa=True
+
+    d=i['dict']
+    d1=i['dict1']
+
+    dc=i.get('dict_compare',{})
+
+    compare=False
+    if len(dc)>0:
+       compare=True
+
+    max_range_percent=0
+    mmin=''
+    mmax=''
+
+    sev=i.get('skip_expected_value','')
+    smm=i.get('skip_min_max','')
+
+    bins=i.get('bins','')
+    cov_factor=i.get('cov_factor','')
+    kde_mode=i.get('kde_mode','')
+
+    ss=i.get('stat_state',None)
+    if ss==None: ss={}
+
+    sst=i.get('sample_store',{})
+    scount=sst.get('counts',{})
+
+    kev={} # number of values in #all when expected value is requested for a given key
+
+    for k in d1:
+        vv1=d1[k]
+
+        if not issa:
+           rs=get_running_stat(d, k, ss, scount.get(k,0))
+
+        # If float or int, perform basic analysis
+        if type(vv1)!=list: vv1=[vv1]
+        for v1 in vv1:
+            if not issa:
+               # Number of repetitions
+               k_repeats=k+'#repeats'
+               vr=d.get(k_repeats,0)
+               vr+=1
+               d[k_repeats]=vr
+
+               # Put all values (useful to calculate means, deviations, etc)
+               k_all=k+'#all'
+               v_all=d.get(k_all,[])
+               v_all.append(v1)
+               d[k_all]=v_all
+
+               # Put only unique values
+               k_all_u=k+'#all_unique'
+               v=d.get(k_all_u,[])
+               try:
+                  if v1 not in rs['unique']:
+                     rs['unique'].add(v1)
+                     v.append(v1)
+               except TypeError:
+                  if v1 not in v: v.append(v1)
+               d[k_all_u]=v
+
+               update_running_stat(rs, v1)
+
+            if not issa and smm!='yes' and (type(v1)==float or type(v1)==int or type(v1)==ck.type_long):
+               # Calculate min
+               k_min=k+'#min'
+               vmin=d.get(k_min,v1)
+
+               if rs['min']<vmin: vmin=rs['min']
+
+               if v1<vmin:
+                  vmin=v1
+                  mmin='yes'
+               d[k_min]=vmin
+
+               if compare:
+                  cvmin=dc.get(k_min, None)
+                  if cvmin!=None and vmin!=0 and vmin!=0.0:
+                     d[k+'#min_imp']=float(cvmin)/float(vmin)
+
+               # Calculate max
+               k_max=k+'#max'
+               vmax=d.get(k_max,v1)
+
+               if rs['max']>vmax: vmax=rs['max']
+
+               if v1>vmax:
+                  vmax=v1
+                  mmax='yes'
+               d[k_max]=vmax
+
+               if compare:
+                  cvmax=dc.get(k_max, None)
+                  if cvmax!=None and vmax!=0 and vmax!=0.0:
+                     d[k+'#max_imp']=float(cvmax)/float(vmax)
+
+               # Calculate #range (max-min)
+               k_range=k+'#range'
+               vrange=vmax-vmin
+               d[k_range]=vrange
+
+               # Calculate #halfrange (max-min)/2
+               k_halfrange=k+'#halfrange'
+               vhrange=vrange/2
+               d[k_halfrange]=vhrange
+
+               # Calculate #halfrange (max-min)/2
+               k_center=k+'#center'
+               vcenter=vmin+vhrange
+               d[k_center]=vcenter
+
+               if compare:
+                  cvcenter=dc.get(k_center, None)
+                  if cvcenter!=None and vcenter!=0 and vcenter!=0.0:
+                     d[k+'#center_imp']=float(cvcenter)/float(vcenter)
+
+               # Calculate #range percent (max-min)/min
+               if vmin!=0:
+                  vp=(vmax-vmin)/vmin
+                  k_range_p=k+'#range_percent'
+                  d[k_range_p]=vp
+                  if vp>max_range_percent: max_range_percent=vp
+
+               # Calculate mean
+               k_mean=k+'#mean'
+               va=rs['sum']/float(vr)
+               d[k_mean]=va
+
+               if compare:
+                  cva=dc.get(k_mean, None)
+                  if cva!=None and va!=0 and va!=0.0:
+                     d[k+'#mean_imp']=float(cva)/float(va)
+
+               if sev!='yes':
+                  # Check density, expected value and peaks (calculated for all keys at once at the end)
+                  if k not in kev: kev[k]=[]
+                  kev[k].append(scount.get(k,0)+len(d[k_all]))
+            else:
+               # Add first value to min 
+               k_min=k+'#min'
+               vmin=d.get(k_min,'')
+               if vmin=='':
+                  mmin='yes'
+                  d[k_min]=v1
+
+               if compare:
+                  cvmin=dc.get(k_min, None)
+                  if cvmin==vmin:
+                     d[k+'#min_imp']=1
+                  else:
+                     d[k+'#min_imp']=0
+
+    if len(kev)>0:
+       r=update_expected_values({'dict':d, 'events':kev, 'dict_compare':dc, 'bins':bins, 'cov_factor':cov_factor,
+                                 'kde_mode':kde_mode, 'stat_state':ss, 'sample_store':sst})
+       if r['return']>0: return r
+
+    return {'return':0, 'dict':d, 'max_range_percent':max_range_percent, 'min':mmin, 'max':mmax, 'stat_state':ss}
+
+##############################################################################
+# internal function to calculate expected values (density peaks) of multiple keys at once
+#
+# Expected value is calculated from the last requested number of values in #all of each key
+# (all keys at once via math.variation) and from previous requests if density can't be calculated
+# (the same as calculating it after adding each value)
+#
+# For keys with recorded values in sample store, expected value is recalculated only
+# when the number of values grew by a given fraction since the last calculation
+# (recorded values are loaded only for such keys)
+
+def update_expected_values(i):
+
+    d=i['dict']
+    kev=dict(i['events'])
+    dc=i.get('dict_compare',{})
+
+    bins=i.get('bins','')
+    cov_factor=i.get('cov_factor','')
+    kde_mode=i.get('kde_mode','')
+
+    ss=i.get('stat_state',{})
+
+    sst=i.get('sample_store',{})
+    scount=sst.get('counts',{})
+    ser=sst.get('exp_refresh',0)
+
+    # Check which keys need recorded values from sample store
+    skeys=[]
+    for k in list(kev.keys()):
+        if scount.get(k,0)>0:
+           ne=ss.get(k,{}).get('exp_count',0)
+           n=kev[k][-1]
+
+           if ne>0 and n-ne<=ser*ne:
+              # Keep expected value (only update improvement)
+              del(kev[k])
+
+              cvexp=dc.get(k+'#exp', None)
+              vexp=d.get(k+'#exp', None)
+              if cvexp!=None and vexp!=None and vexp!=0 and vexp!=0.0:
+                 d[k+'#exp_imp']=float(cvexp)/float(vexp)
+           else:
+              skeys.append(k)
+
+    if len(kev)==0:
+       return {'return':0}
+
+    va={}
+    if len(skeys)>0:
+       dh={}
+       rx=load_samples(sst['path'], sst['point'], dh, skeys)
+       if rx['return']>0: return rx
+
+       for k in skeys:
+           va[k]=dh.get(k+'#all',[])+d.get(k+'#all',[])
+
+    ct={}
+    for k in kev:
+        if k not in va: va[k]=d[k+'#all']
+        ct[k]=va[k][:kev[k][-1]]
+
+    rx=ck.access({'action':'analyze_batch',
+                  'module_uoa':cfg['module_deps']['math.variation'],
+                  'characteristics_tables':ct,
+                  'bins':bins,
+                  'cov_factor':cov_factor,
+                  'kde_mode':kde_mode,
+                  'skip_fail':'yes'})
+    if rx['return']>0: return rx
+
+    results=rx['results']
+
+    for k in kev:
+        k_exp=k+'#exp'
+        cvexp=dc.get(k_exp, None)
+
+        found_exp=False
+        found_exp_imp=(cvexp==None)
+
+        ev=kev[k]
+        for j in range(len(ev)-1, -1, -1):
+            if found_exp and found_exp_imp: break
+
+            if j==len(ev)-1:
+               rx=results[k]
+            else:
+               rx=ck.access({'action':'analyze',
+                             'module_uoa':cfg['module_deps']['math.variation'],
+                             'characteristics_table':va[k][:ev[j]],
+                             'bins':bins,
+                             'cov_factor':cov_factor,
+                             'kde_mode':kde_mode,
+                             'skip_fail':'yes'})
+               if rx['return']>0: return rx
+
+            valx=rx['xlist2s']
+            valy=rx['ylist2s']
+
+            if len(valx)>0:
+               vexp=valx[0]
+
+               if not found_exp_imp and vexp!=0 and vexp!=0.0:
+                  d[k+'#exp_imp']=float(cvexp)/float(vexp)
+                  found_exp_imp=True
+
+               if not found_exp:
+                  d[k_exp]=vexp
+
+                  k_exp_allx=k+'#exp_allx'
+                  d[k_exp_allx]=valx
+
+                  k_exp_ally=k+'#exp_ally'
+                  d[k_exp_ally]=valy
+
+                  warning='no'
+                  if len(valx)>1: warning='yes'
+                  k_exp_war=k+'#exp_warning'
+                  d[k_exp_war]=warning
+
+                  found_exp=True
+
+        # Remember number of values used for expected value
+        if k in ss:
+           ss[k]['exp_count']=int(ev[-1])
+
+    return {'return':0}
+
+##############################################################################
+# internal function to get running statistics of a given flat key
+# (restored from already recorded #all values if missing or out of sync;
+#  base is the number of values kept outside of #all in sample store)
+
+def get_running_stat(d, k, ss, base=0):
+
+    v_all=d.get(k+'#all',[])
+
+    rs=ss.get(k,None)
+    if rs==None or rs.get('count',-1)!=base+len(v_all):
+       rs={'count':0, 'min':None, 'max':None, 'sum':0, 'sum2':0}
+       for v in v_all:
+           update_running_stat(rs, v)
+       ss[k]=rs
+
+    if 'unique' not in rs:
+       u=set()
+       for v in d.get(k+'#all_unique',[]):
+           try: u.add(v)
+           except TypeError: pass
+       rs['unique']=u
+
+    return rs
+
+##############################################################################
+# internal function to add value to running statistics
+
+def update_running_stat(rs, v):
+
+    rs['count']+=1
+
+    if type(v)==float or type(v)==int or type(v)==ck.type_long:
+       if rs['min']==None or v<rs['min']: rs['min']=v
+       if rs['max']==None or v>rs['max']: rs['max']=v
+       rs['sum']+=v
+       rs['sum2']+=v*v
+
+    return
+
+##############################################################################
+# internal function to load running statistics of a given point
+
+def load_running_stats(p, point):
+
+    ss={}
+
+    fpstat=os.path.join(p, point+'.stats.json')
+    if os.path.isfile(fpstat):
+       r=ck.load_json_file({'json_file':fpstat})
+       if r['return']>0: return r
+       ss=r['dict']
+
+    return {'return':0, 'stat_state':ss}
+
+##############################################################################
+# internal function to save running statistics of a given point (without in-memory sets)
+
+def save_running_stats(p, point, ss):
+
+    dss={}
+    for k in ss:
+        dss[k]={}
+        for q in ss[k]:
+            if q!='unique':
+               dss[k][q]=ss[k][q]
+
+    fpstat=os.path.join(p, point+'.stats.json')
+    return ck.save_json_to_file({'json_file':fpstat, 'dict':dss})
+
+##############################################################################
+# internal function to load values of #all (and #all_unique) from binary sample store of a given point
+#
+# Sample store keeps all values of numerical keys outside flat json in append-only
+# ckp-<uid>.samples.bin (records of key id (uint32) and value (float64))
+# with index ckp-<uid>.samples.json (id, type and number of values per key)
+# and is memory-mapped when read
+
+def load_samples(p, point, d, keys=None):
+
+    idx={}
+
+    fpidx=os.path.join(p, point+'.samples.json')
+    if os.path.isfile(fpidx):
+       r=ck.load_json_file({'json_file':fpidx})
+       if r['return']>0: return r
+       idx=r['dict']
+
+    kk=idx.get('keys',{})
+    if len(kk)==0 or (keys!=None and len(keys)==0): return {'return':0, 'index':idx}
+
+    try:
+       import numpy as np
+    except Exception as e:
+       return {'return':1, 'error':'NumPy is needed to load samples of point '+point+' ('+format(e)+')'}
+
+    sdt=np.dtype([('key','<u4'), ('value','<f8')])
+
+    n=idx.get('records',0)
+
+    fpbin=os.path.join(p, point+'.samples.bin')
+    if n>0:
+       rec=np.memmap(fpbin, dtype=sdt, mode='r', shape=(n,))
+    else:
+       rec=np.zeros(0, dtype=sdt)
+
+    # Group records by key (stable, i.e. keeping the order of values)
+    # or select values of a few keys directly
+    few=(keys!=None and len(keys)<=4)
+    if not few:
+       order=np.argsort(rec['key'], kind='stable')
+       sk=rec['key'][order]
+       sv=rec['value'][order]
+
+    for k in kk:
+        if keys!=None and k not in keys: continue
+
+        x=kk[k]
+        kid=x['id']
+
+        if few:
+           vals=rec['value'][rec['key']==kid][:x['count']]
+        else:
+           j1=np.searchsorted(sk, kid, side='left')
+           j2=np.searchsorted(sk, kid, side='right')
+
+           vals=sv[j1:j2][:x['count']]
+        if x['type']=='int':
+           v=vals.astype(np.int64).tolist()
+        else:
+           v=vals.tolist()
+
+        d[k+'#all']=v
+
+        k_all_u=k+'#all_unique'
+        if k_all_u not in d:
+           d[k_all_u]=list(dict.fromkeys(v))
+
+    return {'return':0, 'index':idx}
+
+##############################################################################
+# internal function to get type of values of #all that can be kept in sample store
+# ('int' or 'float', or empty string if values are mixed, NaN or not numerical)
+
+def samples_type(v):
+
+    if type(v)!=list: return ''
+
+    tp=''
+    for q in v:
+        t=''
+        if type(q)==float:
+           if q==q: t='float' # skip NaN
+        elif type(q)==int or type(q)==ck.type_long:
+           if abs(q)<(1<<53): t='int'
+
+        if t=='' or (tp!='' and t!=tp):
+           return ''
+        tp=t
+
+    return tp
+
+##############################################################################
+# internal function to check if new values of #all can be appended to sample store (the same type)
+
+def samples_fit(d, kk):
+
+    for k in kk:
+        k_all=k+'#all'
+        if k_all in d and len(d[k_all])>0 and samples_type(d[k_all])!=kk[k]['type']:
+           return False
+
+    return True
+
+##############################################################################
+# internal function to get names of flat keys kept in sample store
+
+def samples_keys(kk):
+
+    keys=[]
+    for k in kk:
+        keys.append(k+'#all')
+        keys.append(k+'#all_unique')
+
+    return keys
+
+##############################################################################
+# internal function to append new values of #all to binary sample store of a given point
+# (returns flat dict without lists moved to sample store)
+#
+# If append is True, #all of keys already in sample store has only new values
+
+def save_samples(p, point, d, idx, rewrite=False, append=False):
+
+    import numpy as np
+
+    sdt=np.dtype([('key','<u4'), ('value','<f8')])
+
+    fpidx=os.path.join(p, point+'.samples.json')
+    fpbin=os.path.join(p, point+'.samples.bin')
+
+    # Check which keys can be kept in sample store (only int or only float values)
+    tkeys={}
+    for k0 in d:
+        if k0.endswith('#all'):
+           tp=samples_type(d[k0])
+           if tp!='':
+              tkeys[k0[:-4]]=tp
+
+    kk=idx.get('keys',{})
+
+    # Rewrite whole store if some recorded values were changed or removed
+    if not rewrite and not append:
+       for k in kk:
+           x=kk[k]
+           if tkeys.get(k,'')!=x['type'] or len(d[k+'#all'])<x['count']:
+              rewrite=True
+              break
+
+    if rewrite:
+       kk={}
+       idx={}
+
+    n=idx.get('records',0)
+    nid=idx.get('next_id',0)
+
+    dj=dict(d)
+
+    new=[]
+    m=0
+    for k in sorted(tkeys):
+        v=d[k+'#all']
+
+        x=kk.get(k,None)
+        if x==None:
+           x={'id':nid, 'type':tkeys[k], 'count':0}
+           nid+=1
+           kk[k]=x
+
+        if append:
+           vn=v
+        else:
+           vn=v[x['count']:]
+        if len(vn)>0:
+           new.append((x['id'], vn))
+           m+=len(vn)
+
+        x['count']+=len(vn)
+
+        del(dj[k+'#all'])
+
+        k_all_u=k+'#all_unique'
+        if k_all_u in dj and dj[k_all_u]==list(dict.fromkeys(v)):
+           del(dj[k_all_u])
+
+    # Append new records (after removing partially written ones, if any)
+    if m>0 or rewrite:
+       rec=np.empty(m, dtype=sdt)
+       j=0
+       for q in new:
+           l=len(q[1])
+           rec['key'][j:j+l]=q[0]
+           rec['value'][j:j+l]=q[1]
+           j+=l
+
+       mode='wb'
+       if n>0 and os.path.isfile(fpbin): mode='r+b'
+
+       with open(fpbin, mode) as f:
+          f.seek(n*sdt.itemsize)
+          f.truncate()
+          f.write(rec.tobytes())
+
+    idx['keys']=kk
+    idx['records']=n+m
+    idx['next_id']=nid
+
+    r=ck.save_json_to_file({'json_file':fpidx, 'dict':idx})
+    if r['return']>0: return r
+
+    return {'return':0, 'dict':dj, 'index':idx}
+
+##############################################################################
+# internal function to save summary projection of a given point
+#
+# Summary (ckp-<uid>.summary.json) keeps only scalar keys of flat dict (without
+# #all, #exp_allx and other lists) in compact JSON together with names of list keys,
+# and is written after flat json (summary older than flat json is ignored)
+
+def save_summary(p, point, d):
+
+    dk={}
+    lk=[]
+    for k in d:
+        v=d[k]
+        if type(v)==list or type(v)==dict:
+           lk.append(k)
+        else:
+           dk[k]=v
+
+    r=ck.dumps_json({'dict':{'keys':dk, 'list_keys':sorted(lk)}, 'skip_indent':'yes', 'sort_keys':'yes'})
+    if r['return']>0: return r
+
+    fpsum=os.path.join(p, point+'.summary.json')
+    return ck.save_text_file({'text_file':fpsum, 'string':r['string']})
+
+##############################################################################
+# internal function to load summary projection of a given point if it has all requested keys
+# (dict is None if summary is missing, outdated or some keys need lists from flat json)
+
+def load_summary(p, point, keys):
+
+    fpsum=os.path.join(p, point+'.summary.json')
+    fpflat=os.path.join(p, point+'.flat.json')
+
+    try:
+       if os.path.getmtime(fpsum)<os.path.getmtime(fpflat):
+          return {'return':0, 'dict':None}
+    except OSError:
+       return {'return':0, 'dict':None}
+
+    r=ck.load_json_file({'json_file':fpsum})
+    if r['return']>0: return {'return':0, 'dict':None}
+    ds=r['dict']
+
+    lk=ds.get('list_keys',[])
+    for k in keys:
+        if k in lk or k.endswith('#all') or k.endswith('#all_unique'):
+           return {'return':0, 'dict':None}
+
+    return {'return':0, 'dict':ds.get('keys',{}), 'list_keys':lk}
+
+##############################################################################
+# internal function to get all flat keys of a given point (from summary if possible)
+
+def point_keys(p, point):
+
+    r=load_summary(p, point, [])
+    if r['return']>0: return r
+
+    if r['dict']!=None:
+       keys=list(r['dict'].keys())+r['list_keys']
+    else:
+       r=ck.load_json_file({'json_file':os.path.join(p, point+'.flat.json')})
+       if r['return']>0: return r
+       d=r['dict']
+
+       r=load_samples(p, point, d)
+       if r['return']>0: return r
+
+       keys=list(d.keys())
+
+    return {'return':0, 'keys':keys}
+
+##############################################################################
+# internal function to load schema of flat keys of points in entry (number of points per key)
+# (schema is None if it is not in sync with entry and should not be rebuilt)
+
+def load_keys_schema(i):
+
+    p=i['path']
+    ep=str(i.get('entry_points',''))
+
+    pk=os.path.join(p, cfg.get('keys_schema_file','keys.json'))
+
+    if os.path.isfile(pk):
+       r=ck.load_json_file({'json_file':pk})
+       if r['return']==0:
+          d=r['dict']
+          if d.get('entry_points','')==ep:
+             return {'return':0, 'schema':{'path':p, 'entry_points':ep, 'points':d.get('points',0),
+                                           'keys':d.get('keys',{}), 'changed':False, 'saved_entry_points':ep}}
+
+    if i.get('rebuild','')!=True and i.get('rebuild','')!='yes':
+       return {'return':0, 'schema':None}
+
+    # Rebuild schema from all points
+    ksch={'path':p, 'entry_points':ep, 'points':0, 'keys':{}, 'changed':True, 'saved_entry_points':None}
+
+    for fn in sorted(os.listdir(p)):
+        if fn.startswith('ckp-') and fn.endswith('.flat.json'):
+           r=point_keys(p, fn[:-10])
+           if r['return']>0: return r
+
+           update_keys_schema(ksch, None, r['keys'])
+
+    return {'return':0, 'schema':ksch}
+
+##############################################################################
+# internal function to update schema of flat keys with keys of new or updated point
+# (okeys is None for new point)
+
+def update_keys_schema(ksch, okeys, keys):
+
+    kk=ksch['keys']
+
+    if okeys==None:
+       ksch['points']+=1
+
+    for k in keys:
+        if okeys==None or k not in okeys:
+           kk[k]=kk.get(k,0)+1
+           ksch['changed']=True
+
+    return
+
+##############################################################################
+# internal function to save schema of flat keys of points in entry
+
+def save_keys_schema(ksch):
+
+    pk=os.path.join(ksch['path'], cfg.get('keys_schema_file','keys.json'))
+
+    if not ksch['changed'] and ksch['saved_entry_points']==ksch['entry_points']:
+       return {'return':0}
+
+    r=ck.save_json_to_file({'json_file':pk, 'dict':{'entry_points':ksch['entry_points'], 'points':ksch['points'], 'keys':ksch['keys']},
+                            'sort_keys':'yes'})
+    if r['return']>0: return r
+
+    ksch['changed']=False
+    ksch['saved_entry_points']=ksch['entry_points']
+
+    return {'return':0}
+
+##############################################################################
+# sort table
+
+def sort_table(i):
+    """
+    Input:  {
+              table        - experiment table
+              sort_index   - if !='', sort by this number within vector (i.e. 0 - X, 1 - Y, etc)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              table        - updated experient table
+            }
+
+    """
+
+    table=i['table']
+    si=i['sort_index']
+
+    isi=int(si)
+    for sg in table:
+        x=table[sg]
+        y=sorted(x, key=lambda var: 0 if var[isi] is None else var[isi])
+        table[sg]=y
+
+    return {'return':0, 'table':table}
+
+##############################################################################
+# substitute x axis in table with loop
+
+def substitute_x_with_loop(i):
+    """
+    Input:  {
+              table        - experiment table
+              (add_x_loop) - if 'yes', insert first vector dimension with a loop
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+              table        - updated experient table
+            }
+
+    """
+
+    table=i['table']
+
+    axl=i.get('add_x_loop','')
+
+    if axl=='yes':
+       for q in table:
+           tq=table[q]
+           for iv in range(0, len(tq)):
+               v=tq[iv]
+               v.insert(0, 0.0)
+
+    for sg in table:
+        h=0
+        x=table[sg]
+        for q in range(0, len(x)):
+            h+=1
+            x[q][0]=h
+        table[sg]=x
+
+    return {'return':0, 'table':table}
+
+##############################################################################
+# filter function
+
+def get_all_meta_filter(i):
+
+    dd=i.get('dict',{})
+    d=i.get('dict_orig',{})
+    aggr=i.get('aggregation',{})
+
+    ks=aggr.get('keys_start','')
+    ke=aggr.get('keys_end','')
+
+    ameta=aggr.get('meta',{})
+    atags=aggr.get('tags',{})
+    akeys=aggr.get('keys',[])
+
+    # Process meta
+    meta=d.get('meta',{})
+    for k in meta:
+        v=meta[k]
+
+        if k not in ameta:
+           ameta[k]=[v]
+        else:
+           if v not in ameta[k]:
+              ameta[k].append(v)
+
+    # Process keys
+    for k in dd:
+        add=True
+
+        if ks!='' and not k.startswith(ks): add=False
+        if add and ke!='' and not k.endswith(ke): add=False
+
+        if add and k not in akeys:
+           akeys.append(k)
+
+    # Process meta
+    tags=d.get('tags',[])
+    for v in tags:
+        if v not in atags:
+           atags[v]=1
+        else:
+           atags[v]+=1
+
+    aggr['meta']=ameta
+    aggr['tags']=atags
+    aggr['keys']=akeys
+            
+    return {'return':0}
+
+##############################################################################
+# entry function for get_all_meta (aggregate whole entry from schema of keys
+# instead of loading flat file of each point)
+
+def get_all_meta_entry(i):
+
+    p=i['path']
+    d=i.get('dict_orig',{})
+    dl=i.get('dir_list',[])
+    aggr=i.get('aggregation',{})
+
+    # Points marked as deleted are still in schema
+    if cfg.get('tombstones_file','tombstones.json') in dl:
+       return {'return':0, 'processed':'no'}
+
+    r=load_keys_schema({'path':p, 'entry_points':d.get('points','0')})
+    if r['return']>0: return r
+    ksch=r['schema']
+
+    if ksch==None:
+       return {'return':0, 'processed':'no'}
+
+    npts=ksch['points']
+    if npts>0:
+       ks=aggr.get('keys_start','')
+       ke=aggr.get('keys_end','')
+
+       ameta=aggr.get('meta',{})
+       atags=aggr.get('tags',{})
+       akeys=aggr.get('keys',[])
+
+       # Process meta
+       meta=d.get('meta',{})
+       for k in meta:
+           v=meta[k]
+
+           if k not in ameta:
+              ameta[k]=[v]
+           else:
+              if v not in ameta[k]:
+                 ameta[k].append(v)
+
+       # Process keys
+       sakeys=set(akeys)
+       for k in sorted(ksch['keys']):
+           add=True
+
+           if ks!='' and not k.startswith(ks): add=False
+           if add and ke!='' and not k.endswith(ke): add=False
+
+           if add and k not in sakeys:
+              akeys.append(k)
+              sakeys.add(k)
+
+       # Process tags (once per point as in get_all_meta_filter)
+       tags=d.get('tags',[])
+       for v in tags:
+           if v not in atags:
+              atags[v]=npts
+           else:
+              atags[v]+=npts
+
+       aggr['meta']=ameta
+       aggr['tags']=atags
+       aggr['keys']=akeys
+
+    return {'return':0, 'processed':'yes'}
+
+##############################################################################
+# merge partial aggregations of get_all_meta_filter (reduce step for parallel filter)
+#
+# Merge is associative (values and keys are appended in order of first appearance
+# and tags are summed), so any grouping of entries gives the same result as sequential filter
+
+def get_all_meta_reduce(i):
+
+    aggr=i['aggregation']
+    part=i['partial']
+
+    ameta=aggr.get('meta',{})
+    atags=aggr.get('tags',{})
+    akeys=aggr.get('keys',[])
+
+    pmeta=part.get('meta',{})
+    for k in pmeta:
+        if k not in ameta:
+           ameta[k]=[]
+        for v in pmeta[k]:
+            if v not in ameta[k]:
+               ameta[k].append(v)
+
+    ptags=part.get('tags',{})
+    for v in ptags:
+        if v not in atags:
+           atags[v]=ptags[v]
+        else:
+           atags[v]+=ptags[v]
+
+    sakeys=set(akeys)
+    for k in part.get('keys',[]):
+        if k not in sakeys:
+           akeys.append(k)
+           sakeys.add(k)
+
+    aggr['meta']=ameta
+    aggr['tags']=atags
+    aggr['keys']=akeys
+
+    return {'return':0, 'aggregation':aggr}
+
+##############################################################################
+# Get all meta information from entries
+
+def get_all_meta(i):
+    """
+    Input:  {
+               Input for 'filter' function
+
+               (aggregation) - dict with some params
+                               (keys_start) - prune keys
+                               (keys_end)   - prune keys
+
+               (parallel)    - if 'processes' or 'threads', scan entries in parallel (see "filter")
+               (workers)     - number of workers
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              all_meta     - each key is a list with all values
+              all_tags     - each key is a tag with a number of occurances
+            }
+
+    """
+
+    o=i.get('out','')
+
+    import copy
+    ii=copy.deepcopy(i)
+
+    ii['filter_func']='get_all_meta_filter'
+    ii['reduce_func']='get_all_meta_reduce'
+    if cfg.get('keys_schema','')=='yes':
+       ii['entry_func']='get_all_meta_entry'
+
+    r=filter(ii)
+    if r['return']>0: return r
+
+    aggr=r.get('aggregation',{})
+
+    ameta=aggr.get('meta',{})
+    atags=aggr.get('tags',{})
+    akeys=aggr.get('keys',{})
+
+    if o=='con':
+       import json
+
+       ck.out('Keys:')
+       ck.out('')
+       for q in sorted(akeys):
+           ck.out('   "'+q+'",')
+
+       ck.out('')
+       ck.out('Meta:')
+       ck.out('')
+       ck.out(json.dumps(ameta, indent=2, sort_keys=True))
+
+       ck.out('')
+       ck.out('Tags:')
+       ck.out('')
+
+       satags=[(k, atags[k]) for k in sorted(atags, key=atags.get, reverse=True)]
+
+       for k,v in satags:
+           ck.out(k+' = '+str(v))
+
+    return {'return':0, 'all_meta':ameta, 'all_tags':atags}
+
+##############################################################################
+# filter / pre-process data
+
+def filter(i):
+    """
+    Input:  {
+              Select entries or table:
+                 (repo_uoa) or (experiment_repo_uoa)     - can be wild cards
+                 (remote_repo_uoa)                       - if remote access, use this as a remote repo UOA
+                 (module_uoa) or (experiment_module_uoa) - can be wild cards
+                 (data_uoa) or (experiment_data_uoa)     - can be wild cards
+
+                 (repo_uoa_list)                       - list of repos to search
+                 (module_uoa_list)                     - list of module to search
+                 (data_uoa_list)                       - list of data to search
+
+                 (search_dict)                         - search dict
+                 (ignore_case)                         - if 'yes', ignore case when searching
+
+                 (filter_func)        - name of filter function
+                 (filter_func_addr)   - address of filter function
+
+                 (entry_func)         - name of function to process whole entry at once
+                                        ({'path', 'dict_orig', 'dir_list', 'aggregation'} -> {'return', 'processed'});
+                                        if processed=='yes', points of this entry are not passed to (filter_func)
+                 (entry_func_addr)    - address of this function
+
+              (aggregation)           - dictionary to aggregate information across entries
+
+              (parallel)              - if 'processes' or 'threads', process entries in a pool of workers (map step);
+                                        each worker starts from a copy of (aggregation), i.e. it should only hold parameters,
+                                        and partial aggregations are merged in order of entries by (reduce_func) (reduce step).
+                                        Processes are only used with (filter_func) and (reduce_func) from this module
+                                        (threads are used otherwise)
+              (workers)               - number of workers (number of CPU cores by default)
+
+              (reduce_func)           - name of function to merge partial aggregations
+                                        ({'aggregation', 'partial'} -> {'return', 'aggregation'}); should be associative
+              (reduce_func_addr)      - address of this function
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              (aggregation)           - dictionary to aggregate information across entries
+            }
+
+    """
+
+    o=i.get('out','')
+
+    ruoa=i.get('repo_uoa','')
+    xruoa=i.get('experiment_repo_uoa','')
+    if xruoa!='': ruoa=xruoa
+
+    rruoa=i.get('remote_repo_uoa','')
+
+    muoa=i.get('experiment_module_uoa','')
+    if muoa=='': muoa=i.get('module_uoa','')
+
+    duoa=i.get('experiment_data_uoa','')
+    if duoa=='': duoa=i.get('data_uoa','')
+
+    ruoal=i.get('repo_uoa_list',[])
+    muoal=i.get('module_uoa_list',[])
+    duoal=i.get('data_uoa_list',[])
+
+    sd=i.get('search_dict',{})
+    ic=i.get('ignore_case','')
+
+    sff=i.get('filter_func','')
+    ff=i.get('filter_func_addr',None)
+    if sff!='': 
+       import sys
+       ff=getattr(sys.modules[__name__], sff)
+
+    # Search entries
+    ii={'action':'search',
+        'common_func':'yes',
+        'repo_uoa':ruoa,
+        'remote_repo_uoa': rruoa,
+        'module_uoa':muoa,
+        'data_uoa':duoa,
+        'repo_uoa_list':ruoal,
+        'module_uoa_list':muoal,
+        'data_uoa_list':duoal,
+        'search_dict':sd,
+        'ignore_case':ic}
+    r=ck.access(ii)
+    if r['return']>0: return r
+
+    lst=r['lst']
+
+    aggr=i.get('aggregation',{})
+
+    par=i.get('parallel','')
+
+    srf=i.get('reduce_func','')
+    rf=i.get('reduce_func_addr',None)
+    if srf!='':
+       import sys
+       rf=getattr(sys.modules[__name__], srf)
+
+    if rf==None or len(lst)<2: par=''
+
+    sef=i.get('entry_func','')
+    ef=i.get('entry_func_addr',None)
+    if sef!='':
+       import sys
+       ef=getattr(sys.modules[__name__], sef)
+
+    jobs=[]
+    for e in lst:
+        jobs.append({'repo_uid':e['repo_uid'],
+                     'module_uoa':e['module_uoa'],
+                     'module_uid':e['module_uid'],
+                     'data_uoa':e['data_uoa'],
+                     'data_uid':e['data_uid'],
+                     'filter_func':sff,
+                     'filter_func_addr':ff,
+                     'entry_func':sef,
+                     'entry_func_addr':ef,
+                     'out':o})
+
+    if par=='processes' or par=='threads':
+       import copy
+
+       nw=i.get('workers','')
+       if nw=='' or nw==None:
+          import multiprocessing
+          nw=multiprocessing.cpu_count()
+       nw=int(nw)
+       if nw>len(jobs): nw=len(jobs)
+       if nw<1: nw=1
+
+       # Map step (each entry is processed with a copy of aggregation)
+       for job in jobs:
+           job['aggregation']=copy.deepcopy(aggr)
+
+       pool=None
+       if par=='processes' and sff!='' and srf!='' and (ef==None or sef!=''):
+          # Forked workers reuse already initialized CK kernel and this module
+          import multiprocessing
+          try:
+             ctx=multiprocessing.get_context('fork')
+             pool=ctx.Pool(nw)
+          except (AttributeError, ValueError):
+             pool=None
+
+          for job in jobs:
+              del(job['filter_func_addr'])
+              del(job['entry_func_addr'])
+
+       if pool==None:
+          from multiprocessing.pool import ThreadPool
+          pool=ThreadPool(nw)
+
+       try:
+          res=pool.map(filter_entry, jobs)
+       finally:
+          pool.close()
+          pool.join()
+
+       # Reduce step (merge partial aggregations in order of entries)
+       for q in range(0, len(res)):
+           r=res[q]
+           if r['return']>0: return r
+
+           if q==0:
+              aggr=r['aggregation']
+           else:
+              r=rf({'aggregation':aggr, 'partial':r['aggregation']})
+              if r['return']>0: return r
+              aggr=r['aggregation']
+    else:
+       # Iterate over entries
+       for job in jobs:
+           job['aggregation']=aggr
+
+           r=filter_entry(job)
+           if r['return']>0: return r
+
+    return {'return':0, 'aggregation':aggr}
+
+##############################################################################
+# internal function to process all points of one entry with filter function (map step of filter)
+
+def filter_entry(i):
+
+    o=i.get('out','')
+
+    aggr=i['aggregation']
+
+    ff=i.get('filter_func_addr',None)
+    sff=i.get('filter_func','')
+    if ff==None and sff!='':
+       import sys
+       ff=getattr(sys.modules[__name__], sff)
+
+    # Load entry
+    if o=='con':
+       ck.out('Loading entry '+i['module_uoa']+':'+i['data_uoa']+' ...')
+
+    ii={'action':'load',
+        'repo_uoa':i['repo_uid'],
+        'module_uoa':i['module_uid'],
+        'data_uoa':i['data_uid']}
+    r=ck.access(ii)
+    if r['return']>0: return r
+
+    rl=r
+
+    p=r['path']
+    dd=r['dict']
+
+    dirList=os.listdir(p)
+
+    # Process entry at once if possible (for example, from schema of keys)
+    ef=i.get('entry_func_addr',None)
+    sef=i.get('entry_func','')
+    if ef==None and sef!='':
+       import sys
+       ef=getattr(sys.modules[__name__], sef)
+
+    if ef!=None:
+       rx=ef({'path':p, 'dict_orig':dd, 'dir_list':dirList, 'aggregation':aggr})
+       if rx['return']>0: return rx
+
+       if rx.get('processed','')=='yes':
+          return {'return':0, 'aggregation':aggr}
+
+    # Skip points marked as deleted
+    r=load_tombstones(p, dirList)
+    if r['return']>0: return r
+    tomb=r['tombstones']
+
+    cpoints=[]
+
+    for fn in dirList:
+        if fn.endswith('.flat.json'):
+           if fn[4:-10] in tomb: continue
+
+           fpflat1=os.path.join(p, fn)
+
+           r=ck.load_json_file({'json_file':fpflat1})
+           if r['return']>0: return r
+           df=r['dict']
+
+           # Load all values from sample store (if used)
+           point=fn[:-10]
+           r=load_samples(p, point, df)
+           if r['return']>0: return r
+           sidx=r['index']
+
+           rx=ff({'dict':df, 'dict_orig':dd, 'aggregation':aggr})
+           if rx['return']>0: return rx
+
+           changed=rx.get('changed','')
+           df=rx.get('dict',{})
+
+           if changed=='yes':
+              dfs=df
+              if len(sidx)>0:
+                 r=save_samples(p, point, df, sidx, True)
+                 if r['return']>0: return r
+                 df=r['dict']
+
+              r=ck.save_json_to_file({'json_file':fpflat1, 'dict':df})
+              if r['return']>0: return r
+
+              if cfg.get('summary','')=='yes':
+                 r=save_summary(p, point, dfs)
+                 if r['return']>0: return r
+
+              # Values may change without changing their number, i.e. running statistics
+              # can't be validated by count and are restored from #all on next "add"
+              fpstat=os.path.join(p, point+'.stats.json')
+              if os.path.isfile(fpstat): os.remove(fpstat)
+
+              # Keys may change, i.e. schema of keys should be rebuilt
+              pk=os.path.join(p, cfg.get('keys_schema_file','keys.json'))
+              if os.path.isfile(pk): os.remove(pk)
+
+              # Change mtime of entry directory to invalidate cached tables (see "get")
+              os.utime(p, None)
+
+              cpoints.append(point[4:])
+
+    # Update catalog of points (if used)
+    if len(cpoints)>0:
+       r=update_catalog({'entry':rl, 'points':cpoints})
+       if r['return']>0: return r
+
+    return {'return':0, 'aggregation':aggr}
+
+##############################################################################
+# list all points in an entry
+
+def list_points(i):
+    """
+    Input:  {
+               data_uoa            - experiment data UOA
+               (repo_uoa)          - experiment repo UOA
+               (remote_repo_uoa)   - if repo_uoa is remote repo, use this to specify which local repo to use at the remote machine
+               (module_uoa)
+                    or
+               (path)              - if called from internal modules, can specify path of the experiment entry directly ...
+
+               (prune_by_features) - flat dict with features to check (no wild cards here)
+
+               (point)             - get subpoints for a given point
+               (skip_subpoints)    - if 'yes', do not show number of subpoints
+
+               (extra_path)        - add extra path before points (useful when versioning is used)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              points       - list of point UIDs
+              (subpoints)  - if 'point' is selected, list of subpoints
+
+              dict         - dict of entry (if not loaded by path)
+              path         - local path to the entry
+            }
+
+    """
+
+    o=i.get('out','')
+
+    p=i.get('path','')
+    d={}
+
+    puid=i.get('point','')
+
+    extra_path=i.get('extra_path','')
+
+    if p=='':
+       # Attempt to load entry
+       duoa=i.get('data_uoa','')
+       muoa=i.get('module_uoa','')
+       ruoa=i.get('repo_uoa','')
+       rruoa=i.get('remote_repo_uoa','')
+
+       ii={'action':'load',
+           'module_uoa':muoa,
+           'data_uoa':duoa,
+           'repo_uoa':ruoa}
+       if i.get('repo_module_uoa','')!='': ii['repo_module_uoa']=i['repo_module_uoa']
+
+       if rruoa!='': ii['remote_repo_uoa']=rruoa
+       rx=ck.access(ii)
+       if rx['return']>0: return rx
+       p=rx['path']
+       d=rx['dict']
+
+    if extra_path!='':
+       p=os.path.join(p, extra_path)
+       # Check if there is versions meta
+       pmeta=os.path.join(p, '.cm', 'meta.json')
+       if os.path.isfile(pmeta):
+          rx=ck.load_json_file({'json_file':pmeta})
+          if rx['return']>0: return rx
+          d=rx['dict']
+
+    points=[]
+    skiped_points=[]
+    subpoints=[]
+
+    ssp=i.get('skip_subpoints','')
+
+    pp=i.get('prune_by_features',{})
+
+    # Start listing points (cached manifest of points of this entry)
+    rx=get_points_manifest(p)
+    if rx['return']>0: return rx
+    man=rx['manifest']
+
+    # Skip points marked as deleted
+    tomb={}
+    if man['tombstones']:
+       rx=load_tombstones(p)
+       if rx['return']>0: return rx
+       tomb=rx['tombstones']
+
+    # Check if can find points by features via index (if it is in sync with points)
+    fpoints=None
+    if len(pp)>0:
+       nf=man['features']
+
+       rx=load_features_index({'path':p, 'points':nf})
+       if rx['return']>0: return rx
+       fidx=rx['index']
+
+       if fidx!=None:
+          rx=get_points_by_features(fidx, features_digest(pp))
+          if rx['return']>0: return rx
+          fpoints=rx['points']
+       else:
+          rx=compile_features_matcher({'features':pp, 'space_as_none':'yes'})
+          if rx['return']>0: return rx
+          fmatch=rx['matcher']
+
+    if len(tomb)==0 and len(pp)==0:
+       points=list(man['points'])
+    else:
+       for uid in man['points']:
+           if uid in tomb:
+              skiped_points.append(uid)
+              continue
+
+           if fpoints!=None:
+              if uid not in fpoints:
+                 skiped_points.append(uid)
+                 continue
+           elif len(pp)>0:
+              skip=True
+
+              if 'features_flat.json' in man['files'][uid]:
+                 px=os.path.join(p, 'ckp-'+uid+'.features_flat.json')
+                 rx=ck.load_json_file({'json_file':px})
+                 if rx['return']>0: return rx
+                 ft=rx['dict']
+
+                 if match_features(fmatch, ft):
+                    skip=False
+
+              if skip:
+                 skiped_points.append(uid)
+                 continue
+
+           points.append(uid)
+
+    if puid!='' and puid in man['index'] and puid not in skiped_points:
+       subpoints=list(man['subpoints'][puid])
+
+    if o=='con':
+       if ssp!='yes' and puid!='':
+          for k in subpoints:
+              ck.out(puid+'-'+k)
+       else:
+          for q in points:
+              ck.out(q)
+
+    return {'return':0, 'path':p, 'dict':d, 'points':points, 'points_count':len(points), 'subpoints':subpoints}
+
+##############################################################################
+# internal function to get signature of entry to validate cached contributions of entry to tables in "get"
+# (name, size, inode and mtime of meta and of all files in entry directory, since files of points
+#  may be rewritten in place without changing mtime of entry directory)
+
+def get_entry_signature(p):
+
+    sig=[]
+
+    try:
+       for fn in sorted(os.listdir(p)):
+           x=os.stat(os.path.join(p, fn))
+           sig.append([fn, x.st_size, x.st_ino, x.st_mtime])
+
+       x=os.stat(os.path.join(p, ck.cfg['subdir_ck_ext'], ck.cfg['file_meta']))
+       sig.append([ck.cfg['file_meta'], x.st_size, x.st_ino, x.st_mtime])
+    except OSError as e:
+       return {'return':1, 'error':'can\'t access entry directory ('+format(e)+')'}
+
+    return {'return':0, 'signature':sig}
+
+##############################################################################
+# internal function to get manifest of points of entry (point UID -> extensions of files and subpoints)
+#
+# Manifest is cached in memory and is validated by mtime of entry directory
+# (it changes whenever files of points are added or removed)
+
+def get_points_manifest(p):
+
+    global points_cache
+
+    import time
+    import collections
+
+    try:
+       mt=os.stat(p).st_mtime
+    except OSError as e:
+       return {'return':1, 'error':'can\'t access entry directory ('+format(e)+')'}
+
+    if points_cache==None: points_cache=collections.OrderedDict()
+
+    man=points_cache.pop(p, None)
+    if man!=None and man['mtime']==mt:
+       points_cache[p]=man # move to the end of LRU
+       return {'return':0, 'manifest':man}
+
+    dirList=os.listdir(p)
+
+    points=[]
+    index={}
+    files={}
+    subpoints={}
+    nf=0
+
+    for fn in sorted(dirList):
+        if fn.startswith('ckp-'):
+           if len(fn)>20 and fn[20]=='.':
+              uid=fn[4:20]
+
+              if uid not in index:
+                 index[uid]=len(points)
+                 points.append(uid)
+                 files[uid]=[]
+                 subpoints[uid]=[]
+
+              ext=fn[21:]
+              files[uid].append(ext)
+
+              if ext=='features_flat.json':
+                 nf+=1
+
+              if len(fn)>25 and fn[25]=='.':
+                 suid=fn[21:25]
+                 if suid!='flat' and suid!='desc' and suid!='deps':
+                    subpoints[uid].append(suid)
+
+    man={'mtime':mt,
+         'points':points,
+         'index':index,
+         'files':files,
+         'subpoints':subpoints,
+         'features':nf,
+         'tombstones':(cfg.get('tombstones_file','tombstones.json') in dirList)}
+
+    # Do not cache manifest if directory was changed just now since next change
+    # may happen within resolution of mtime and will not be noticed
+    if time.time()-mt>1.0:
+       points_cache[p]=man
+
+       cs=int(cfg.get('points_cache_size',256))
+       while len(points_cache)>cs:
+          points_cache.popitem(last=False)
+
+    return {'return':0, 'manifest':man}
+
+
+##############################################################################
+# replay experiment == the same as reproduce
+
+def replay(i):
+    """
+    Input:  {
+               data_uoa                      - experiment data UOA (can have wildcards)
+               (repo_uoa)                    - experiment repo UOA (can have wildcards)
+               (experiment_repo_uoa)         - use it, if repository is remote
+               (remote_repo_uoa)             - if repo above is remote, use this repo on remote machine
+
+               (module_uoa)
+               (tags)                        - search by tags
+
+               (point)                       - point (or skip, if there is only one), can be of format UID-<subpoint>
+               (subpoint)                    - subpoint (or skip, if there is only one)
+
+               (repetitions)                 - statistical repetitions (default=4)
+               (pipeline_update)             - customize pipeline with this dict (useful to update already prepared pipeline from file)
+
+               (dims_to_check) or (dims)     - list of dimensions to check, can have wildcards (if empty, check all); 
+                                               alternatively can use a string (useful for CMD)
+               (end_of_dims_to_check)        - list of endings of dimensions to compare ...
+
+               (threshold_to_compare)        - % threshold to decide whether dim is different or not
+
+               (record_original_flat_json)   - file to record flat dict with original results
+               (record_reproduced_flat_json) - file to record flag dict with reproduced results
+
+               (skip)                        - if 'yes', do not perform comparison
+
+               ==============================
+                 If one would like to compare results with another point (for example, to check speedups 
+                 rather than just reproducing a given point)
+
+               (compare_data_uoa)
+               (compare_repo_uoa)
+               (compare_point)
+               (compare_subpoint)
+
+               ==============================
+                 Prunning (reducing complexity)
+
+               (prune)                          - if 'yes', replay and prune choices!
+               (reduce)                         - the same as above
+               (reduce_bug)                     - reduce choices to localize bug (pipeline fail)
+
+               (prune_md5)                      - if 'yes' and compilation is used in a pipeline (workflow), check if binary MD5 doesn't change
+               (prune_invert)                   - if 'yes', prune all (switch off even unused - useful for collaborative machine learning)
+               (prune_print_keys)               - list of keys from flat dict to print during pruning (to monitor characteristics, for example)
+               (prune_invert_do_not_remove_key) - if 'yes', keep both on and off keys (to know exact solution)
+
+               (prune_conditions)    - conditions on results (see "ck check math.conditions --help")
+               (condition_objective) - which objective to use for characteristics (#min, #max, #exp, ...)
+
+               (solutions) - prune first solution
+
+               ==============================
+               (record_uoa)                       - (data UOA or CID where module_uoa ignored!) explicitly record to this entry
+               (record_repo)                      - (repo UOA) explicitly select this repo to record
+
+               ==============================
+                 Some productivity keys specifically for autotuning pipeline (ck-autotuning repo):
+
+               (local_platform) or (local)   - if 'yes', use parameters of a local platform (to retarget experiment)
+               (skip_target)                 - do not select target machines (to customize via host_os/target_os/device_id)
+               (no_deps)                     - if 'yes', do not reuse deps
+               (skip_clean_after)            - if 'yes', do not clean program pipeline after execution 
+                                               (keeping low level scripts in tmp directory for low-level debugging)
+               (all)                         - print all comparisons of keys (not only when there is a difference)
+
+               (skip_scenario_keys)          - skip scenario detection (otherwise get keys from the detected module) 
+
+
+
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              output of a given pipeline
+
+              different_dims - list of different dimensions
+            }
+    """
+
+    import os
+
+    o=i.get('out','')
+
+    ruoa=i.get('repo_uoa','')
+    if i.get('experiment_repo_uoa','')!='': ruoa=i['experiment_repo_uoa']
+    cruoa=ruoa
+    rruoa=i.get('remote_repo_uoa','')
+
+    record=''
+    record_uoa=i.get('record_uoa','')
+    record_repo=i.get('record_repo','')
+    if record_uoa!='': record='yes'
+
+    # Check if repo remote (to save in json rather than to out)
+    remote='no'
+    if ruoa!='':
+       rx=ck.load_repo_info_from_cache({'repo_uoa':ruoa})
+       if rx['return']>0: return rx
+       remote=rx.get('dict',{}).get('remote','')
+
+    muoa=i.get('module_uoa','')
+    duoa=i.get('data_uoa','')
+
+    pipeline_update=i.get('pipeline_update',{})
+    repetitions=i.get('repetitions','')
+
+    solutions=i.get('solutions',[])
+
+    prune=i.get('prune','')
+    if prune=='':
+       prune=i.get('reduce','')
+
+    reduce_bug=i.get('reduce_bug','')
+    if reduce_bug=='yes': prune='yes'
+
+    prune_md5=i.get('prune_md5','')
+    prune_invert=i.get('prune_invert','')
+    prune_print_keys=i.get('prune_print_keys',[])
+
+    if i.get('local_platform','')!='': pipeline_update['local_platform']=i['local_platform']
+    if i.get('local','')!='':          pipeline_update['local_platform']=i['local']
+    if i.get('skip_clean_after','')!='': pipeline_update['skip_clean_after']=i['skip_clean_after']
+    if i.get('skip_target','')!='': pipeline_update['skip_target']=i['skip_target']
+
+    pp=os.getcwd()+os.path.sep
+
+    ii={'out':'',
+        'repo_uoa':ruoa,
+        'module_uoa':muoa,
+        'data_uoa':duoa,
+        'action':'search',
+        'add_meta':'yes'}
+    if rruoa!='': ii['remote_repo_uoa']=rruoa
+    r=ck.access(ii)
+    if r['return']>0: return r
+
+    dmeta={}
+
+    lst=r['lst']
+    if len(lst)==0:
+       return {'return':1, 'error':'entry not found'}
+    elif len(lst)==1:
+       ruoa=lst[0]['repo_uoa']
+
+       muoa=lst[0]['module_uoa']
+       duoa=lst[0]['data_uoa']
+
+       dmeta=lst[0]['meta']
+    else:
+       if o=='con':
+          r=ck.select_uoa({'choices':lst})
+          if r['return']>0: return r
+          duoa=r['choice']
+
+          for q in lst:
+              if q['data_uid']==duoa:
+                 dmeta=q['meta']
+                 break
+
+          ck.out('')
+       else:
+          return {'return':1, 'error':'multiple entries found - please prune search', 'lst':lst}
+
+    sm_uoa=dmeta.get('meta',{}).get('scenario_module_uoa','')
+
+    if o=='con':
+       ck.out('Found entry '+duoa+'!')
+       ck.out('')
+
+    if remote=='yes':
+       rruoa=ruoa
+       ruoa=cruoa
+
+    # Check point
+    puid=i.get('point','')
+    sp=i.get('subpoint','')
+    if puid.find('-')>=0:
+       puid,sp=puid.split('-')
+    puid=puid.strip()
+    spid=sp.strip()
+
+    # If point is not specified, get points
+    if puid=='':
+       ii={'repo_uoa':ruoa,
+           'module_uoa':muoa,
+           'data_uoa':duoa,
+           'action':'list_points'}
+       if rruoa!='': ii['remote_repo_uoa']=rruoa
+       rx=ck.access(ii)
+       if rx['return']>0: return rx
+
+       points=rx['points']
+       if len(points)==0:
+          return {'return':1, 'error':'no points found in a given entry'}
+       elif len(points)>1:
+          if o=='con':
+             ck.out('Multiple points:')
+             for q in points:
+                 ck.out('  '+q)
+             ck.out('')
+          return {'return':1, 'error':'select a point in a given entry (via --point=[above point UID])'}
+       else:
+          puid=points[0]
+
+    # If subpoint is not specified, get subpoints
+    if spid=='':
+       ii={'repo_uoa':ruoa,
+           'module_uoa':muoa,
+           'data_uoa':duoa,
+           'point':puid,
+           'action':'list_points'}
+       rx=ck.access(ii)
+       if rx['return']>0: return rx
+
+       spoints=rx['subpoints']
+       if len(spoints)==0:
+          return {'return':1, 'error':'no subpoints found in a given entry'}
+       elif len(spoints)>1:
+          if o=='con':
+             ck.out('Multiple subpoints:')
+             for q in spoints:
+                 ck.out('  '+q)
+             ck.out('')
+          return {'return':1, 'error':'select a given subpoint for a given point in a given entry'}
+       else:
+          spid=spoints[0]
+
+    # Get all info about this point
+    ii={'repo_uoa':ruoa,
+        'module_uoa':muoa,
+        'data_uoa':duoa,
+        'point':puid,
+        'subpoint':spid,
+        'add_pipeline':'yes',
+        'action':'load_point'}
+    rx=ck.access(ii)
+    if rx['return']>0: return rx
+
+    pipeline_uoa=rx['pipeline_uoa']
+    pipeline_uid=rx['pipeline_uid']
+    pipeline=rx['pipeline']
+
+    dd=rx['dict']
+
+    al=i.get('all','')
+
+    ch=dd.get('flat',{})
+
+    ft=dd.get('features',{})
+    choices=ft.get('choices',{})
+    choices_order=ft.get('choices_order',[])
+    choices_desc=pipeline.get('choices_desc',[])
+
+
+#    Before 20170828 - when replay was generating random choices in fact (when choices present)!
+#    That's why now force to create solution -> this skips random generation
+#    if ((prune=='yes' or prune_invert=='yes') and len(solutions)==0):
+
+    if len(solutions)==0:
+       # Rebuild choices
+       rebuild_choices_order=[]
+       rebuild_choices={}
+       for k in choices_order:
+           rz=ck.get_by_flat_key({'dict':choices, 'key':k})
+           if rz['return']>0: return rz
+           vv=rz['value']
+           if vv!=None:
+#              k1='##choices'+k[1:]
+              k1=k
+              rebuild_choices_order.append(k1)
+              rebuild_choices[k1]=vv
+
+       solutions=[{
+                   'points':[
+                      {'pruned_choices_order':rebuild_choices_order,
+                       'pruned_choices':rebuild_choices}
+                   ]
+                 }]
+
+    cf=dd.get('features',{}) # choices and features
+    if 'sub_points' in cf: del(cf['sub_points'])
+
+    deps=dd.get('deps',{})
+
+    # Check if compare with results from another point *******************************
+    cduoa=i.get('compare_data_uoa','')
+    cruoa=i.get('compare_repo_uoa','')
+    cpuid=i.get('compare_point','')
+    csp=i.get('compare_subpoint','')
+    if cpuid.find('-')>=0:
+       cpuid,csp=cpuid.split('-')
+    cpuid=cpuid.strip()
+    cspid=csp.strip()
+
+    if cduoa!='' or cpuid!='' or cspid!='':
+       if o=='con':
+          ck.out('Loading dimensions to compare from different entry '+cduoa+' ...')
+          ck.out('')
+
+       ii={'repo_uoa':cruoa,
+           'module_uoa':muoa,
+           'data_uoa':cduoa,
+           'point':cpuid,
+           'subpoint':cspid,
+           'action':'load_point'}
+       rx=ck.access(ii)
+       if rx['return']>0: return rx
+
+       cdd=rx['dict']
+
+       ch=cdd.get('flat',{})
+
+    # Get list of dimensions to check
+    kdc={} # key desc
+
+    dc=i.get('dims_to_check',[])
+
+    if len(dc)==0: dc=i.get('dims',[])
+
+    if type(dc)!=list: dc=[dc]
+
+    pap={}
+    if len(dc)>0:
+       # On Linux from CMD substitute ^ with #
+       for q in range(0, len(dc)):
+           dc[q]=dc[q].replace('^','#')
+
+    else:
+       # Try to detect from scenario
+       if i.get('skip_scenario_keys','')!='yes' and sm_uoa!='':
+          ry=ck.access({'action':'load',
+                        'module_uoa':cfg['module_deps']['module'],
+                        'data_uoa':sm_uoa})
+          if ry['return']>0: return ry
+          ddx=ry['dict']
+
+          pap=ddx.get('prune_autotune_pipeline',{})
+
+          dc=[]
+
+          xrk=ddx.get('replay_keys',[])
+          for q in xrk:
+              dc.append(q)
+
+          # Check if has key description
+          rd=ddx.get('replay_desc',{})
+          xxmuoa=rd.get('module_uoa','')
+          xxkey=rd.get('desc_key','')
+
+          if xxmuoa!='':
+             ry=ck.access({'action':'load',
+                           'module_uoa':cfg['module_deps']['module'],
+                           'data_uoa':xxmuoa})
+             if ry['return']>0: return ry
+
+          kdc=ry['desc'] # If not loaded from above module, then take it from scenario module desc!
+          if xxkey!='':
+             kdc=kdc.get(xxkey,{})
+
+          al='yes'
+
+    #******************************************************************
+    if len(ch)==0:
+       return {'return':1, 'error':'no flat characteristics in the point to compare'}
+
+    # Trying to get number of statistical repetitions from the entry
+    if repetitions=='':
+       rpt=ch.get('##pipeline_state#repetitions#min','')
+       if rpt=='': rpt=ft.get('features',{}).get('statistical_repetitions','')
+       if rpt!='': 
+          rpt=int(rpt)
+          repetitions=rpt
+
+    #******************************************************************
+
+    pipeline.update(cf)
+    pdafr=''
+
+    reuse_deps=(i.get('deps','')=='yes')
+    no_reuse_deps=(i.get('no_deps','')=='yes')
+
+    if not no_reuse_deps:
+       pdeps=pipeline.get('dependencies',{})
+       rz=ck.merge_dicts({'dict1':pdeps, 'dict2':deps})
+       if rz['return']>0: return rz
+       pdeps=rz['dict1']
+    else:
+       pdeps={}
+#       pdafr='yes'
+    pdafr='yes'
+
+    pipeline['dependencies']=pdeps
+
+    if len(pipeline)==0:
+       return {'return':1, 'error':'pipeline not found in the entry'}
+
+    if i.get('target','')!='': pipeline['target']=i['target']
+    if i.get('host_os','')!='': pipeline['host_os']=i['host_os']
+    if i.get('target_os','')!='': pipeline['target_os']=i['target_os']
+    if i.get('device_id','')!='': pipeline['device_id']=i['device_id']
+
+    #******************************************************************
+    if o=='con':
+       ck.out('Restarting pipeline ...')
+       ck.out('')
+
+    # Attempt to run pipeline
+    ii={'action':'autotune',
+        'out':o,
+        'iterations':1,
+        'module_uoa':cfg['module_deps']['pipeline'],
+        'data_uoa':pipeline_uid,
+        'pipeline':pipeline,
+        'repetitions':repetitions,
+        'preserve_deps_after_first_run':pdafr,
+        'pipeline_update':pipeline_update,
+        'solutions':solutions,
+        'prune':prune,
+        'reduce_bug':reduce_bug,
+        'prune_md5':prune_md5,
+        'prune_invert':prune_invert,
+        'force_pipeline_update':'yes',
+        'pause':i.get('pause',''),
+        'ask_enter_after_each_iteration':i.get('ask_enter_after_each_iteration',''),
+        'condition_objective':i.get('condition_objective',''),
+        'prune_invert_do_not_remove_key':i.get('prune_invert_do_not_remove_key',''),
+        'print_keys_after_each_iteration':prune_print_keys,
+        'record':record,
+        'record_uoa':record_uoa,
+        'record_repo':record_repo,
+        'skip_done':'yes'}
+    if prune=='yes': 
+       ii['iterations']=-1
+       ii.update(pap)
+
+       pc=i.get('prune_conditions',[])
+       if len(pc)>0:
+          ii['result_conditions']=pc
+
+       ii['prune_result_conditions']=ii.get('result_conditions',[])
+
+    if len(choices_order)>0:
+       ii['choices_order']=[choices_order]
+
+    r=ck.access(ii)
+    if r['return']>0: return r
+
+    rlio=r.get('last_iteration_output',{})
+    fail=rlio.get('fail','')
+
+    # Check that didn't fail (or failed, if reproducing a bug)
+    if fail=='yes' and reduce_bug!='yes':
+       if o=='con':
+          ck.out('')
+          ck.out('Warning: pipeline failed during ref iteration ('+rlio.get('fail_reason','')+')')
+
+    # Flattening characteristics
+    chn=r.get('last_stat_analysis',{})
+    if 'dict_flat' in chn:
+       chn=chn.get('dict_flat',{})
+
+    # Record original and reproduced results, if needed
+    rofj=i.get('record_original_flat_json','').replace('$#ck_cur_path#$',pp)
+    rrfj=i.get('record_reproduced_flat_json','').replace('$#ck_cur_path#$',pp)
+
+    if rofj!='':
+       rx=ck.save_json_to_file({'json_file':rofj, 'dict':ch})
+       if rx['return']>0: return rx
+
+    if rrfj!='':
+       rx=ck.save_json_to_file({'json_file':rrfj, 'dict':chn})
+       if rx['return']>0: return rx
+
+    # Check if skip comparison
+    if i.get('skip','')!='yes' and reduce_bug!='yes':
+       # Comparing dicts
+       if o=='con':
+          ck.out('********************************************************************')
+          ck.out('Performing comparison on output dimensions (original vs new results)')
+          ck.out('')
+
+       ends=i.get('end_of_dims_to_check',[])
+       ttc=i.get('threshold_to_compare','')
+       if ttc=='': ttc=8.0
+       ttc=float(ttc)/100
+
+       import fnmatch
+
+       dd=[]
+
+       simple=False
+       # Check if checking only a few keys without *?
+       if len(dc)>0:
+          simple=True
+          for q in dc:
+              if '*' in q or '?' in q:
+                 simple=False
+                 break
+       if simple:
+          lk=dc
+       else:
+          # Create a list of all keys in original and new output
+          lk=list(ch.keys())
+          for q in chn:
+              if q not in lk:
+                 lk.append(q)
+
+       # Compare
+       ichecked=0
+       for q in sorted(lk):
+           v=ch.get(q,None)
+           v1=chn.get(q, None)
+
+           if type(v)!=list and type(v)!=dict:
+              check=False
+
+              if len(dc)==0: 
+                 check=True
+              else:
+                 for k in dc:
+                     if fnmatch.fnmatch(q,k):
+                        check=True
+                        break
+
+              if check:
+                 check=False
+
+                 if len(ends)==0: 
+                    check=True
+                 else:
+                    for k in ends:
+                        if q.endswith(k):
+                           check=True
+                           break
+
+              if check:
+                 ichecked+=1
+
+                 z=q
+                 if kdc.get(q,{}).get('desc','')!='':
+                    z=kdc[q]['desc']
+
+                 ss=z+':  '+str(v)+' vs '+str(v1)
+                 if v!=v1:
+                    if (type(v)==int or type(v)==float) and (type(v1)==int or type(v1)==float) and v!=0:
+                       vx=abs(v1-v)/v
+                       if vx>ttc:
+                          ss+='    diff='+( '%3.1f'% (vx*100))+'%'
+                          dd.append(q)
+                    else:
+                       dd.append(q)
+
+                 if o=='con' and (v!=v1 or al=='yes'):
+                    ck.out(ss)
+
+       if o=='con':
+          ck.out('')
+          if ichecked==0:
+             ck.out('Warning: no matched keys found in the output dictionary of the replicated experiment (possibly failed experiment)!')
+          elif len(dd)==0:
+             ck.out('All existing dimensions are the same (within statistical margin '+str(ttc*100)+'%)!')
+
+       r['different_dims']=dd
+
+    return r
+
+##############################################################################
+# rerun experiment == the same as reproduce
+
+def rerun(i):
+    """
+    See "replay" API
+    """
+
+    return replay(i)
+
+##############################################################################
+# reproduce a given experiment
+
+def reproduce(i):
+    """
+    See "replay" API
+    """
+
+    return replay(i)
+
+
+##############################################################################
+# load pipeline info
+
+def load_pipeline(i):
+    """
+    Input:  {
+               data_uoa          - experiment data UOA
+               (repo_uoa)        - experiment repo UOA
+               (module_uoa)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              pipeline     - pipeline's dict
+              pipeline_uoa - pipeline's UOA
+              pipeline_uid - pipeline's UID
+            }
+
+    """
+
+    ruoa=i.get('repo_uoa',      '')
+    muoa=i.get('module_uoa',    'experiment')
+    duoa=i.get('data_uoa',      '')
+
+    r=ck.access({   'action':       'load',
+                    'repo_uoa':     ruoa,
+                    'module_uoa':   muoa,
+                    'data_uoa':     duoa,
+    })
+    if r['return']>0: return r
+    p=r['path']
+    d=r['dict']
+
+    # Check pipeline
+    pxuoa=d.get('pipeline_uoa','')
+    pxuid=d.get('pipeline_uid','')
+    pipeline={}
 
-        if add and k not in akeys:
-           akeys.append(k)
+    if pxuoa!='' or pxuid!='':
+       p1=os.path.join(p, 'pipeline.json')
+       if os.path.isfile(p1):
+          rx=ck.load_json_file({'json_file':p1})
+          if rx['return']>0: return rx
+          pipeline=rx['dict']
 
-    # Process meta
-    tags=d.get('tags',[])
-    for v in tags:
-        if v not in atags:
-           atags[v]=1
-        else:
-           atags[v]+=1
+    return {'return':0, 'pipeline_uoa':pxuoa, 'pipeline_uid':pxuid, 'pipeline':pipeline}
 
-    aggr['meta']=ameta
-    aggr['tags']=atags
-    aggr['keys']=akeys
-            
-    return {'return':0}
 
 ##############################################################################
-# Get all meta information from entries
+# load all info about a given point and subpoint
 
-def get_all_meta(i):
+def load_point(i):
     """
     Input:  {
-               Input for 'filter' function
+               data_uoa          - experiment data UOA
+               (repo_uoa)        - experiment repo UOA
+               (module_uoa)
 
-               (aggregation) - dict with some params
-                               (keys_start) - prune keys
-                               (keys_end)   - prune keys
+               (point_uid)       - point (or skip, if there is only one), can be of format UID-<subpoint>
+               (point_idx)       - 0-based numeric index of the point (assuming they are sorted by UID)
+               (subpoint)        - subpoint (or skip, if there is only one)
+
+               (add_pipeline)    - if 'yes', load pipeline from entry (if exists)
+               (no_points)       - if 'yes', just return the pipeline information and ignore the points
             }
 
     Output: {
@@ -1475,76 +5264,133 @@ def get_all_meta(i):
                                          >  0, if error
               (error)      - error text if return > 0
 
-              all_meta     - each key is a list with all values
-              all_tags     - each key is a tag with a number of occurances
+              dict         - {point extension = loaded json file}
+
+              pipeline     - if add_pipeline!='yes' and pipeline exists, return dict
+              pipeline_uoa - if add_pipeline!='yes' and pipeline_uoa exists, return pipeline UOA
+              pipeline_uid - if add_pipeline!='yes' and pipeline_uid exists, return pipeline UID
             }
 
     """
 
     o=i.get('out','')
 
-    import copy
-    ii=copy.deepcopy(i)
+    oo=''
+    if o=='con': oo=o
 
-    ii['filter_func']='get_all_meta_filter'
+    ruoa=i.get('repo_uoa','')
+    muoa=i.get('module_uoa','')
+    if muoa=='': muoa=work['self_module_uoa']
+    duoa=i.get('data_uoa','')
 
-    r=filter(ii)
+    sp=i.get('subpoint','')
+
+    ap=i.get('add_pipeline','')
+    load_points = i.get('no_points', '') != 'yes'
+
+    extra_path=i.get('extra_path','')
+
+    r=list_points({'module_uoa':muoa,
+                   'data_uoa':duoa,
+                   'repo_uoa':ruoa,
+                   'repo_module_uoa':i.get('repo_module_uoa',''),
+                   'extra_path':extra_path,
+                   'out':oo})
     if r['return']>0: return r
+    p=r['path']
+    d=r['dict']
 
-    aggr=r.get('aggregation',{})
+    # Check pipeline
+    pxuoa=d.get('pipeline_uoa','')
+    pxuid=d.get('pipeline_uid','')
+    pipeline={}
 
-    ameta=aggr.get('meta',{})
-    atags=aggr.get('tags',{})
-    akeys=aggr.get('keys',{})
+    if ap=='yes' and (pxuoa!='' or pxuid!=''):
+       p1=os.path.join(p, 'pipeline.json')
+       if os.path.isfile(p1):
+          rx=ck.load_json_file({'json_file':p1})
+          if rx['return']>0: return rx
+          pipeline=rx['dict']
 
-    if o=='con':
-       import json
+    dd={}
 
-       ck.out('Keys:')
-       ck.out('')
-       for q in sorted(akeys):
-           ck.out('   "'+q+'",')
+    if load_points:
+        # Check point
 
-       ck.out('')
-       ck.out('Meta:')
-       ck.out('')
-       ck.out(json.dumps(ameta, indent=2, sort_keys=True))
+        pp  = r['points']
+        if len(pp)==0:
+            return {'return':1, 'error':'points not found in the entry'}
 
-       ck.out('')
-       ck.out('Tags:')
-       ck.out('')
+        point_uid   = i.get('point_uid', i.get('point') )
 
-       satags=[(k, atags[k]) for k in sorted(atags, key=atags.get, reverse=True)]
+        if point_uid==None:
+            point_idx   = i.get('point_idx')
+            if point_idx!=None:
+                point_idx = int( point_idx )
+                if point_idx<len(pp):
+                    point_uid = pp[point_idx]
+                else:
+                    return {'return':1, 'error': 'point_idx(=={}) out of range - only {} points available'.format(point_idx, len(pp))}
+            elif len(pp)==1:
+                point_uid   = pp[0]
+            else:
+                return {'return':1, 'error':'more than one point found - please prune your choice by using --point or --point_idx'}
 
-       for k,v in satags:
-           ck.out(k+' = '+str(v))
+        # Get files of this point from manifest of points (cached by "list_points")
+        rx=get_points_manifest(p)
+        if rx['return']>0: return rx
+        man=rx['manifest']
+
+        for ext in man['files'].get(point_uid,[]):
+            i1=ext.find('.json')
+            if i1>=0:
+               key=ext[:i1]
+               if key in point_sidecars:
+                  continue
+               if sp!='' and key!='flat' and key!='deps' and key!='desc' and key!='features' and key!=sp:
+                  continue
+               p1=os.path.join(p,'ckp-'+point_uid+'.'+ext)
+               rx=ck.load_json_file({'json_file':p1})
+               if rx['return']>0: return rx
+               dd[key]=rx['dict']
+
+               if key=='flat':
+                  rx=load_samples(p, 'ckp-'+point_uid, dd[key])
+                  if rx['return']>0: return rx
+
+    return {'return':0, 'dict':dd, 'pipeline_uoa':pxuoa, 'pipeline_uid':pxuid, 'pipeline':pipeline}
 
-    return {'return':0, 'all_meta':ameta, 'all_tags':atags}
 
 ##############################################################################
-# filter / pre-process data
+# stat analysis with multiple points at the same time
 
-def filter(i):
+def multi_stat_analysis(i):
     """
     Input:  {
-              Select entries or table:
-                 (repo_uoa) or (experiment_repo_uoa)     - can be wild cards
-                 (remote_repo_uoa)                       - if remote access, use this as a remote repo UOA
-                 (module_uoa) or (experiment_module_uoa) - can be wild cards
-                 (data_uoa) or (experiment_data_uoa)     - can be wild cards
+              (dict)                        - pre-loaded dict with characteristics that will be flattened
+                  or
+              (flat_dict)                   - pre-loaded flat dict with characteristics
 
-                 (repo_uoa_list)                       - list of repos to search
-                 (module_uoa_list)                     - list of module to search
-                 (data_uoa_list)                       - list of data to search
+                                                  USE 'characteristic_list' in dict!
 
-                 (search_dict)                         - search dict
-                 (ignore_case)                         - if 'yes', ignore case when searching
+              dict_to_add                   - data to analyze and add to dict
 
-                 (filter_func)        - name of filter function
-                 (filter_func_addr)   - address of filter function
+              (dict_to_compare)             - flat dict to calculate improvements
 
-              (aggregation)           - dictionary to aggregate information across entries
+              (process_multi_keys)          - list of keys (starts with) to perform stat analysis on flat array,
+                                              by default ['##characteristics#*', '##features#*' '##choices#*'],
+                                              if empty, no stat analysis
+
+              (skip_stat_analysis)          - if 'yes', just flatten array and add #min
+
+              (stat_state)                  - running statistics per key (see stat_analysis)
 
+              (batch_stat_analysis)         - if 'no', process characteristics one by one,
+                                              otherwise process all of them at once via NumPy (if available)
+
+              (kde_mode)                    - KDE mode to calculate expected values (see stat_analysis)
+
+              (sample_store)                - sample store with recorded values (see stat_analysis)
             }
 
     Output: {
@@ -1552,831 +5398,1071 @@ def filter(i):
                                          >  0, if error
               (error)      - error text if return > 0
 
-              (aggregation)           - dictionary to aggregate information across entries
+              dict_flat         - updated and flattened original dictionary
+              max_range_percent - max % range in float/int data (useful to record points with unusual behavior)
+              min               - 'yes', if one of monitored values reached min
+              max               - 'yes', if one of monitored values reached max
+
+              stat_state        - updated running statistics
             }
 
     """
 
+    import copy
+
     o=i.get('out','')
 
-    ruoa=i.get('repo_uoa','')
-    xruoa=i.get('experiment_repo_uoa','')
-    if xruoa!='': ruoa=xruoa
+    ddflat=i.get('flat_dict',{})
+    dd=i.get('dict',{})
 
-    rruoa=i.get('remote_repo_uoa','')
+    dtc=i.get('dict_to_compare',{})
 
-    muoa=i.get('experiment_module_uoa','')
-    if muoa=='': muoa=i.get('module_uoa','')
+    ss=i.get('stat_state',None)
+    if ss==None: ss={}
 
-    duoa=i.get('experiment_data_uoa','')
-    if duoa=='': duoa=i.get('data_uoa','')
+    # Select keys to prune and flat
+    sak=i.get('process_multi_keys','')
+    if sak=='': 
+       sak=['##characteristics#*', '##features#*', '##choices#*']
 
-    ruoal=i.get('repo_uoa_list',[])
-    muoal=i.get('module_uoa_list',[])
-    duoal=i.get('data_uoa_list',[])
+    if len(dd)>0 and len(ddflat)==0:
+       r=ck.flatten_dict({'dict':dd, 'prune_keys':sak})
+       if r['return']>0: return r
+       ddflat=r['dict']
 
-    sd=i.get('search_dict',{})
-    ic=i.get('ignore_case','')
+    ddx=i.get('dict_to_add',{})
 
-    sff=i.get('filter_func','')
-    ff=i.get('filter_func_addr',None)
-    if sff!='': 
-       import sys
-       ff=getattr(sys.modules[__name__], sff)
+    cddx=copy.deepcopy(ddx)
 
-    # Search entries
-    ii={'action':'search',
-        'common_func':'yes',
-        'repo_uoa':ruoa,
-        'remote_repo_uoa': rruoa,
-        'module_uoa':muoa,
-        'data_uoa':duoa,
-        'repo_uoa_list':ruoal,
-        'module_uoa_list':muoal,
-        'data_uoa_list':duoal,
-        'search_dict':sd,
-        'ignore_case':ic}
-    r=ck.access(ii)
+    # Remove characteristics from original
+    ch=ck.get_from_dicts(cddx, 'characteristics', {}, None)
+
+    # Check if characteristics lists (to add a number of experimental results at the same time,
+    #   otherwise point by point processing can become very slow
+    chl=ck.get_from_dicts(cddx, 'characteristics_list', [], None)
+    if len(ch)>0: chl.append(ch)
+
+    # Flatten input dict
+    r=ck.flatten_dict({'dict':cddx, 'prune_keys':sak})
     if r['return']>0: return r
+    ddf=r['dict']
 
-    lst=r['lst']
+    mmin=''
+    mmax=''
+    mdp=''
 
-    aggr=i.get('aggregation',{})
+    # Flatten/prune all iterations of statistical characteristics
+    rows=[]
+    for cx in chl:
+        r=ck.flatten_dict({'dict':{'characteristics':cx}, 'prune_keys':sak})
+        if r['return']>0: return r
+        ddfi=r['dict']
 
-    # Iterate over entries
-    for e in lst:
-        ruid=e['repo_uid']
-        muoa=e['module_uoa']
-        muid=e['module_uid']
-        duoa=e['data_uoa']
-        duid=e['data_uid']
+        # Process multiple values in time packed as @@value1,value2
+        for q in ddfi:
+            v=ddfi[q]
+            x=False
+            try: x=v.startswith('@@')
+            except AttributeError: pass
+            if x:
+               v1=ddfi[q][2:].split(',')
+               v2=[]
+               for k in v1:
+                   try: k=float(k)
+                   except ValueError: pass
+                   v2.append(k)
+               ddfi[q]=v2
+
+        rows.append(ddfi)
+
+    # Check if can process all iterations at once (vectorized via NumPy)
+    bsa=i.get('batch_stat_analysis','')
+    if i.get('skip_stat_analysis','')=='yes' or len(rows)==0:
+       bsa='no'
+    if bsa=='':
+       bsa='no'
+       try:
+          import numpy
+          bsa='yes'
+       except ImportError:
+          pass
+
+    if bsa=='yes':
+       if o=='con':
+          ck.out('        Processing '+str(len(rows))+' characteristic points in batch mode ...')
+
+       ii={'dict':ddflat, 'dict_base':ddf, 'rows':rows, 'stat_state':ss, 'kde_mode':i.get('kde_mode',''),
+           'sample_store':i.get('sample_store',{})}
+
+       if len(dtc)>0:
+          ii['dict_compare']=dtc
+
+       r=batch_stat_analysis(ii)
+       if r['return']>0: return r
+
+       return {'return':0, 'dict_flat':r['dict'], 'min':r['min'], 'max':r['max'],
+                           'max_range_percent':r['max_range_percent'], 'stat_state':ss}
+
+    ich=0
+    for ddfi in rows:
+        ich+=1
 
-        # Load entry
         if o=='con':
-           ck.out('Loading entry '+muoa+':'+duoa+' ...')
+           ck.out('        Processing characteristic point '+str(ich)+' out of '+str(len(chl))+' ...')
 
-        ii={'action':'load',
-            'repo_uoa':ruid,
-            'module_uoa':muid,
-            'data_uoa':duid}
-        r=ck.access(ii)
-        if r['return']>0: return r
+        cddf=copy.deepcopy(ddf) # Prepare clean input (and append iteration of statistical characteristics)
 
-        p=r['path']
-        dd=r['dict']
+        # Update original input with iteration from statistical repetition
+        cddf.update(ddfi)
 
-        dirList=os.listdir(p)
-        for fn in dirList:
-            if fn.endswith('.flat.json'):
-               fpflat1=os.path.join(p, fn)
+        # Prepare input for statistical analysis
+        ii={'dict':ddflat, 'dict1':cddf, 'stat_state':ss, 'kde_mode':i.get('kde_mode',''),
+            'sample_store':i.get('sample_store',{})}
 
-               r=ck.load_json_file({'json_file':fpflat1})
-               if r['return']>0: return r
-               df=r['dict']
+        if len(dtc)>0:
+           ii['dict_compare']=dtc
 
-               rx=ff({'dict':df, 'dict_orig':dd, 'aggregation':aggr})
-               if rx['return']>0: return rx
+        if ich!=1 and ich!=len(chl): # we need to run it at least once for the first iteration, otherwise we will miss compile info (autotuning)
+           ii['skip_expected_value']='yes'
+           ii['skip_min_max']='yes'
 
-               changed=rx.get('changed','')
-               df=rx.get('dict',{})
+        if i.get('skip_stat_analysis','')!='':
+           ii['skip_stat_analysis']=i['skip_stat_analysis']
 
-               if changed=='yes':
-                  r=ck.save_json_to_file({'json_file':fpflat1, 'dict':df})
-                  if r['return']>0: return r
+        r=stat_analysis(ii)
+        if r['return']>0: return r
 
-    return {'return':0, 'aggregation':aggr}
+        ddflat=r['dict']
+        mdp=r['max_range_percent']
+        mmin=r['min']
+        mmax=r['max']
+
+    return {'return':0, 'dict_flat':ddflat, 'min':mmin, 'max':mmax, 'max_range_percent':mdp, 'stat_state':ss}
 
 ##############################################################################
-# list all points in an entry
+# statistical analysis of all iterations of characteristics at once (vectorized via NumPy)
+#
+# Gives the same result as calling stat_analysis for each row on top of dict_base
+# (min/max and expected values are calculated for the first and the last row),
+# but processes each key in a single pass. Keys with mixed numerical and
+# non-numerical values are still processed row by row via stat_analysis.
 
-def list_points(i):
+def batch_stat_analysis(i):
     """
     Input:  {
-               data_uoa            - experiment data UOA
-               (repo_uoa)          - experiment repo UOA
-               (remote_repo_uoa)   - if repo_uoa is remote repo, use this to specify which local repo to use at the remote machine
-               (module_uoa)
-                    or
-               (path)              - if called from internal modules, can specify path of the experiment entry directly ...
-
-               (prune_by_features) - flat dict with features to check (no wild cards here)
+              dict           - existing flat dict
+              dict_base      - flat dict with keys common to all rows (features, choices, etc)
+              rows           - list of flat dicts with statistical repetitions of characteristics
 
-               (point)             - get subpoints for a given point
-               (skip_subpoints)    - if 'yes', do not show number of subpoints
+              (dict_compare) - calculate improvements over this dict if present
+              (stat_state)   - running statistics per key (see stat_analysis)
+              (sample_store) - sample store with recorded values (see stat_analysis)
 
-               (extra_path)        - add extra path before points (useful when versioning is used)
+              (bins)         - number of bins for expected value (see stat_analysis)
+              (cov_factor)   - float covariance factor for expected value (see stat_analysis)
+              (kde_mode)     - KDE mode for expected value (see stat_analysis)
             }
 
     Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
+              return            - return code =  0, if successful
+                                              >  0, if error
+              (error)           - error text if return > 0
 
-              points       - list of point UIDs
-              (subpoints)  - if 'point' is selected, list of subpoints
+              dict              - updated dict
+              max_range_percent - max % range in float/int data of the last row
+              min               - 'yes', if one of monitored values reached min (in the last row)
+              max               - 'yes', if one of monitored values reached max (in the last row)
 
-              dict         - dict of entry (if not loaded by path)
-              path         - local path to the entry
+              stat_state        - updated running statistics
             }
 
     """
 
-    o=i.get('out','')
+    try:
+       import numpy as np
+    except Exception as e:
+       return {'return':1, 'error':'NumPy is needed for batch statistical analysis ('+format(e)+')'}
 
-    p=i.get('path','')
-    d={}
+    d=i['dict']
+    ddf=i['dict_base']
+    rows=i['rows']
+    nrows=len(rows)
 
-    puid=i.get('point','')
+    dc=i.get('dict_compare',{})
 
-    extra_path=i.get('extra_path','')
+    compare=False
+    if len(dc)>0:
+       compare=True
 
-    if p=='':
-       # Attempt to load entry
-       duoa=i.get('data_uoa','')
-       muoa=i.get('module_uoa','')
-       ruoa=i.get('repo_uoa','')
-       rruoa=i.get('remote_repo_uoa','')
+    ss=i.get('stat_state',None)
+    if ss==None: ss={}
 
-       ii={'action':'load',
-           'module_uoa':muoa,
-           'data_uoa':duoa,
-           'repo_uoa':ruoa}
-       if i.get('repo_module_uoa','')!='': ii['repo_module_uoa']=i['repo_module_uoa']
+    bins=i.get('bins','')
+    cov_factor=i.get('cov_factor','')
+    kde_mode=i.get('kde_mode','')
 
-       if rruoa!='': ii['remote_repo_uoa']=rruoa
-       rx=ck.access(ii)
-       if rx['return']>0: return rx
-       p=rx['path']
-       d=rx['dict']
+    sst=i.get('sample_store',{})
+    scount=sst.get('counts',{})
 
-    if extra_path!='':
-       p=os.path.join(p, extra_path)
-       # Check if there is versions meta
-       pmeta=os.path.join(p, '.cm', 'meta.json')
-       if os.path.isfile(pmeta):
-          rx=ck.load_json_file({'json_file':pmeta})
-          if rx['return']>0: return rx
-          d=rx['dict']
+    max_range_percent=0
+    mmin=''
+    mmax=''
 
-    points=[]
-    skiped_points=[]
-    subpoints=[]
+    # Prepare columns (all values of a given key in the order of processing and their rows)
+    cols={}
+    crows={}
+    for j in range(0, nrows):
+        cddf=dict(ddf)
+        cddf.update(rows[j])
+
+        for k in cddf:
+            vv=cddf[k]
+            if type(vv)!=list: vv=[vv]
+
+            if k not in cols:
+               cols[k]=[]
+               crows[k]=[]
+
+            cols[k]+=vv
+            crows[k]+=[j]*len(vv)
+
+    xkeys=[] # keys to process row by row
+    kev={}   # number of values in #all when expected value is requested for a given key
+
+    for k in cols:
+        vals=cols[k]
+        nv=len(vals)
+        if nv==0: continue
+
+        k_min=k+'#min'
+        k_max=k+'#max'
+
+        # Check if all values (and already recorded min/max) are numerical or not
+        nnum=0
+        for v1 in vals:
+            if type(v1)==float or type(v1)==int or type(v1)==ck.type_long:
+               nnum+=1
+
+        numerical=(nnum==nv)
+        if numerical:
+           for v1 in [d.get(k_min,0), d.get(k_max,0)]:
+               if type(v1)!=float and type(v1)!=int and type(v1)!=ck.type_long:
+                  numerical=False
+
+        x=None
+        if numerical:
+           x=np.array(vals, dtype=np.float64)
+           if np.isnan(x).any(): numerical=False
+
+        if not numerical and nnum>0:
+           xkeys.append(k)
+           continue
+
+        jr=np.array(crows[k])
+
+        rs=get_running_stat(d, k, ss, scount.get(k,0))
+
+        if not numerical:
+           # Only first value is recorded to #min (the same as in stat_analysis)
+           k_repeats=k+'#repeats'
+           d[k_repeats]=d.get(k_repeats,0)+nv
+
+           k_all=k+'#all'
+           v_all=d.get(k_all,[])
+           v_all.extend(vals)
+           d[k_all]=v_all
+
+           k_all_u=k+'#all_unique'
+           v=d.get(k_all_u,[])
+           for v1 in vals:
+               try:
+                  if v1 not in rs['unique']:
+                     rs['unique'].add(v1)
+                     v.append(v1)
+               except TypeError:
+                  if v1 not in v: v.append(v1)
+           d[k_all_u]=v
+
+           rs['count']+=nv
+
+           for t in range(0, nv):
+               vmin=d.get(k_min,'')
+               if vmin=='':
+                  d[k_min]=vals[t]
+                  if jr[t]==nrows-1: mmin='yes'
 
-    ssp=i.get('skip_subpoints','')
+               if compare:
+                  if dc.get(k_min, None)==vmin:
+                     d[k+'#min_imp']=1
+                  else:
+                     d[k+'#min_imp']=0
 
-    pp=i.get('prune_by_features',{})
+           continue
+
+        rmin0=rs['min']
+        rmax0=rs['max']
+        rsum0=rs['sum']
+        rsum20=rs['sum2']
+
+        smin0=d.get(k_min,None)
+        smax0=d.get(k_max,None)
+
+        # Number of repetitions
+        k_repeats=k+'#repeats'
+        vr0=d.get(k_repeats,0)
+        d[k_repeats]=vr0+nv
+
+        # Put all values
+        k_all=k+'#all'
+        v_all=d.get(k_all,[])
+        na0=scount.get(k,0)+len(v_all)
+        v_all.extend(vals)
+        d[k_all]=v_all
+
+        # Put only unique values
+        k_all_u=k+'#all_unique'
+        v=d.get(k_all_u,[])
+        u=rs['unique']
+        for v1 in vals:
+            if v1 not in u:
+               u.add(v1)
+               v.append(v1)
+        d[k_all_u]=v
+
+        # Prefix sums (sequential as in running statistics)
+        isint=(type(rsum0)!=float)
+        if isint:
+           for v1 in vals:
+               if type(v1)==float:
+                  isint=False
+                  break
+
+        if isint:
+           csum=[rsum0]
+           csum2=[rsum20]
+           for v1 in vals:
+               csum.append(csum[-1]+v1)
+               csum2.append(csum2[-1]+v1*v1)
+           csum=csum[1:]
+           csum2=csum2[1:]
+        else:
+           csum=np.cumsum(np.concatenate(([rsum0], x)))[1:]
+           csum2=np.cumsum(np.concatenate(([rsum20], x*x)))[1:]
+
+        # Update running statistics
+        rs['count']+=nv
+
+        q=int(np.argmin(x))
+        if rmin0==None or vals[q]<rmin0: rs['min']=vals[q]
+        q=int(np.argmax(x))
+        if rmax0==None or vals[q]>rmax0: rs['max']=vals[q]
+
+        rs['sum']=csum[-1]
+        rs['sum2']=csum2[-1]
+        if not isint:
+           rs['sum']=float(rs['sum'])
+           rs['sum2']=float(rs['sum2'])
+
+        # Min and max after each value (as float vectors)
+        pmin=np.minimum.accumulate(x)
+        pmax=np.maximum.accumulate(x)
+        for q in [rmin0, smin0]:
+            if q!=None: pmin=np.minimum(pmin, q)
+        for q in [rmax0, smax0]:
+            if q!=None: pmax=np.maximum(pmax, q)
+
+        # Values from the first and the last row are fully analyzed,
+        # others only update #min if it was not set before
+        full=(jr==0) | (jr==nrows-1)
+        bidx=np.nonzero(full)[0]
+        cidx=np.nonzero(~full)[0]
+
+        if len(cidx)>0 and d.get(k_min,'')=='':
+           if len(bidx)==0 or bidx[0]>cidx[0]:
+              d[k_min]=vals[cidx[0]]
+
+        if len(bidx)>0:
+           vmin, vmax = batch_min_max(vals, x, bidx[-1], rmin0, smin0, rmax0, smax0)
+
+           d[k_min]=vmin
+           d[k_max]=vmax
+
+           # Calculate #range (max-min)
+           vrange=vmax-vmin
+           d[k+'#range']=vrange
+
+           # Calculate #halfrange (max-min)/2
+           vhrange=vrange/2
+           d[k+'#halfrange']=vhrange
+
+           # Calculate #center
+           d[k+'#center']=vmin+vhrange
+
+           # Calculate #range percent (max-min)/min at the last value where min!=0
+           nz=bidx[pmin[bidx]!=0]
+           if len(nz)>0:
+              xmin, xmax = batch_min_max(vals, x, nz[-1], rmin0, smin0, rmax0, smax0)
+              d[k+'#range_percent']=(xmax-xmin)/xmin
+
+           # Max % range in the last row
+           lb=bidx[(jr[bidx]==nrows-1) & (pmin[bidx]!=0)]
+           if len(lb)>0:
+              vp=float(np.max((pmax[lb]-pmin[lb])/pmin[lb]))
+              if vp>max_range_percent: max_range_percent=vp
+
+           # Calculate mean
+           t=bidx[-1]
+           d[k+'#mean']=float(csum[t])/float(vr0+t+1)
+
+        # Calculate improvements
+        if compare:
+           # #min_imp is updated by all values (by the last one with min!=0 if fully analyzed)
+           cvmin=dc.get(k_min, None)
+
+           tb=-1
+           if cvmin!=None:
+              nz=bidx[pmin[bidx]!=0]
+              if len(nz)>0: tb=nz[-1]
+
+           tc=-1
+           if len(cidx)>0: tc=cidx[-1]
+
+           if tb>=0 and tb>tc:
+              xmin, xmax = batch_min_max(vals, x, tb, rmin0, smin0, rmax0, smax0)
+              d[k+'#min_imp']=float(cvmin)/float(xmin)
+           elif tc>=0:
+              # min before this value
+              pb=bidx[bidx<tc]
+              if len(pb)>0:
+                 xmin, xmax = batch_min_max(vals, x, pb[-1], rmin0, smin0, rmax0, smax0)
+              elif smin0!=None:
+                 xmin=smin0
+              elif cidx[0]<tc:
+                 xmin=vals[cidx[0]]
+              else:
+                 xmin=''
 
-    # Start listing points
-    dirList=os.listdir(p)
-    added=False
-    for fn in sorted(dirList):
-        if fn.startswith('ckp-'):
-           if len(fn)>20 and fn[20]=='.':
-              uid=fn[4:20]
+              if cvmin==xmin:
+                 d[k+'#min_imp']=1
+              else:
+                 d[k+'#min_imp']=0
 
-              if uid not in skiped_points:
-                 if len(pp)>0:
-                    skip=True
+           # Other improvements are updated only by fully analyzed values
+           pmean=np.array(csum, dtype=np.float64)/(vr0+np.arange(1, nv+1))
 
-                    px=os.path.join(p, 'ckp-'+uid+'.features_flat.json')
-                    if os.path.isfile(px):
-                       rx=ck.load_json_file({'json_file':px})
-                       if rx['return']>0: return rx
-                       ft=rx['dict']
+           for kk in ['max', 'center', 'mean']:
+               cv=dc.get(k+'#'+kk, None)
+               if cv==None: continue
 
-                       ry=ck.compare_flat_dicts({'dict1':ft, 'dict2':pp, 'space_as_none':'yes'})
-                       if ry['return']>0: return ry
+               if kk=='max': xx=pmax
+               elif kk=='center': xx=pmin+(pmax-pmin)/2
+               else: xx=pmean
 
-                       if ry['equal']=='yes': 
-                          skip=False
+               nz=bidx[xx[bidx]!=0]
+               if len(nz)>0:
+                  t=nz[-1]
+                  xmin, xmax = batch_min_max(vals, x, t, rmin0, smin0, rmax0, smax0)
+                  if kk=='max': xv=xmax
+                  elif kk=='center': xv=xmin+(xmax-xmin)/2
+                  else: xv=float(csum[t])/float(vr0+t+1)
 
-                    if skip:
-                       skiped_points.append(uid)
-                       continue
+                  d[k+'#'+kk+'_imp']=float(cv)/float(xv)
 
-                 if uid not in points:
-                    points.append(uid)
-                 if uid==puid and len(fn)>25 and fn[25]=='.':
-                    suid=fn[21:25]
-                    if suid!='flat' and suid!='desc' and suid!='deps':
-                       subpoints.append(suid)
+        # Check density, expected value and peaks (calculated for all keys at once at the end)
+        if len(bidx)>0:
+           kev[k]=[na0+t+1 for t in bidx]
 
-    if o=='con':
-       if ssp!='yes' and puid!='':
-          for k in subpoints:
-              ck.out(puid+'-'+k)
-       else:
-          for q in points:
-              ck.out(q)
+    if len(kev)>0:
+       r=update_expected_values({'dict':d, 'events':kev, 'dict_compare':dc, 'bins':bins, 'cov_factor':cov_factor,
+                                 'kde_mode':kde_mode, 'stat_state':ss, 'sample_store':sst})
+       if r['return']>0: return r
 
-    return {'return':0, 'path':p, 'dict':d, 'points':points, 'points_count':len(points), 'subpoints':subpoints}
+    # Process keys with non-numerical values row by row
+    if len(xkeys)>0:
+       for j in range(0, nrows):
+           cddf=dict(ddf)
+           cddf.update(rows[j])
+
+           dd1={}
+           for k in cddf:
+               if k in xkeys:
+                  dd1[k]=cddf[k]
+
+           ii={'dict':d, 'dict1':dd1, 'stat_state':ss, 'bins':bins, 'cov_factor':cov_factor, 'kde_mode':kde_mode,
+               'sample_store':sst}
 
+           if compare:
+              ii['dict_compare']=dc
+
+           if j!=0 and j!=nrows-1:
+              ii['skip_expected_value']='yes'
+              ii['skip_min_max']='yes'
+
+           r=stat_analysis(ii)
+           if r['return']>0: return r
+
+           d=r['dict']
+
+           if j==nrows-1:
+              if r['min']=='yes': mmin='yes'
+              if r['max']=='yes': mmax='yes'
+              if r['max_range_percent']>max_range_percent:
+                 max_range_percent=r['max_range_percent']
+
+    return {'return':0, 'dict':d, 'max_range_percent':max_range_percent, 'min':mmin, 'max':mmax, 'stat_state':ss}
 
 ##############################################################################
-# replay experiment == the same as reproduce
+# internal function to get min and max (with original types) after a given value in batch_stat_analysis
 
-def replay(i):
-    """
-    Input:  {
-               data_uoa                      - experiment data UOA (can have wildcards)
-               (repo_uoa)                    - experiment repo UOA (can have wildcards)
-               (experiment_repo_uoa)         - use it, if repository is remote
-               (remote_repo_uoa)             - if repo above is remote, use this repo on remote machine
+def batch_min_max(vals, x, t, rmin0, smin0, rmax0, smax0):
 
-               (module_uoa)
-               (tags)                        - search by tags
+    import numpy as np
 
-               (point)                       - point (or skip, if there is only one), can be of format UID-<subpoint>
-               (subpoint)                    - subpoint (or skip, if there is only one)
+    vmin=vals[int(np.argmin(x[:t+1]))]
+    if rmin0!=None and not vmin<rmin0: vmin=rmin0
+    if smin0!=None and not vmin<smin0: vmin=smin0
 
-               (repetitions)                 - statistical repetitions (default=4)
-               (pipeline_update)             - customize pipeline with this dict (useful to update already prepared pipeline from file)
+    vmax=vals[int(np.argmax(x[:t+1]))]
+    if rmax0!=None and not vmax>rmax0: vmax=rmax0
+    if smax0!=None and not vmax>smax0: vmax=smax0
 
-               (dims_to_check) or (dims)     - list of dimensions to check, can have wildcards (if empty, check all); 
-                                               alternatively can use a string (useful for CMD)
-               (end_of_dims_to_check)        - list of endings of dimensions to compare ...
+    return vmin, vmax
 
-               (threshold_to_compare)        - % threshold to decide whether dim is different or not
+##############################################################################
+# insert points to (Pareto) frontier kept with experiment entry (frontier.json)
+# and optionally delete points dominated by new ones (incremental frontier filtering during autotuning)
 
-               (record_original_flat_json)   - file to record flat dict with original results
-               (record_reproduced_flat_json) - file to record flag dict with reproduced results
+def update_frontier(i):
+    """
+    Input:  {
+              data_uoa or experiment_uoa - experiment entry
+              (repo_uoa)                 - experiment repo UOA
+              (module_uoa)
 
-               (skip)                        - if 'yes', do not perform comparison
+              (points)                   - dict with new points {point UID: {optimization dimensions}}
+              (point_uids)               - list of new point UIDs (dimensions are loaded from ckp-<uid>.flat.json)
 
-               ==============================
-                 If one would like to compare results with another point (for example, to check speedups 
-                 rather than just reproducing a given point)
+              (frontier_keys)            - list of flat keys to leave only best points (see "math.frontier filter");
+              (reverse_keys)             - list of values associated with above keys (True to reverse)
+              (margins)                  - list of margins when comparing values
+                                           (only used when frontier is created)
 
-               (compare_data_uoa)
-               (compare_repo_uoa)
-               (compare_point)
-               (compare_subpoint)
+              (delete_dominated)         - if 'yes', delete dominated and rejected points from entry
 
-               ==============================
-                 Prunning (reducing complexity)
+              (lock_timeout)             - max time in seconds to wait for locked entry
+            }
 
-               (prune)                          - if 'yes', replay and prune choices!
-               (reduce)                         - the same as above
-               (reduce_bug)                     - reduce choices to localize bug (pipeline fail)
+    Output: {
+              return           - return code =  0, if successful
+                                             >  0, if error
+              (error)          - error text if return > 0
+
+              added_points     - list of new point UIDs added to frontier
+              dominated_points - list of point UIDs removed from frontier by new points
+              rejected_points  - list of new point UIDs dominated by frontier
+              frontier_points  - number of points on frontier
+            }
 
-               (prune_md5)                      - if 'yes' and compilation is used in a pipeline (workflow), check if binary MD5 doesn't change
-               (prune_invert)                   - if 'yes', prune all (switch off even unused - useful for collaborative machine learning)
-               (prune_print_keys)               - list of keys from flat dict to print during pruning (to monitor characteristics, for example)
-               (prune_invert_do_not_remove_key) - if 'yes', keep both on and off keys (to know exact solution)
+    """
 
-               (prune_conditions)    - conditions on results (see "ck check math.conditions --help")
-               (condition_objective) - which objective to use for characteristics (#min, #max, #exp, ...)
+    o=i.get('out','')
 
-               (solutions) - prune first solution
+    duoa=i.get('data_uoa','')
+    if duoa=='': duoa=i.get('experiment_uoa','')
 
-               ==============================
-               (record_uoa)                       - (data UOA or CID where module_uoa ignored!) explicitly record to this entry
-               (record_repo)                      - (repo UOA) explicitly select this repo to record
+    muoa=i.get('module_uoa','')
+    if muoa=='': muoa=work['self_module_uoa']
 
-               ==============================
-                 Some productivity keys specifically for autotuning pipeline (ck-autotuning repo):
+    lto=i.get('lock_timeout','')
+    if lto=='': lto=cfg.get('lock_timeout',120)
 
-               (local_platform) or (local)   - if 'yes', use parameters of a local platform (to retarget experiment)
-               (skip_target)                 - do not select target machines (to customize via host_os/target_os/device_id)
-               (no_deps)                     - if 'yes', do not reuse deps
-               (skip_clean_after)            - if 'yes', do not clean program pipeline after execution 
-                                               (keeping low level scripts in tmp directory for low-level debugging)
-               (all)                         - print all comparisons of keys (not only when there is a difference)
+    points=i.get('points',{})
+    puids=i.get('point_uids',[])
 
-               (skip_scenario_keys)          - skip scenario detection (otherwise get keys from the detected module) 
+    ii={'action':'load',
+        'repo_uoa':i.get('repo_uoa',''),
+        'module_uoa':muoa,
+        'data_uoa':duoa}
 
+    # Check input before locking entry (keys of existing frontier are never changed)
+    fk=i.get('frontier_keys',[])
+    if len(puids)>0 and len(fk)==0:
+       r=ck.access(ii)
+       if r['return']>0: return r
 
+       r=load_frontier(r['path'])
+       if r['return']>0: return r
 
-            }
+       if len(r['frontier'].get('frontier_keys',[]))==0:
+          return {'return':1, 'error':'frontier_keys are not defined'}
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
+    # Load and lock entry
+    ii['get_lock']='yes'
+    ii['lock_retries']=0
+    r=access_with_backoff({'ck_input':ii, 'timeout':lto, 'out':o})
+    if r['return']>0: return r
 
-              output of a given pipeline
+    p=r['path']
+    lock_uid=r['lock_uid']
 
-              different_dims - list of different dimensions
-            }
-    """
+    ruid=r['repo_uid']
+    muid=r['module_uid']
+    duid=r['data_uid']
 
-    import os
+    # Insert points and unlock entry (also on errors)
+    try:
+       r=insert_into_frontier({'path':p, 'points':points, 'point_uids':puids, 'frontier_keys':fk,
+                               'reverse_keys':i.get('reverse_keys',[]), 'margins':i.get('margins',[])})
+    finally:
+       rx=ck.set_lock({'path':p, 'unlock_uid':lock_uid})
 
-    o=i.get('out','')
+    if r['return']>0: return r
+    if rx['return']>0: return rx
 
-    ruoa=i.get('repo_uoa','')
-    if i.get('experiment_repo_uoa','')!='': ruoa=i['experiment_repo_uoa']
-    cruoa=ruoa
-    rruoa=i.get('remote_repo_uoa','')
+    fr=r['frontier']
+    added=r['added_points']
+    dpoints=r['dominated_points']
+    rpoints=r['rejected_points']
 
-    record=''
-    record_uoa=i.get('record_uoa','')
-    record_repo=i.get('record_repo','')
-    if record_uoa!='': record='yes'
+    if o=='con':
+       ck.out('Frontier points: '+str(len(fr['points']))+' (added: '+str(len(added))+
+              ', dominated: '+str(len(dpoints))+', rejected: '+str(len(rpoints))+')')
 
-    # Check if repo remote (to save in json rather than to out)
-    remote='no'
-    if ruoa!='':
-       rx=ck.load_repo_info_from_cache({'repo_uoa':ruoa})
-       if rx['return']>0: return rx
-       remote=rx.get('dict',{}).get('remote','')
+    if i.get('delete_dominated','')=='yes' and len(dpoints)+len(rpoints)>0:
+       dl=[]
+       for k in dpoints+rpoints:
+           dl.append({'repo_uid':ruid, 'module_uid':muid, 'data_uid':duid, 'point_uid':k})
 
-    muoa=i.get('module_uoa','')
-    duoa=i.get('data_uoa','')
+       r=delete_points({'points':dl, 'out':o})
+       if r['return']>0: return r
 
-    pipeline_update=i.get('pipeline_update',{})
-    repetitions=i.get('repetitions','')
+    return {'return':0, 'added_points':added, 'dominated_points':dpoints, 'rejected_points':rpoints,
+                        'frontier_points':len(fr['points'])}
 
-    solutions=i.get('solutions',[])
+##############################################################################
+# internal function to insert new points into frontier of points of locked entry
 
-    prune=i.get('prune','')
-    if prune=='':
-       prune=i.get('reduce','')
+def insert_into_frontier(i):
 
-    reduce_bug=i.get('reduce_bug','')
-    if reduce_bug=='yes': prune='yes'
+    p=i['path']
+    points=i['points']
+    puids=i['point_uids']
 
-    prune_md5=i.get('prune_md5','')
-    prune_invert=i.get('prune_invert','')
-    prune_print_keys=i.get('prune_print_keys',[])
+    r=load_frontier(p)
+    if r['return']>0: return r
+    fr=r['frontier']
 
-    if i.get('local_platform','')!='': pipeline_update['local_platform']=i['local_platform']
-    if i.get('local','')!='':          pipeline_update['local_platform']=i['local']
-    if i.get('skip_clean_after','')!='': pipeline_update['skip_clean_after']=i['skip_clean_after']
-    if i.get('skip_target','')!='': pipeline_update['skip_target']=i['skip_target']
+    fk=fr.get('frontier_keys',[])
+    if len(fk)==0: fk=i['frontier_keys']
+
+    # Load dimensions of new points
+    if len(puids)>0:
+       if len(fk)==0:
+          return {'return':1, 'error':'frontier_keys are not defined'}
 
-    pp=os.getcwd()+os.path.sep
+       points=dict(points)
+       for k in puids:
+           r=ck.load_json_file({'json_file':os.path.join(p, 'ckp-'+k+'.flat.json')})
+           if r['return']>0: return r
+           df=r['dict']
+
+           points[k]={}
+           for q in fk:
+               points[k][q]=df.get(q,None)
+
+    r=ck.access({'action':'insert',
+                 'module_uoa':cfg['module_deps']['math.frontier'],
+                 'frontier':fr,
+                 'points':points,
+                 'frontier_keys':fk,
+                 'reverse_keys':i['reverse_keys'],
+                 'margins':i['margins']})
+    if r['return']>0: return r
 
-    ii={'out':'',
-        'repo_uoa':ruoa,
-        'module_uoa':muoa,
-        'data_uoa':duoa,
-        'action':'search',
-        'add_meta':'yes'}
-    if rruoa!='': ii['remote_repo_uoa']=rruoa
-    r=ck.access(ii)
+    fr=r['frontier']
+    added=r['added_points']
+    dpoints=list(r['dominated_points'].keys())
+    rpoints=list(r['rejected_points'].keys())
+
+    r=save_frontier(p, fr)
     if r['return']>0: return r
 
-    dmeta={}
+    return {'return':0, 'frontier':fr, 'added_points':added, 'dominated_points':dpoints, 'rejected_points':rpoints}
 
-    lst=r['lst']
-    if len(lst)==0:
-       return {'return':1, 'error':'entry not found'}
-    elif len(lst)==1:
-       ruoa=lst[0]['repo_uoa']
+##############################################################################
+# internal function to load frontier of points kept with experiment entry (empty dict if not created)
 
-       muoa=lst[0]['module_uoa']
-       duoa=lst[0]['data_uoa']
+def load_frontier(p):
 
-       dmeta=lst[0]['meta']
-    else:
-       if o=='con':
-          r=ck.select_uoa({'choices':lst})
-          if r['return']>0: return r
-          duoa=r['choice']
+    fr={}
 
-          for q in lst:
-              if q['data_uid']==duoa:
-                 dmeta=q['meta']
-                 break
+    pf=os.path.join(p, cfg.get('frontier_file','frontier.json'))
+    if os.path.isfile(pf):
+       r=ck.load_json_file({'json_file':pf})
+       if r['return']>0: return r
+       fr=r['dict']
 
-          ck.out('')
-       else:
-          return {'return':1, 'error':'multiple entries found - please prune search', 'lst':lst}
+    return {'return':0, 'frontier':fr}
 
-    sm_uoa=dmeta.get('meta',{}).get('scenario_module_uoa','')
+##############################################################################
+# internal function to save frontier of points kept with experiment entry
 
-    if o=='con':
-       ck.out('Found entry '+duoa+'!')
-       ck.out('')
+def save_frontier(p, fr):
 
-    if remote=='yes':
-       rruoa=ruoa
-       ruoa=cruoa
+    pf=os.path.join(p, cfg.get('frontier_file','frontier.json'))
+    return ck.save_json_to_file({'json_file':pf, 'dict':fr})
 
-    # Check point
-    puid=i.get('point','')
-    sp=i.get('subpoint','')
-    if puid.find('-')>=0:
-       puid,sp=puid.split('-')
-    puid=puid.strip()
-    spid=sp.strip()
+##############################################################################
+# delete multiple points from multiple entries (for example, during Pareto frontier filtering)
 
-    # If point is not specified, get points
-    if puid=='':
-       ii={'repo_uoa':ruoa,
-           'module_uoa':muoa,
-           'data_uoa':duoa,
-           'action':'list_points'}
-       if rruoa!='': ii['remote_repo_uoa']=rruoa
-       rx=ck.access(ii)
-       if rx['return']>0: return rx
+def delete_points(i):
+    """
+    Input:  {
+              points       - list of points {'repo_uoa','repo_uid','module_uoa','module_uid','data_uoa','data_uid','point_uid'}
 
-       points=rx['points']
-       if len(points)==0:
-          return {'return':1, 'error':'no points found in a given entry'}
-       elif len(points)>1:
-          if o=='con':
-             ck.out('Multiple points:')
-             for q in points:
-                 ck.out('  '+q)
-             ck.out('')
-          return {'return':1, 'error':'select a point in a given entry (via --point=[above point UID])'}
-       else:
-          puid=points[0]
+              (soft)       - if 'yes', only mark points as deleted in tombstones.json of entry (O(1) time under entry lock);
+                             such points are skipped by "get", "list_points" and "iter_points"
+                             and their files are removed later by "compact" (default from module configuration)
 
-    # If subpoint is not specified, get subpoints
-    if spid=='':
-       ii={'repo_uoa':ruoa,
-           'module_uoa':muoa,
-           'data_uoa':duoa,
-           'point':puid,
-           'action':'list_points'}
-       rx=ck.access(ii)
-       if rx['return']>0: return rx
+              (parallel)   - if 'threads', remove files in a thread pool (useful for network file systems)
+              (workers)    - number of threads (8 by default)
+            }
 
-       spoints=rx['subpoints']
-       if len(spoints)==0:
-          return {'return':1, 'error':'no subpoints found in a given entry'}
-       elif len(spoints)>1:
-          if o=='con':
-             ck.out('Multiple subpoints:')
-             for q in spoints:
-                 ck.out('  '+q)
-             ck.out('')
-          return {'return':1, 'error':'select a given subpoint for a given point in a given entry'}
-       else:
-          spid=spoints[0]
+    Output: {
+              return         - return code =  0, if successful
+                                             >  0, if error
+              (error)        - error text if return > 0
 
-    # Get all info about this point
-    ii={'repo_uoa':ruoa,
-        'module_uoa':muoa,
-        'data_uoa':duoa,
-        'point':puid,
-        'subpoint':spid,
-        'add_pipeline':'yes',
-        'action':'load_point'}
-    rx=ck.access(ii)
-    if rx['return']>0: return rx
+              deleted_points - number of deleted points (points without files are skipped)
+              deleted_files  - number of deleted files
 
-    pipeline_uoa=rx['pipeline_uoa']
-    pipeline_uid=rx['pipeline_uid']
-    pipeline=rx['pipeline']
+              (tombstoned_points) - number of points marked as deleted (soft)
+            }
 
-    dd=rx['dict']
+    """
 
-    al=i.get('all','')
+    import time
 
-    ch=dd.get('flat',{})
+    o=i.get('out','')
 
-    ft=dd.get('features',{})
-    choices=ft.get('choices',{})
-    choices_order=ft.get('choices_order',[])
-    choices_desc=pipeline.get('choices_desc',[])
+    points=i['points']
 
+    soft=i.get('soft','')
+    if soft=='': soft=cfg.get('soft_delete','')
 
-#    Before 20170828 - when replay was generating random choices in fact (when choices present)!
-#    That's why now force to create solution -> this skips random generation
-#    if ((prune=='yes' or prune_invert=='yes') and len(solutions)==0):
+    par=i.get('parallel','')
 
-    if len(solutions)==0:
-       # Rebuild choices
-       rebuild_choices_order=[]
-       rebuild_choices={}
-       for k in choices_order:
-           rz=ck.get_by_flat_key({'dict':choices, 'key':k})
-           if rz['return']>0: return rz
-           vv=rz['value']
-           if vv!=None:
-#              k1='##choices'+k[1:]
-              k1=k
-              rebuild_choices_order.append(k1)
-              rebuild_choices[k1]=vv
+    nw=i.get('workers','')
+    if nw=='' or nw==None: nw=8
+    nw=int(nw)
+    if nw<1: nw=1
 
-       solutions=[{
-                   'points':[
-                      {'pruned_choices_order':rebuild_choices_order,
-                       'pruned_choices':rebuild_choices}
-                   ]
-                 }]
+    ndp=0
+    ndf=0
+    ntp=0
 
-    cf=dd.get('features',{}) # choices and features
-    if 'sub_points' in cf: del(cf['sub_points'])
+    apoints={}
 
-    deps=dd.get('deps',{})
+    # Get unique repo/module/data and aggregate points
+    for q in points:
+        ruoa=q.get('repo_uoa','')
+        ruid=q.get('repo_uid','')
+        muoa=q.get('module_uoa','')
+        muid=q.get('module_uid','')
+        duoa=q.get('data_uoa','')
+        duid=q.get('data_uid','')
+        puid=q.get('point_uid','')
 
-    # Check if compare with results from another point *******************************
-    cduoa=i.get('compare_data_uoa','')
-    cruoa=i.get('compare_repo_uoa','')
-    cpuid=i.get('compare_point','')
-    csp=i.get('compare_subpoint','')
-    if cpuid.find('-')>=0:
-       cpuid,csp=cpuid.split('-')
-    cpuid=cpuid.strip()
-    cspid=csp.strip()
+        k=ruoa+';'+ruid+';'+muoa+';'+muid+';'+duoa+';'+duid
 
-    if cduoa!='' or cpuid!='' or cspid!='':
-       if o=='con':
-          ck.out('Loading dimensions to compare from different entry '+cduoa+' ...')
-          ck.out('')
+        if k not in apoints:
+           apoints[k]=q
+           apoints[k]['point_uids']=[]
 
-       ii={'repo_uoa':cruoa,
-           'module_uoa':muoa,
-           'data_uoa':cduoa,
-           'point':cpuid,
-           'subpoint':cspid,
-           'action':'load_point'}
-       rx=ck.access(ii)
-       if rx['return']>0: return rx
+        apoints[k]['point_uids'].append(puid)
 
-       cdd=rx['dict']
+    # Go through entries and delete points ...
+    for q in apoints:
+        qq=apoints[q]
+        ruoa=qq.get('repo_uoa','')
+        ruid=qq.get('repo_uid','')
+        muoa=qq.get('module_uoa','')
+        muid=qq.get('module_uid','')
+        duoa=qq.get('data_uoa','')
+        duid=qq.get('data_uid','')
+        puids=qq.get('point_uids',[])
 
-       ch=cdd.get('flat',{})
+        # Load and lock entry
+        ii={'action':'load',
+            'repo_uoa':ruid,
+            'module_uoa':muid,
+            'data_uoa':duid,
+            'get_lock':'yes',
+            'lock_retries':0}
 
-    # Get list of dimensions to check
-    kdc={} # key desc
+        rx=access_with_backoff({'ck_input':ii, 'timeout':cfg.get('lock_timeout',120), 'out':o})
+        if rx['return']>0: return rx
 
-    dc=i.get('dims_to_check',[])
+        lock_uid=rx['lock_uid']
+        p=rx['path']
+        d=rx['dict']
 
-    if len(dc)==0: dc=i.get('dims',[])
+        rl=rx
 
-    if type(dc)!=list: dc=[dc]
+        # Only mark points as deleted (files will be removed by "compact")
+        if soft=='yes':
+           rx=load_tombstones(p)
+           if rx['return']>0: return rx
+           tomb=rx['tombstones']
 
-    pap={}
-    if len(dc)>0:
-       # On Linux from CMD substitute ^ with #
-       for q in range(0, len(dc)):
-           dc[q]=dc[q].replace('^','#')
+           tm=time.time()
+           for k in puids:
+               tomb[k]=tm
 
-    else:
-       # Try to detect from scenario
-       if i.get('skip_scenario_keys','')!='yes' and sm_uoa!='':
-          ry=ck.access({'action':'load',
-                        'module_uoa':cfg['module_deps']['module'],
-                        'data_uoa':sm_uoa})
-          if ry['return']>0: return ry
-          ddx=ry['dict']
+           rx=save_tombstones(p, tomb)
+           if rx['return']>0: return rx
 
-          pap=ddx.get('prune_autotune_pipeline',{})
+           rx=remove_points_from_frontier(p, puids)
+           if rx['return']>0: return rx
 
-          dc=[]
+           # Invalidate cached contributions of this entry in "get"
+           os.utime(p, None)
 
-          xrk=ddx.get('replay_keys',[])
-          for q in xrk:
-              dc.append(q)
+           rx=ck.set_lock({'path':p, 'unlock_uid':lock_uid})
+           if rx['return']>0: return rx
 
-          # Check if has key description
-          rd=ddx.get('replay_desc',{})
-          xxmuoa=rd.get('module_uoa','')
-          xxkey=rd.get('desc_key','')
+           rx=update_catalog({'entry':rl, 'removed_points':puids})
+           if rx['return']>0: return rx
 
-          if xxmuoa!='':
-             ry=ck.access({'action':'load',
-                           'module_uoa':cfg['module_deps']['module'],
-                           'data_uoa':xxmuoa})
-             if ry['return']>0: return ry
+           ntp+=len(puids)
 
-          kdc=ry['desc'] # If not loaded from above module, then take it from scenario module desc!
-          if xxkey!='':
-             kdc=kdc.get(xxkey,{})
+           continue
 
-          al='yes'
+        rx=remove_points_in_entry({'path':p, 'dict':d, 'point_uids':puids, 'parallel':par, 'workers':nw})
+        if rx['return']>0: return rx
 
-    #******************************************************************
-    if len(ch)==0:
-       return {'return':1, 'error':'no flat characteristics in the point to compare'}
+        rmp=rx['removed_points']
+
+        ndp+=len(rmp)
+        ndf+=rx['deleted_files']
+
+        # Update and unlock entry
+        ii['action']='update'
+        del(ii['get_lock'])
+        ii['unlock_uid']=lock_uid
+        ii['dict']=d
+        rx=ck.access(ii)
+        if rx['return']>0: return rx
 
-    # Trying to get number of statistical repetitions from the entry
-    if repetitions=='':
-       rpt=ch.get('##pipeline_state#repetitions#min','')
-       if rpt=='': rpt=ft.get('features',{}).get('statistical_repetitions','')
-       if rpt!='': 
-          rpt=int(rpt)
-          repetitions=rpt
+        # Update catalog of points (if used)
+        rl['dict']=d
+        rx=update_catalog({'entry':rl, 'removed_points':rmp})
+        if rx['return']>0: return rx
 
-    #******************************************************************
+    if o=='con':
+       if soft=='yes':
+          ck.out('Points marked as deleted: '+str(ntp))
+       else:
+          ck.out('Deleted points: '+str(ndp)+' (files: '+str(ndf)+')')
 
-    pipeline.update(cf)
-    pdafr=''
+    rr={'return':0, 'deleted_points':ndp, 'deleted_files':ndf}
+    if soft=='yes': rr['tombstoned_points']=ntp
 
-    reuse_deps=(i.get('deps','')=='yes')
-    no_reuse_deps=(i.get('no_deps','')=='yes')
+    return rr
 
-    if not no_reuse_deps:
-       pdeps=pipeline.get('dependencies',{})
-       rz=ck.merge_dicts({'dict1':pdeps, 'dict2':deps})
-       if rz['return']>0: return rz
-       pdeps=rz['dict1']
-    else:
-       pdeps={}
-#       pdafr='yes'
-    pdafr='yes'
+##############################################################################
+# internal function to remove files of points from entry (entry should be locked)
+# and keep index of points by features, frontier and tombstones in sync (entry dict is updated)
 
-    pipeline['dependencies']=pdeps
+def remove_points_in_entry(i):
 
-    if len(pipeline)==0:
-       return {'return':1, 'error':'pipeline not found in the entry'}
+    p=i['path']
+    d=i['dict']
+    puids=i['point_uids']
 
-    if i.get('target','')!='': pipeline['target']=i['target']
-    if i.get('host_os','')!='': pipeline['host_os']=i['host_os']
-    if i.get('target_os','')!='': pipeline['target_os']=i['target_os']
-    if i.get('device_id','')!='': pipeline['device_id']=i['device_id']
+    par=i.get('parallel','')
+    nw=i.get('workers',1)
 
-    #******************************************************************
-    if o=='con':
-       ck.out('Restarting pipeline ...')
-       ck.out('')
+    dp=d.get('points', '')
+    if dp=='': dp=0
+    dp=int(dp)
 
-    # Attempt to run pipeline
-    ii={'action':'autotune',
-        'out':o,
-        'iterations':1,
-        'module_uoa':cfg['module_deps']['pipeline'],
-        'data_uoa':pipeline_uid,
-        'pipeline':pipeline,
-        'repetitions':repetitions,
-        'preserve_deps_after_first_run':pdafr,
-        'pipeline_update':pipeline_update,
-        'solutions':solutions,
-        'prune':prune,
-        'reduce_bug':reduce_bug,
-        'prune_md5':prune_md5,
-        'prune_invert':prune_invert,
-        'force_pipeline_update':'yes',
-        'pause':i.get('pause',''),
-        'ask_enter_after_each_iteration':i.get('ask_enter_after_each_iteration',''),
-        'condition_objective':i.get('condition_objective',''),
-        'prune_invert_do_not_remove_key':i.get('prune_invert_do_not_remove_key',''),
-        'print_keys_after_each_iteration':prune_print_keys,
-        'record':record,
-        'record_uoa':record_uoa,
-        'record_repo':record_repo,
-        'skip_done':'yes'}
-    if prune=='yes': 
-       ii['iterations']=-1
-       ii.update(pap)
+    # Load index of points by features (invalidate it if it is not in sync)
+    rx=load_features_index({'path':p, 'entry_points':dp})
+    if rx['return']>0: return rx
+    fidx=rx['index']
 
-       pc=i.get('prune_conditions',[])
-       if len(pc)>0:
-          ii['result_conditions']=pc
+    if fidx==None:
+       pinfo=os.path.join(p, features_index_dir, 'info.json')
+       if os.path.isfile(pinfo): os.remove(pinfo)
 
-       ii['prune_result_conditions']=ii.get('result_conditions',[])
+    # Load schema of flat keys of points (remove it if it is not in sync)
+    rx=load_keys_schema({'path':p, 'entry_points':dp})
+    if rx['return']>0: return rx
+    ksch=rx['schema']
 
-    if len(choices_order)>0:
-       ii['choices_order']=[choices_order]
+    if ksch==None:
+       pk=os.path.join(p, cfg.get('keys_schema_file','keys.json'))
+       if os.path.isfile(pk): os.remove(pk)
 
-    r=ck.access(ii)
-    if r['return']>0: return r
+    # Group files of points to delete by UID (ckp-<uid>.*) in one scan of entry directory
+    spuids=set(puids)
 
-    rlio=r.get('last_iteration_output',{})
-    fail=rlio.get('fail','')
+    files={}
+    for fn in os.listdir(p):
+        if fn.startswith('ckp-'):
+           k=fn[4:].split('.',1)[0]
+           if k in spuids:
+              if k not in files: files[k]=[]
+              files[k].append(fn)
+
+    dp-=len(files)
+    if dp<0: dp=0 # should not be, but just in case
+
+    d['points']=str(dp)
+
+    # Remove points from index by features
+    if fidx!=None:
+       for k in files:
+           fn='ckp-'+k+'.features_flat.json'
+           if fn in files[k]:
+              rx=ck.load_json_file({'json_file':os.path.join(p, fn)})
+              if rx['return']>0: return rx
 
-    # Check that didn't fail (or failed, if reproducing a bug)
-    if fail=='yes' and reduce_bug!='yes':
-       if o=='con':
-          ck.out('')
-          ck.out('Warning: pipeline failed during ref iteration ('+rlio.get('fail_reason','')+')')
+              rx=remove_point_from_features_index(fidx, features_digest(rx['dict']), k)
+              if rx['return']>0: return rx
 
-    # Flattening characteristics
-    chn=r.get('last_stat_analysis',{})
-    if 'dict_flat' in chn:
-       chn=chn.get('dict_flat',{})
+    # Remove keys of points from schema
+    if ksch!=None:
+       kk=ksch['keys']
+       for k in files:
+           if 'ckp-'+k+'.flat.json' in files[k]:
+              rx=point_keys(p, 'ckp-'+k)
+              if rx['return']>0: return rx
 
-    # Record original and reproduced results, if needed
-    rofj=i.get('record_original_flat_json','').replace('$#ck_cur_path#$',pp)
-    rrfj=i.get('record_reproduced_flat_json','').replace('$#ck_cur_path#$',pp)
+              ksch['points']-=1
+              for q in rx['keys']:
+                  if q in kk:
+                     kk[q]-=1
+                     if kk[q]<=0: del(kk[q])
+
+              ksch['changed']=True
+
+    # Remove files of all points at once
+    rm=[]
+    for k in files:
+        for fn in files[k]:
+            rm.append(os.path.join(p, fn))
+
+    if par=='threads' and nw>1 and len(rm)>1:
+       from multiprocessing.pool import ThreadPool
+       pool=ThreadPool(min(nw, len(rm)))
+       try:
+          pool.map(os.remove, rm)
+       finally:
+          pool.close()
+          pool.join()
+    else:
+       for fn in rm:
+           os.remove(fn)
 
-    if rofj!='':
-       rx=ck.save_json_to_file({'json_file':rofj, 'dict':ch})
-       if rx['return']>0: return rx
+    if fidx!=None:
+       fidx['entry_points']=d['points']
 
-    if rrfj!='':
-       rx=ck.save_json_to_file({'json_file':rrfj, 'dict':chn})
+       rx=save_features_index(fidx)
        if rx['return']>0: return rx
 
-    # Check if skip comparison
-    if i.get('skip','')!='yes' and reduce_bug!='yes':
-       # Comparing dicts
-       if o=='con':
-          ck.out('********************************************************************')
-          ck.out('Performing comparison on output dimensions (original vs new results)')
-          ck.out('')
-
-       ends=i.get('end_of_dims_to_check',[])
-       ttc=i.get('threshold_to_compare','')
-       if ttc=='': ttc=8.0
-       ttc=float(ttc)/100
+    if ksch!=None:
+       ksch['entry_points']=d['points']
 
-       import fnmatch
+       rx=save_keys_schema(ksch)
+       if rx['return']>0: return rx
 
-       dd=[]
+    rx=remove_points_from_frontier(p, puids)
+    if rx['return']>0: return rx
 
-       simple=False
-       # Check if checking only a few keys without *?
-       if len(dc)>0:
-          simple=True
-          for q in dc:
-              if '*' in q or '?' in q:
-                 simple=False
-                 break
-       if simple:
-          lk=dc
-       else:
-          # Create a list of all keys in original and new output
-          lk=list(ch.keys())
-          for q in chn:
-              if q not in lk:
-                 lk.append(q)
+    # Removed points don't need tombstones anymore
+    rx=load_tombstones(p)
+    if rx['return']>0: return rx
+    tomb=rx['tombstones']
 
-       # Compare
-       ichecked=0
-       for q in sorted(lk):
-           v=ch.get(q,None)
-           v1=chn.get(q, None)
+    if len(tomb)>0:
+       changed=False
+       for k in puids:
+           if k in tomb:
+              del(tomb[k])
+              changed=True
 
-           if type(v)!=list and type(v)!=dict:
-              check=False
+       if changed:
+          rx=save_tombstones(p, tomb)
+          if rx['return']>0: return rx
 
-              if len(dc)==0: 
-                 check=True
-              else:
-                 for k in dc:
-                     if fnmatch.fnmatch(q,k):
-                        check=True
-                        break
+    return {'return':0, 'removed_points':list(files.keys()), 'deleted_files':len(rm)}
 
-              if check:
-                 check=False
+##############################################################################
+# internal function to remove points from frontier kept with entry (if any)
 
-                 if len(ends)==0: 
-                    check=True
-                 else:
-                    for k in ends:
-                        if q.endswith(k):
-                           check=True
-                           break
+def remove_points_from_frontier(p, puids):
 
-              if check:
-                 ichecked+=1
+    r=load_frontier(p)
+    if r['return']>0: return r
+    fr=r['frontier']
 
-                 z=q
-                 if kdc.get(q,{}).get('desc','')!='':
-                    z=kdc[q]['desc']
+    fp=fr.get('points',{})
+    if len(fp)>0:
+       changed=False
+       for k in puids:
+           if k in fp:
+              del(fp[k])
+              changed=True
 
-                 ss=z+':  '+str(v)+' vs '+str(v1)
-                 if v!=v1:
-                    if (type(v)==int or type(v)==float) and (type(v1)==int or type(v1)==float) and v!=0:
-                       vx=abs(v1-v)/v
-                       if vx>ttc:
-                          ss+='    diff='+( '%3.1f'% (vx*100))+'%'
-                          dd.append(q)
-                    else:
-                       dd.append(q)
+       if changed:
+          return save_frontier(p, fr)
 
-                 if o=='con' and (v!=v1 or al=='yes'):
-                    ck.out(ss)
+    return {'return':0}
 
-       if o=='con':
-          ck.out('')
-          if ichecked==0:
-             ck.out('Warning: no matched keys found in the output dictionary of the replicated experiment (possibly failed experiment)!')
-          elif len(dd)==0:
-             ck.out('All existing dimensions are the same (within statistical margin '+str(ttc*100)+'%)!')
+##############################################################################
+# internal function to load tombstones of points marked as deleted (point UID -> time)
+# (if list of files in entry is given, file is only loaded if it exists there)
 
-       r['different_dims']=dd
+def load_tombstones(p, dir_list=None):
 
-    return r
+    tomb={}
 
-##############################################################################
-# rerun experiment == the same as reproduce
+    fn=cfg.get('tombstones_file','tombstones.json')
+    if dir_list!=None and fn not in dir_list:
+       return {'return':0, 'tombstones':tomb}
 
-def rerun(i):
-    """
-    See "replay" API
-    """
+    pt=os.path.join(p, fn)
+    if os.path.isfile(pt):
+       r=ck.load_json_file({'json_file':pt})
+       if r['return']>0: return r
+       tomb=r['dict'].get('points',{})
 
-    return replay(i)
+    return {'return':0, 'tombstones':tomb}
 
 ##############################################################################
-# reproduce a given experiment
+# internal function to save tombstones of points (file is removed if there are no tombstones)
 
-def reproduce(i):
-    """
-    See "replay" API
-    """
+def save_tombstones(p, tomb):
 
-    return replay(i)
+    pt=os.path.join(p, cfg.get('tombstones_file','tombstones.json'))
 
+    if len(tomb)==0:
+       if os.path.isfile(pt): os.remove(pt)
+       return {'return':0}
+
+    return ck.save_json_to_file({'json_file':pt, 'dict':{'points':tomb}})
 
 ##############################################################################
-# load pipeline info
+# rebuild catalog of experiment points
 
-def load_pipeline(i):
+def reindex(i):
     """
     Input:  {
-               data_uoa          - experiment data UOA
-               (repo_uoa)        - experiment repo UOA
-               (module_uoa)
+              (repo_uoa)    - experiment repo UOA (all repos by default)
+              (data_uoa)    - experiment entries (can be wild cards, all by default)
+              (module_uoa)
             }
 
     Output: {
@@ -2384,380 +6470,476 @@ def load_pipeline(i):
                                          >  0, if error
               (error)      - error text if return > 0
 
-              pipeline     - pipeline's dict
-              pipeline_uoa - pipeline's UOA
-              pipeline_uid - pipeline's UID
+              catalogs     - list of paths to updated catalogs
+              entries      - number of indexed entries
+              points       - number of indexed points
             }
 
     """
 
-    ruoa=i.get('repo_uoa',      '')
-    muoa=i.get('module_uoa',    'experiment')
-    duoa=i.get('data_uoa',      '')
+    o=i.get('out','')
 
-    r=ck.access({   'action':       'load',
-                    'repo_uoa':     ruoa,
-                    'module_uoa':   muoa,
-                    'data_uoa':     duoa,
-    })
+    duoa=i.get('data_uoa','')
+    if duoa=='': duoa=i.get('experiment_uoa','')
+
+    muoa=i.get('module_uoa','')
+    if muoa=='': muoa=work['self_module_uoa']
+
+    r=ck.access({'action':'search',
+                 'repo_uoa':i.get('repo_uoa',''),
+                 'module_uoa':muoa,
+                 'data_uoa':duoa})
     if r['return']>0: return r
-    p=r['path']
-    d=r['dict']
+    lst=r['lst']
 
-    # Check pipeline
-    pxuoa=d.get('pipeline_uoa','')
-    pxuid=d.get('pipeline_uid','')
-    pipeline={}
+    # Group entries by module directories (one catalog per repo)
+    cats={}
+    for e in lst:
+        pc=catalog_path(e['path'])
+        if pc not in cats: cats[pc]=[]
+        cats[pc].append(e)
 
-    if pxuoa!='' or pxuid!='':
-       p1=os.path.join(p, 'pipeline.json')
-       if os.path.isfile(p1):
-          rx=ck.load_json_file({'json_file':p1})
-          if rx['return']>0: return rx
-          pipeline=rx['dict']
+    ne=0
+    npts=0
+    for pc in sorted(cats):
+        if o=='con':
+           ck.out('Indexing '+str(len(cats[pc]))+' entries in '+pc+' ...')
 
-    return {'return':0, 'pipeline_uoa':pxuoa, 'pipeline_uid':pxuid, 'pipeline':pipeline}
+        r=open_catalog(pc, True)
+        if r['return']>0: return r
+        db=r['db']
+
+        try:
+           # Full reindex of a repo clears catalog (removes already deleted entries)
+           if duoa=='':
+              for t in ['entries', 'tags', 'points', 'point_values']:
+                  db.execute('DELETE FROM '+t)
+
+           for e in cats[pc]:
+               r=ck.access({'action':'load',
+                            'repo_uoa':e['repo_uid'],
+                            'module_uoa':e['module_uid'],
+                            'data_uoa':e['data_uid']})
+               if r['return']>0: return r
 
+               r=catalog_update_entry(db, r, None)
+               if r['return']>0: return r
 
-##############################################################################
-# load all info about a given point and subpoint
+               ne+=1
+               npts+=r['points']
 
-def load_point(i):
-    """
-    Input:  {
-               data_uoa          - experiment data UOA
-               (repo_uoa)        - experiment repo UOA
-               (module_uoa)
+           db.commit()
+        finally:
+           db.close()
 
-               (point_uid)       - point (or skip, if there is only one), can be of format UID-<subpoint>
-               (point_idx)       - 0-based numeric index of the point (assuming they are sorted by UID)
-               (subpoint)        - subpoint (or skip, if there is only one)
+    return {'return':0, 'catalogs':sorted(cats.keys()), 'entries':ne, 'points':npts}
 
-               (add_pipeline)    - if 'yes', load pipeline from entry (if exists)
-               (no_points)       - if 'yes', just return the pipeline information and ignore the points
-            }
+##############################################################################
+# internal function to get path to catalog of points (SQLite) of a given entry
+#
+# Catalog is kept per repo in .cm of experiment module directory
+# and indexes entry meta, tags, points, flat features and scalar keys of points
+# (summary projection); it is updated by "add", "compact", "delete_points" and "filter" if exists
+# (or if catalog=='yes' in module config) and fully rebuilt by "reindex"
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
+def catalog_path(p):
 
-              dict         - {point extension = loaded json file}
+    return os.path.join(os.path.dirname(p), ck.cfg['subdir_ck_ext'], cfg.get('catalog_file','catalog.sqlite'))
 
-              pipeline     - if add_pipeline!='yes' and pipeline exists, return dict
-              pipeline_uoa - if add_pipeline!='yes' and pipeline_uoa exists, return pipeline UOA
-              pipeline_uid - if add_pipeline!='yes' and pipeline_uid exists, return pipeline UID
-            }
+##############################################################################
+# internal function to open catalog (and create tables if needed)
 
-    """
+def open_catalog(pc, create=False):
 
-    o=i.get('out','')
+    if not create and not os.path.isfile(pc):
+       return {'return':16, 'error':'catalog '+pc+' not found'}
 
-    oo=''
-    if o=='con': oo=o
+    try:
+       import sqlite3
+    except ImportError as e:
+       return {'return':1, 'error':'SQLite is needed for catalog of experiment points ('+format(e)+')'}
 
-    ruoa=i.get('repo_uoa','')
-    muoa=i.get('module_uoa','')
-    if muoa=='': muoa=work['self_module_uoa']
-    duoa=i.get('data_uoa','')
+    pd=os.path.dirname(pc)
+    if not os.path.isdir(pd): os.makedirs(pd)
 
-    sp=i.get('subpoint','')
+    try:
+       db=sqlite3.connect(pc, timeout=float(cfg.get('lock_timeout',120)))
+
+       db.execute('CREATE TABLE IF NOT EXISTS entries (data_uid TEXT PRIMARY KEY, data_uoa TEXT, '
+                  'repo_uid TEXT, repo_uoa TEXT, module_uid TEXT, module_uoa TEXT, dict TEXT)')
+       db.execute('CREATE TABLE IF NOT EXISTS tags (data_uid TEXT, tag TEXT)')
+       db.execute('CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag)')
+       db.execute('CREATE TABLE IF NOT EXISTS entry_meta (data_uid TEXT, key TEXT, value TEXT)')
+       db.execute('CREATE INDEX IF NOT EXISTS entry_meta_key ON entry_meta (key, value)')
+       db.execute('CREATE TABLE IF NOT EXISTS points (data_uid TEXT, point_uid TEXT, features_flat TEXT, '
+                  'features_key TEXT, list_keys TEXT, PRIMARY KEY (data_uid, point_uid))')
+       db.execute('CREATE INDEX IF NOT EXISTS points_features ON points (data_uid, features_key)')
+       db.execute('CREATE TABLE IF NOT EXISTS point_values (data_uid TEXT, point_uid TEXT, key TEXT, value TEXT)')
+       db.execute('CREATE INDEX IF NOT EXISTS point_values_key ON point_values (data_uid, key)')
+    except Exception as e:
+       return {'return':1, 'error':'can\'t open catalog '+pc+' ('+format(e)+')'}
 
-    ap=i.get('add_pipeline','')
-    load_points = i.get('no_points', '') != 'yes'
+    return {'return':0, 'db':db}
 
-    extra_path=i.get('extra_path','')
+##############################################################################
+# internal function to update entry and its points in the catalog
+# (r is output of CK "load" for the entry; points is a list of point UIDs to update
+#  or None to reindex all points of the entry)
+
+def catalog_update_entry(db, r, points):
+
+    import json
 
-    r=list_points({'module_uoa':muoa,
-                   'data_uoa':duoa,
-                   'repo_uoa':ruoa,
-                   'repo_module_uoa':i.get('repo_module_uoa',''),
-                   'extra_path':extra_path,
-                   'out':oo})
-    if r['return']>0: return r
     p=r['path']
-    d=r['dict']
+    dd=r['dict']
+    duid=r['data_uid']
 
-    # Check pipeline
-    pxuoa=d.get('pipeline_uoa','')
-    pxuid=d.get('pipeline_uid','')
-    pipeline={}
+    db.execute('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?)',
+               (duid, r['data_uoa'], r['repo_uid'], r['repo_uoa'], r['module_uid'], r['module_uoa'],
+                json.dumps(dd, sort_keys=True)))
 
-    if ap=='yes' and (pxuoa!='' or pxuid!=''):
-       p1=os.path.join(p, 'pipeline.json')
-       if os.path.isfile(p1):
-          rx=ck.load_json_file({'json_file':p1})
-          if rx['return']>0: return rx
-          pipeline=rx['dict']
+    db.execute('DELETE FROM tags WHERE data_uid=?', (duid,))
+    for t in dd.get('tags',[]):
+        db.execute('INSERT INTO tags VALUES (?,?)', (duid, t))
 
-    dd={}
+    db.execute('DELETE FROM entry_meta WHERE data_uid=?', (duid,))
+    db.executemany('INSERT INTO entry_meta VALUES (?,?,?)', [(duid, q[0], q[1]) for q in catalog_meta_values(dd.get('meta',{}))])
 
-    if load_points:
-        # Check point
+    # Features are compared as in "get" (ignore case and empty values)
+    rx=compile_features_matcher({'ignore_case':'yes', 'space_as_none':'yes'})
+    if rx['return']>0: return rx
+    fmatch=rx['matcher']
 
-        pp  = r['points']
-        if len(pp)==0:
-            return {'return':1, 'error':'points not found in the entry'}
+    if points==None:
+       db.execute('DELETE FROM points WHERE data_uid=?', (duid,))
+       db.execute('DELETE FROM point_values WHERE data_uid=?', (duid,))
 
-        point_uid   = i.get('point_uid', i.get('point') )
+       dirList=os.listdir(p)
 
-        if point_uid==None:
-            point_idx   = i.get('point_idx')
-            if point_idx!=None:
-                point_idx = int( point_idx )
-                if point_idx<len(pp):
-                    point_uid = pp[point_idx]
-                else:
-                    return {'return':1, 'error': 'point_idx(=={}) out of range - only {} points available'.format(point_idx, len(pp))}
-            elif len(pp)==1:
-                point_uid   = pp[0]
-            else:
-                return {'return':1, 'error':'more than one point found - please prune your choice by using --point or --point_idx'}
+       rx=load_tombstones(p, dirList)
+       if rx['return']>0: return rx
+       tomb=rx['tombstones']
 
-        # Start listing points
-        dirList=os.listdir(p)
-        for fn in sorted(dirList):
-            if fn.startswith('ckp-'):
-               if len(fn)>20 and fn[20]=='.':
-                  uid=fn[4:20]
-                  if uid==point_uid:
-                     i1=fn.find('.json')
-                     if i1>0:
-                        key=fn[21:i1]
-                        if sp!='' and key!='flat' and key!='deps' and key!='desc' and key!='features' and key!=sp:
-                           continue
-                        p1=os.path.join(p,fn)
-                        rx=ck.load_json_file({'json_file':p1})
-                        if rx['return']>0: return rx
-                        dd[key]=rx['dict']
+       points=[]
+       for fn in sorted(dirList):
+           if fn.startswith('ckp-') and fn.endswith('.flat.json') and fn[4:-10] not in tomb:
+              points.append(fn[4:-10])
 
-    return {'return':0, 'dict':dd, 'pipeline_uoa':pxuoa, 'pipeline_uid':pxuid, 'pipeline':pipeline}
+    for puid in sorted(set(points)):
+        pp1='ckp-'+puid
 
+        dft={}
+        rx=ck.load_json_file({'json_file':os.path.join(p, pp1+'.features_flat.json')})
+        if rx['return']==0: dft=rx['dict']
 
-##############################################################################
-# stat analysis with multiple points at the same time
+        # Scalar keys of the point (from summary or flat json)
+        rx=load_summary(p, pp1, [])
+        if rx['return']>0: return rx
+        dk=rx['dict']
+        lk=[]
 
-def multi_stat_analysis(i):
-    """
-    Input:  {
-              (dict)                        - pre-loaded dict with characteristics that will be flattened
-                  or
-              (flat_dict)                   - pre-loaded flat dict with characteristics
+        if dk!=None:
+           lk=rx['list_keys']
+        else:
+           rx=ck.load_json_file({'json_file':os.path.join(p, pp1+'.flat.json')})
+           if rx['return']>0: return rx
+
+           dk={}
+           for k in rx['dict']:
+               v=rx['dict'][k]
+               if type(v)==list or type(v)==dict:
+                  lk.append(k)
+               else:
+                  dk[k]=v
 
-                                                  USE 'characteristic_list' in dict!
+        db.execute('INSERT OR REPLACE INTO points VALUES (?,?,?,?,?)',
+                   (duid, puid, json.dumps(dft, sort_keys=True), features_match_key(normalize_features(fmatch, dft)),
+                    json.dumps(sorted(lk))))
 
-              dict_to_add                   - data to analyze and add to dict
+        db.execute('DELETE FROM point_values WHERE data_uid=? AND point_uid=?', (duid, puid))
 
-              (dict_to_compare)             - flat dict to calculate improvements
+        vals=[]
+        for k in dk:
+            vals.append((duid, puid, k, json.dumps(dk[k])))
 
-              (process_multi_keys)          - list of keys (starts with) to perform stat analysis on flat array,
-                                              by default ['##characteristics#*', '##features#*' '##choices#*'],
-                                              if empty, no stat analysis
+        db.executemany('INSERT INTO point_values VALUES (?,?,?,?)', vals)
 
-              (skip_stat_analysis)          - if 'yes', just flatten array and add #min
-            }
+    return {'return':0, 'points':len(points)}
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
+##############################################################################
+# internal function to update entry and its points in the catalog (if catalog is used)
 
-              dict_flat         - updated and flattened original dictionary
-              max_range_percent - max % range in float/int data (useful to record points with unusual behavior)
-              min               - 'yes', if one of monitored values reached min
-              max               - 'yes', if one of monitored values reached max
-            }
+def update_catalog(i):
 
-    """
+    r=i['entry']
 
-    import copy
+    pc=catalog_path(r['path'])
+    if cfg.get('catalog','')!='yes' and not os.path.isfile(pc):
+       return {'return':0}
 
-    o=i.get('out','')
+    rx=open_catalog(pc, True)
+    if rx['return']>0: return rx
+    db=rx['db']
 
-    ddflat=i.get('flat_dict',{})
-    dd=i.get('dict',{})
+    try:
+       duid=r['data_uid']
 
-    dtc=i.get('dict_to_compare',{})
+       rp=i.get('removed_points',[])
+       for puid in rp:
+           db.execute('DELETE FROM points WHERE data_uid=? AND point_uid=?', (duid, puid))
+           db.execute('DELETE FROM point_values WHERE data_uid=? AND point_uid=?', (duid, puid))
 
-    # Select keys to prune and flat
-    sak=i.get('process_multi_keys','')
-    if sak=='': 
-       sak=['##characteristics#*', '##features#*', '##choices#*']
+       rx=catalog_update_entry(db, r, i.get('points',[]))
+       if rx['return']>0: return rx
 
-    if len(dd)>0 and len(ddflat)==0:
-       r=ck.flatten_dict({'dict':dd, 'prune_keys':sak})
-       if r['return']>0: return r
-       ddflat=r['dict']
+       db.commit()
+    except Exception as e:
+       return {'return':1, 'error':'can\'t update catalog '+pc+' ('+format(e)+')'}
+    finally:
+       db.close()
 
-    ddx=i.get('dict_to_add',{})
+    return {'return':0}
 
-    cddx=copy.deepcopy(ddx)
+##############################################################################
+# internal function to get (key, value) pairs of scalar values of entry meta for catalog
+# (lists give pairs for their scalar values; numbers are normalized since 1, 1.0 and True
+#  are equal in ck.compare_dicts)
 
-    # Remove characteristics from original
-    ch=ck.get_from_dicts(cddx, 'characteristics', {}, None)
+def catalog_meta_values(d, prefix=''):
 
-    # Check if characteristics lists (to add a number of experimental results at the same time,
-    #   otherwise point by point processing can become very slow
-    chl=ck.get_from_dicts(cddx, 'characteristics_list', [], None)
-    if len(ch)>0: chl.append(ch)
+    import json
 
-    # Flatten input dict
-    r=ck.flatten_dict({'dict':cddx, 'prune_keys':sak})
-    if r['return']>0: return r
-    ddf=r['dict']
+    x=[]
+    for k in d:
+        v=d[k]
+        kk=prefix+'#'+k
 
-    mmin=''
-    mmax=''
-    mdp=''
+        if type(v)==dict:
+           x+=catalog_meta_values(v, kk)
+        elif type(v)==list:
+           for q in v:
+               if type(q)!=dict and type(q)!=list:
+                  x.append([kk, json.dumps(canonical_feature_value(q))])
+        else:
+           x.append([kk, json.dumps(canonical_feature_value(v))])
 
-    ich=0
-    for cx in chl:
-        ich+=1
+    return x
 
-        if o=='con':
-           ck.out('        Processing characteristic point '+str(ich)+' out of '+str(len(chl))+' ...')
+##############################################################################
+# internal function to get key of normalized flat features (see normalize_features)
+# which is the same for features equal for matcher
 
-        cddf=copy.deepcopy(ddf) # Prepare clean input (and append iteration of statistical characteristics)
+def features_match_key(nf):
 
-        # Flatten/prune next iteration of statistical characteristic dict and perform basic analysis **********************************
-        r=ck.flatten_dict({'dict':{'characteristics':cx}, 'prune_keys':sak})
-        if r['return']>0: return r
-        ddfi=r['dict']
+    import hashlib
+    import json
 
-        # Process multiple values in time packed as @@value1,value2
-        for q in ddfi:
-            v=ddfi[q]
-            x=False
-            try: x=v.startswith('@@')
-            except AttributeError: pass
-            if x:
-               v1=ddfi[q][2:].split(',')
-               v2=[]
-               for k in v1:
-                   try: k=float(k)
-                   except ValueError: pass
-                   v2.append(k)
-               ddfi[q]=v2
+    x=[]
+    for q in nf:
+        v=q[1]
+        if type(v)!=tuple: v=canonical_feature_value(v)
+        x.append([q[0], v])
 
-        # Update original input with iteration from statistical repetition
-        cddf.update(ddfi)
+    x=sorted(x, key=lambda q: q[0])
 
-        # Prepare input for statistical analysis
-        ii={'dict':ddflat, 'dict1':cddf}
+    return hashlib.sha1(json.dumps(x).encode('utf8')).hexdigest()
 
-        if len(dtc)>0: 
-           ii['dict_compare']=dtc
+##############################################################################
+# internal function to select entries and points from catalogs instead of searching repos and loading files
+# (returns lst=None if catalog can't be used for this query, i.e. some repo has experiments but no catalog)
+#
+# Entries are selected by tags and scalar values of meta (SQL), data UOA and exact meta,
+# and points by point UIDs and key of flat features (SQL) and exact flat features;
+# scalar values of requested keys are taken from SQL. Only entries and points selected by SQL
+# are checked and parsed here. Vector thresholds are not used here since points skipped by them
+# still add their info to mtable in "get".
 
-        if ich!=1 and ich!=len(chl): # we need to run it at least once for the first iteration, otherwise we will miss compile info (autotuning)
-           ii['skip_expected_value']='yes'
-           ii['skip_min_max']='yes'
+def catalog_search(i):
 
-        if i.get('skip_stat_analysis','')!='':
-           ii['skip_stat_analysis']=i['skip_stat_analysis']
+    import json
+    import fnmatch
 
-        r=stat_analysis(ii)
-        if r['return']>0: return r
+    ruoa=i.get('repo_uoa','')
+    duoa=i.get('data_uoa','')
+    duoal=i.get('data_uoa_list',[])
+    meta=i.get('meta',{})
+    tags=i.get('tags','')
+    prune_points=i.get('prune_points',[])
+    ffeatures=i.get('flat_features',{})
+    fkti=i.get('features_keys_to_ignore',[])
+    skl=i.get('summary_keys',None)
+    lfeat=i.get('load_features',True)
 
-        ddflat=r['dict']
-        mdp=r['max_range_percent']
-        mmin=r['min']
-        mmax=r['max']
+    # Find module directories in repos (in the same order as CK search: default, local and other repos)
+    repos=[]
+    if ruoa!='':
+       r=ck.find_path_to_repo({'repo_uoa':ruoa})
+       if r['return']>0: return r
+       repos.append(r['path'])
+    else:
+       for x in [ck.work['dir_default_repo'], ck.work['dir_local_repo']]:
+           if x!='' and x not in repos: repos.append(x)
 
-    return {'return':0, 'dict_flat':ddflat, 'min':mmin, 'max':mmax, 'max_range_percent':mdp}
+       r=ck.reload_repo_cache({})
+       if r['return']>0: return r
+       for q in ck.cache_repo_info:
+           x=ck.cache_repo_info[q].get('dict',{})
+           if x.get('remote','')!='yes' and x.get('path','')!='' and x['path'] not in repos:
+              repos.append(x['path'])
 
-##############################################################################
-# delete multiple points from multiple entries (for example, during Pareto frontier filtering)
+    r=compile_features_matcher({'features':ffeatures, 'ignore_case':'yes', 'space_as_none':'yes', 'keys_to_ignore':fkti})
+    if r['return']>0: return r
+    fmatch=r['matcher']
 
-def delete_points(i):
-    """
-    Input:  {
-              points       - list of points {'repo_uoa','repo_uid','module_uoa','module_uid','data_uoa','data_uid','point_uid'}
-            }
+    # Key of flat features to select points in SQL (if no keys are ignored)
+    fkey=None
+    if len(ffeatures)>0 and not i.get('all_points',False) and len(fkti)==0:
+       fkey=features_match_key(fmatch['features'])
 
-    Output: {
-              return       - return code =  0, if successful
-                                         >  0, if error
-              (error)      - error text if return > 0
-            }
+    # Scalar values of meta to select entries in SQL
+    mvals=catalog_meta_values(meta)
 
-    """
+    xtags=[]
+    if tags!='':
+       for t in tags.split(','):
+           t=t.strip()
+           if t!='' and t not in xtags: xtags.append(t)
 
-    o=i.get('out','')
+    lst=[]
+    entries=[]
 
-    points=i['points']
+    for pr in repos:
+        r=ck.find_path_to_entry({'path':pr, 'data_uoa':work['self_module_uid']})
+        if r['return']<0: continue # no experiments in this repo
+        if r['return']>0: return r
+        pm=r['path']
 
-    apoints={}
+        pc=os.path.join(pm, ck.cfg['subdir_ck_ext'], cfg.get('catalog_file','catalog.sqlite'))
+        r=open_catalog(pc)
+        if r['return']==16: return {'return':0, 'lst':None}
+        if r['return']>0: return r
+        db=r['db']
+
+        try:
+           sql='SELECT data_uid, data_uoa, repo_uid, repo_uoa, module_uid, module_uoa, dict FROM entries'
+           cond=[]
+           par=[]
+           if len(xtags)>0:
+              cond.append('data_uid IN (SELECT data_uid FROM tags WHERE tag IN ('+','.join(['?']*len(xtags))+')'+ \
+                          ' GROUP BY data_uid HAVING COUNT(DISTINCT tag)=?)')
+              par+=xtags+[len(xtags)]
+           for q in mvals:
+               cond.append('data_uid IN (SELECT data_uid FROM entry_meta WHERE key=? AND value=?)')
+               par+=q
+           if len(cond)>0:
+              sql+=' WHERE '+' AND '.join(cond)
+
+           # Keep order of entries as in CK search, i.e. as in data_uoa_list or in module directory
+           if len(duoal)>0:
+              xorder=duoal
+           else:
+              try:
+                 xorder=os.listdir(pm)
+              except Exception as e:
+                 xorder=[]
+           order={}
+           for q in range(0, len(xorder)):
+               if xorder[q] not in order: order[xorder[q]]=q
 
-    # Get unique repo/module/data and aggregate points
-    for q in points:
-        ruoa=q.get('repo_uoa','')
-        ruid=q.get('repo_uid','')
-        muoa=q.get('module_uoa','')
-        muid=q.get('module_uid','')
-        duoa=q.get('data_uoa','')
-        duid=q.get('data_uid','')
-        puid=q.get('point_uid','')
+           rows=db.execute(sql, par).fetchall()
+           rows=sorted(rows, key=lambda q: min(order.get(q[1], len(xorder)), order.get(q[0], len(xorder))))
 
-        k=ruoa+';'+ruid+';'+muoa+';'+muid+';'+duoa+';'+duid
+           for row in rows:
+               duid=row[0]
+               dduoa=row[1]
 
-        if k not in apoints:
-           apoints[k]=q
-           apoints[k]['point_uids']=[]
+               if len(duoal)>0 and duid not in duoal and dduoa not in duoal: continue
+               if duoa!='' and duoa!=duid and not fnmatch.fnmatch(dduoa, duoa): continue
 
-        apoints[k]['point_uids'].append(puid)
+               dd=json.loads(row[6])
 
-    # Go through entries and delete points ...
-    for q in apoints:
-        qq=apoints[q]
-        ruoa=qq.get('repo_uoa','')
-        ruid=qq.get('repo_uid','')
-        muoa=qq.get('module_uoa','')
-        muid=qq.get('module_uid','')
-        duoa=qq.get('data_uoa','')
-        duid=qq.get('data_uid','')
-        puids=qq.get('point_uids',[])
+               if len(meta)>0:
+                  rx=ck.compare_dicts({'dict1':dd.get('meta',{}), 'dict2':meta})
+                  if rx['return']>0: return rx
+                  if rx['equal']!='yes': continue
+
+               # Skip entries removed without updating catalog
+               p=os.path.join(pm, dduoa)
+               if not os.path.isdir(p):
+                  p=os.path.join(pm, duid)
+                  if not os.path.isdir(p): continue
+
+               # Select points (UIDs of pruned points are passed in chunks
+               # not to exceed limit of SQL variables in old SQLite builds)
+               sql='SELECT point_uid, features_flat, list_keys FROM points WHERE data_uid=?'
+               par=[duid]
+               if fkey!=None:
+                  sql+=' AND (features_key=? OR features_flat=?)' # points without features are not checked
+                  par+=[fkey, '{}']
+
+               prows=[]
+               if len(prune_points)>0:
+                  xp=[]
+                  xs=set()
+                  for q in prune_points:
+                      if q not in xs:
+                         xs.add(q)
+                         xp.append(q)
+                  csize=cfg.get('catalog_sql_chunk',500)
+                  for q in range(0, len(xp), csize):
+                      x=xp[q:q+csize]
+                      prows+=db.execute(sql+' AND point_uid IN ('+','.join(['?']*len(x))+')', par+x).fetchall()
+               else:
+                  prows=db.execute(sql, par).fetchall()
 
-        # Load and lock entry
-        ii={'action':'load',
-            'repo_uoa':ruid,
-            'module_uoa':muid,
-            'data_uoa':duid,
-            'get_lock':'yes'}
+               dirList=[]
+               files={}
+               spoints=[]
+               for prow in prows:
+                   puid=prow[0]
+                   pp1='ckp-'+puid
+                   dft=json.loads(prow[1])
 
-        rx=ck.access(ii)
-        if rx['return']>0: return rx
+                   if len(ffeatures)>0 and not i.get('all_points',False) and len(dft)>0:
+                      if not match_features(fmatch, dft): continue
 
-        lock_uid=rx['lock_uid']
-        p=rx['path']
-        d=rx['dict']
+                   dirList.append(pp1+'.flat.json')
 
-        dp=d.get('points', '')
-        if dp=='': dp=0
-        dp=int(dp)
-        dp-=len(puids)
-        if dp<0: dp=0 # should not be, but just in case
+                   if lfeat:
+                      files[os.path.join(p, pp1+'.features_flat.json')]={'return':0, 'dict':dft}
 
-        d['points']=str(dp)
+                   # Scalar values are taken from catalog only if lists are not needed (as in load_summary)
+                   if skl!=None:
+                      lk=json.loads(prow[2])
 
-        # Remove files for each point
-        for k in puids:
-            px='ckp-'+k+'.'
+                      use=True
+                      for k in skl:
+                          if k in lk or k.endswith('#all') or k.endswith('#all_unique'):
+                             use=False
+                             break
 
-            dirList=os.listdir(p)
+                      if use:
+                         spoints.append(puid)
+                         files[os.path.join(p, pp1+'.summary.json')]={'return':0, 'dict':{}}
 
-            for fn in dirList:
-                if fn.startswith(px):
-                   os.remove(os.path.join(p,fn))
+               # Get scalar values of requested keys
+               if len(spoints)>0 and len(skl)>0:
+                  sql='SELECT point_uid, key, value FROM point_values WHERE data_uid=? AND key IN ('+','.join(['?']*len(skl))+')'
+                  for vrow in db.execute(sql, [duid]+skl).fetchall():
+                      px=os.path.join(p, 'ckp-'+vrow[0]+'.summary.json')
+                      if px in files:
+                         files[px]['dict'][vrow[1]]=json.loads(vrow[2])
 
-        # Update and unlock entry
-        ii['action']='update'
-        del(ii['get_lock'])
-        ii['unlock_uid']=lock_uid
-        ii['dict']=d
-        rx=ck.access(ii)
-        if rx['return']>0: return rx
+               lst.append({'repo_uoa':row[3], 'repo_uid':row[2],
+                           'module_uoa':row[5], 'module_uid':row[4],
+                           'data_uoa':dduoa, 'data_uid':duid,
+                           'path':p})
 
-    return {'return':0}
+               entries.append({'return':0, 'path':p, 'dict':dd, 'dir_list':dirList, 'files':files})
+        finally:
+           db.close()
+
+    return {'return':0, 'lst':lst, 'entries':entries}
 
 ##############################################################################
 # view entries as html
@@ -2930,6 +7112,10 @@ def html_viewer(i):
               rz=ck.load_json_file({'json_file':fpf1})
               if rz['return']==0:
                  drz=rz['dict']
+
+                 rz=load_samples(pp, pp1, drz)
+                 if rz['return']>0: return rz
+
                  kdrz=sorted(list(drz.keys()))
 
                  # Create vector
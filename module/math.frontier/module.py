@@ -33,6 +33,10 @@ def init(i):
 ##############################################################################
 # Filter frontier (leave only best points) - my own greedy and probably not very optimal algorithm
 #
+# Now selects faster algorithms (NumPy) depending on number of dimensions
+#  (sort and sweep for 2 dimensions, Sort-Filter-Skyline for more)
+#  while producing exactly the same points as the original greedy algorithm.
+#
 # TBD: should leave only a few points otherwise can be quickly too many 
 #  particularly if more than 2 dimensions (performance, energy, size, faults)
 #
@@ -54,6 +58,24 @@ def filter(i):
 
               (margins)        - list of margins when comparing values, i.e. Vold/Vnew < this number (such as 1.10 instead of 1).
                                  will be used if !=None  
+
+              (algorithm)      - if '' (default), select automatically (sweep for 2 dimensions, sfs for more,
+                                  vector if values are not all positive or margins are close to 1, greedy if NumPy is not installed)
+                                 if 'greedy', use original greedy algorithm
+
+              (epsilon)        - if set, use approximate epsilon-box mode: points are bucketed into logarithmic grid cells
+                                 (cell size is 1+epsilon times per dimension, such as 0.01 for 1%; can be a list per dimension)
+                                 and at most one point per non-dominated cell is kept (margins are ignored).
+                                 All values should be positive numbers.
+
+              (epsilon_check)  - max number of comparisons (points x kept points) to measure distance
+                                 from exact frontier (10^8 by default, 0 to skip)
+
+              (workers)        - if >1, split points into shards and find their frontiers in parallel processes,
+                                 then merge local frontiers with final exact pass
+                                 (only for sweep and sfs algorithms, where any frontier point is also on frontier of its shard);
+                                 if 0, use number of CPU cores
+              (min_shard_size) - min number of points per shard (10000 by default)
             }
 
     Output: {
@@ -63,12 +85,26 @@ def filter(i):
 
               points         - filtered points!
               deleted_points - deleted points
+
+              algorithm      - used algorithm
+
+              (epsilon_bound)    - guaranteed max factor per dimension between any point and its closest kept point (epsilon mode)
+              (epsilon_distance) - measured max factor (additive epsilon indicator in log space), or None if skipped (epsilon mode)
+
+              timings        - time per phase in seconds (prepare, filter (shards and merge if sharded), update and total)
+              (shards)       - number of shards
+              (shard_points) - number of points on local frontiers of shards (before merging)
             }
 
     """
 
+    import time
+
     oo=i.get('out','')
 
+    t0=time.time()
+    tm={}
+
     points=i['points']
     lp=len(points)
 
@@ -81,70 +117,756 @@ def filter(i):
 
     fk=i.get('frontier_keys',[])
     fkr=i.get('reverse_keys',[])
-    lrk=len(fkr)
-
     mar=i.get('margins',[])
-    lmar=len(mar)
+
+    alg=i.get('algorithm','')
+
+    eps=i.get('epsilon',None)
+    if eps=='' or eps==[]: eps=None
+
+    rr={'return':0}
 
     if lp>1:
-       for l0 in range(0,lp,1):
-           ul0=uids[l0]
-           if ul0!='':
-              p0=points[ul0]
- 
-              # Check if there is at least one point with all better dimensions
+       if eps!=None:
+          alg='epsilon'
 
-              keep=True
+       enp=''
+       try:
+          import numpy
+       except ImportError as e:
+          enp=format(e)
 
-              for l1 in range(0,lp,1):
-                  ul1=uids[l1]
-                  if ul1!='' and ul1!=ul0:
-                     p1=points[ul1]
+       if alg=='':
+          alg='greedy'
+          if enp=='': alg='auto'
 
-                     better=True
+       keep=None
+       if alg=='epsilon':
+          if enp!='':
+             return {'return':1, 'error':'NumPy is needed for epsilon mode ('+enp+')'}
 
-                     if len(fk)>0:
-                        ks=fk
-                     else:
-                        ks=list(p0.keys())
+          r=prepare_frontier({'points':points, 'uids':uids, 'frontier_keys':fk, 'reverse_keys':fkr, 'margins':[]})
+          if r['return']>0: return r
 
-                     for dim in range(0, len(ks)):
-                         d0=ks[dim]
+          if r['algorithm'] not in ['sweep','sfs']:
+             return {'return':1, 'error':'epsilon mode requires positive numerical values of all frontier keys in all points'}
 
-                         v0=p0[d0]
-                         if v0!=None and v0!='':
-                            v0=float(v0)
+          r['epsilon']=eps
+          r['epsilon_check']=i.get('epsilon_check',100000000)
 
-                            v1=p1.get(d0,None)
-                            if v1!=None and v1!='':
-                               v1=float(v1)
+          r=frontier_epsilon(r)
+          if r['return']>0: return r
 
-                               if v1==0: v1=v0/10
-                               if v1==0: v1=0.01
+          keep=r['keep']
 
-                               m=1.0
-                               if dim<lmar and mar[dim]!=None: 
-                                  m=mar[dim]
+          rr['epsilon_bound']=r['epsilon_bound']
+          rr['epsilon_distance']=r['epsilon_distance']
 
-                               if dim<lrk and fkr[dim]==True:
-                                  if v1==0 or (v0/v1)>m:
-                                     better=False
-                                     break
-                               elif v0==0 or (v0/v1)<m:
-                                  better=False
-                                  break
+       elif alg!='greedy':
+          r=prepare_frontier({'points':points, 'uids':uids, 'frontier_keys':fk, 'reverse_keys':fkr, 'margins':mar})
+          if r['return']>0: return r
+
+          tm['prepare']=time.time()-t0
+
+          nw=i.get('workers','')
+          if nw=='' or nw==None: nw=1
+          nw=int(nw)
+          if nw==0:
+             import multiprocessing
+             nw=multiprocessing.cpu_count()
+
+          mss=int(i.get('min_shard_size',10000))
+          if mss<1: mss=1
+          if nw>lp//mss: nw=lp//mss
 
-                     if better:
-                        keep=False
-                        break
+          alg=r['algorithm']
+          if nw>1 and (alg=='sweep' or alg=='sfs'):
+             r['workers']=nw
 
-              if not keep:
-                 dpoints[ul0]=points[ul0]
-                 del(points[ul0])
-                 uids[l0]=''
+             rx=frontier_shards(r)
+             if rx['return']>0: return rx
+
+             keep=rx['keep']
+
+             rr['shards']=nw
+             rr['shard_points']=rx['shard_points']
+
+             tm['shards']=rx['time_shards']
+             tm['merge']=rx['time_merge']
+          elif alg=='sweep':
+             keep=frontier_sweep(r)
+          elif alg=='sfs':
+             keep=frontier_sfs(r)
+          elif alg=='vector':
+             keep=frontier_vector(r)
+
+       if keep==None:
+          alg='greedy'
+          keep=frontier_greedy(points, uids, fk, fkr, mar)
+
+       t1=time.time()
+       if 'prepare' not in tm: tm['prepare']=0.0
+       tm['filter']=t1-t0-tm['prepare']
+
+       for l0 in range(0,lp,1):
+           if not keep[l0]:
+              ul0=uids[l0]
+              dpoints[ul0]=points[ul0]
+              del(points[ul0])
+
+       tm['update']=time.time()-t1
 
     lp=len(points)
     if oo=='con':
        ck.out('Number of points after filtering: '+str(lp))
 
-    return {'return':0, 'points':points, 'deleted_points':dpoints}
+    tm['total']=time.time()-t0
+
+    rr['points']=points
+    rr['deleted_points']=dpoints
+    rr['algorithm']=alg
+    rr['timings']=tm
+
+    return rr
+
+##############################################################################
+# Insert points to frontier incrementally (for example, after each autotuning iteration)
+#
+# Frontier is kept as a JSON-serializable dict (can be saved with experiment entry).
+# New points are compared only with current frontier points, i.e. O(n) per inserted point.
+# For positive values and neutral margins (or margins not close to 1), the result is the same
+# as filtering all inserted points at once.
+
+def insert(i):
+    """
+    Input:  {
+              points          - dict with new points (in order of insertion), each has dict with optimization dimensions
+
+              (frontier)      - current frontier (output of previous "insert"); if empty, start new one
+                                with the following keys (ignored if frontier is not empty):
+
+              (frontier_keys) - list of keys to leave only best points (see "filter")
+              (reverse_keys)  - list of values associated with above keys. If True, reverse sorting for a give key
+              (margins)       - list of margins when comparing values (see "filter")
+            }
+
+    Output: {
+              return           - return code =  0, if successful
+                                             >  0, if error
+              (error)          - error text if return > 0
+
+              frontier         - updated frontier {frontier_keys, reverse_keys, margins, points}
+
+              added_points     - list of UIDs of new points added to frontier
+              dominated_points - previous frontier points dominated by new points (removed from frontier)
+              rejected_points  - new points dominated by frontier points (not added)
+            }
+
+    """
+
+    fr=i.get('frontier',None)
+    if fr==None or len(fr)==0:
+       fr={'frontier_keys':i.get('frontier_keys',[]),
+           'reverse_keys':i.get('reverse_keys',[]),
+           'margins':i.get('margins',[]),
+           'points':{}}
+
+    fk=fr.get('frontier_keys',[])
+    fkr=fr.get('reverse_keys',[])
+    mar=fr.get('margins',[])
+
+    fpoints=fr.get('points',{})
+    fr['points']=fpoints
+
+    added=[]
+    dpoints={}
+    rpoints={}
+
+    points=i['points']
+
+    for u in points:
+        p0=points[u]
+
+        # Updated point replaces the old one
+        if u in fpoints:
+           del(fpoints[u])
+
+        # Remove frontier points dominated by a new one (including identical ones - last one survives as in "filter")
+        for u1 in list(fpoints.keys()):
+            if better_point(fpoints[u1], p0, fk, fkr, mar):
+               dpoints[u1]=fpoints[u1]
+               del(fpoints[u1])
+
+        keep=True
+        for u1 in fpoints:
+            if better_point(p0, fpoints[u1], fk, fkr, mar):
+               keep=False
+               break
+
+        if keep:
+           fpoints[u]=p0
+           added.append(u)
+        else:
+           rpoints[u]=p0
+
+    # Points added and dominated during the same call were not in frontier before, i.e. they are rejected
+    for u in added:
+        if u in dpoints:
+           rpoints[u]=dpoints[u]
+           del(dpoints[u])
+    added=[u for u in added if u in fpoints]
+
+    return {'return':0, 'frontier':fr, 'added_points':added, 'dominated_points':dpoints, 'rejected_points':rpoints}
+
+##############################################################################
+# internal function to check if point p1 has all dimensions better than p0 (same check as in "filter")
+
+def better_point(p0, p1, fk, fkr, mar):
+
+    lrk=len(fkr)
+    lmar=len(mar)
+
+    if len(fk)>0:
+       ks=fk
+    else:
+       ks=list(p0.keys())
+
+    for dim in range(0, len(ks)):
+        d0=ks[dim]
+
+        v0=p0.get(d0,None)
+        if v0!=None and v0!='':
+           v0=float(v0)
+
+           v1=p1.get(d0,None)
+           if v1!=None and v1!='':
+              v1=float(v1)
+
+              if v1==0: v1=v0/10
+              if v1==0: v1=0.01
+
+              m=1.0
+              if dim<lmar and mar[dim]!=None: 
+                 m=mar[dim]
+
+              if dim<lrk and fkr[dim]==True:
+                 if v1==0 or (v0/v1)>m:
+                    return False
+              elif v0==0 or (v0/v1)<m:
+                 return False
+
+    return True
+
+##############################################################################
+# internal function to filter frontier with original greedy algorithm (reference implementation)
+#
+# Points are visited in order and a point is removed if at least one other not yet removed point
+# has all dimensions better (within margins). Returns list of flags (True if point is kept).
+
+def frontier_greedy(points, uids, fk, fkr, mar):
+
+    lp=len(uids)
+    lrk=len(fkr)
+    lmar=len(mar)
+
+    uids=list(uids)
+    keep=[True]*lp
+
+    for l0 in range(0,lp,1):
+        ul0=uids[l0]
+        if ul0!='':
+           p0=points[ul0]
+
+           # Check if there is at least one point with all better dimensions
+
+           better=False
+
+           for l1 in range(0,lp,1):
+               ul1=uids[l1]
+               if ul1!='' and ul1!=ul0:
+                  p1=points[ul1]
+
+                  better=True
+
+                  if len(fk)>0:
+                     ks=fk
+                  else:
+                     ks=list(p0.keys())
+
+                  for dim in range(0, len(ks)):
+                      d0=ks[dim]
+
+                      v0=p0[d0]
+                      if v0!=None and v0!='':
+                         v0=float(v0)
+
+                         v1=p1.get(d0,None)
+                         if v1!=None and v1!='':
+                            v1=float(v1)
+
+                            if v1==0: v1=v0/10
+                            if v1==0: v1=0.01
+
+                            m=1.0
+                            if dim<lmar and mar[dim]!=None: 
+                               m=mar[dim]
+
+                            if dim<lrk and fkr[dim]==True:
+                               if v1==0 or (v0/v1)>m:
+                                  better=False
+                                  break
+                            elif v0==0 or (v0/v1)<m:
+                               better=False
+                               break
+
+                  if better:
+                     break
+
+           if better:
+              keep[l0]=False
+              uids[l0]=''
+
+    return keep
+
+##############################################################################
+# internal function to convert points to NumPy matrix and select algorithm
+#
+# Fast algorithms are only selected when they provably give the same result as the greedy one:
+#  all values are positive numbers and margins are neutral (1) or at least 1e-9 away from 1
+#  (for minimized dimensions >1, for reversed ones <1), i.e. the dominance relation is transitive.
+#  Otherwise, the greedy algorithm is vectorized (same semantics, but O(n^2) comparisons in NumPy).
+#  Falls back to the original greedy algorithm (algorithm=None) when points have different keys
+#  (no frontier keys), empty UIDs or non-numerical values.
+
+def prepare_frontier(i):
+
+    import operator
+    import numpy as np
+
+    points=i['points']
+    uids=i['uids']
+    fk=i['frontier_keys']
+    fkr=i['reverse_keys']
+    mar=i['margins']
+
+    ret={'return':0, 'algorithm':None}
+
+    ks=fk
+    if len(ks)==0:
+       ks=list(points[uids[0]].keys())
+
+    lp=len(uids)
+    lk=len(ks)
+
+    m=np.ones(lk)
+    rev=np.zeros(lk, dtype=bool)
+    for dim in range(0, lk):
+        if dim<len(mar) and mar[dim]!=None:
+           m[dim]=mar[dim]
+        if dim<len(fkr) and fkr[dim]==True:
+           rev[dim]=True
+
+    if lk>1:
+       get=operator.itemgetter(*ks)
+    elif lk==1:
+       get=lambda p: (p[ks[0]],)
+    else:
+       get=lambda p: ()
+
+    rows=[]
+    for l0 in range(0, lp):
+        ul0=uids[l0]
+        if ul0=='': return ret
+
+        p0=points[ul0]
+        if len(fk)==0 and list(p0.keys())!=ks: return ret
+
+        try:
+           rows.append(get(p0))
+        except KeyError:
+           return ret
+
+    # NumPy converts values as float() (None becomes NaN); otherwise convert one by one
+    try:
+       v=np.array(rows, dtype=float).reshape((lp,lk))
+    except (TypeError, ValueError, OverflowError):
+       v=np.empty((lp,lk))
+       for l0 in range(0, lp):
+           row=rows[l0]
+           for dim in range(0, lk):
+               v0=row[dim]
+               if v0!=None and v0!='':
+                  try:
+                     v[l0,dim]=float(v0)
+                  except (TypeError, ValueError, OverflowError):
+                     return ret
+               else:
+                  v[l0,dim]=np.nan
+
+    ret['values']=v
+    ret['margins']=m
+    ret['reverse']=rev
+
+    alg='vector'
+    if lk>0 and np.all(np.isfinite(v)) and np.all(v>0):
+       neutral=(m==1.0)
+       ordered=np.where(rev, m<=1.0-1e-9, m>=1.0+1e-9)
+       if np.all(neutral | ordered):
+          ret['neutral']=bool(np.all(neutral))
+          if ret['neutral'] and lk==2:
+             alg='sweep'
+          else:
+             alg='sfs'
+
+    ret['algorithm']=alg
+
+    return ret
+
+##############################################################################
+# internal function to merge identical points (only the last one survives greedy filtering
+#  when margins are neutral since identical points dominate each other)
+
+def unique_last(v):
+
+    import numpy as np
+
+    lp=v.shape[0]
+
+    # Reverse order so that np.unique returns the last occurrence of each point
+    x,idx=np.unique(v[::-1], axis=0, return_index=True)
+
+    return np.sort(lp-1-idx)
+
+##############################################################################
+# internal function to find 2-D frontier via sort and sweep (O(n log n))
+
+def frontier_sweep(i):
+
+    import numpy as np
+
+    v=i['values']
+    rev=i['reverse']
+
+    x=np.where(rev, -v, v)
+
+    idx=unique_last(x)
+    x=x[idx]
+
+    # Sort by first dimension, then by second one; point is not dominated
+    # only if its second dimension is better than in all previous points
+    o=np.lexsort((x[:,1], x[:,0]))
+    x1=x[o,1]
+
+    best=np.minimum.accumulate(x1)
+    front=np.empty(len(o), dtype=bool)
+    front[0]=True
+    front[1:]=x1[1:]<best[:-1]
+
+    keep=np.zeros(v.shape[0], dtype=bool)
+    keep[idx[o[front]]]=True
+
+    return keep.tolist()
+
+##############################################################################
+# internal function to find frontier via Sort-Filter-Skyline (SFS) algorithm
+#
+# Points are sorted by a monotone score (sum of dimensions) so that dominating points are always
+# processed before dominated ones. Each point is then compared (in NumPy) only with the window
+# of already found frontier points.
+
+def frontier_sfs(i):
+
+    import numpy as np
+
+    v=i['values']
+    m=i['margins']
+    rev=i['reverse']
+
+    lp,lk=v.shape
+
+    # q<=m for reversed dimensions is the same as -q>=-m (negation is exact)
+    sg=np.where(rev, -1.0, 1.0)
+    ms=m*sg
+
+    if i.get('neutral',False):
+       idx=unique_last(v)
+    else:
+       idx=np.arange(lp)
+
+    x=np.where(rev, -v, v)[idx]
+
+    keys=[x[:,dim] for dim in range(lk-1,-1,-1)]
+    keys.append(np.sum(x, axis=1))
+    o=idx[np.lexsort(keys)]
+
+    w=np.empty((len(o),lk))
+    lw=0
+
+    keep=np.zeros(lp, dtype=bool)
+
+    # Process sorted points in blocks: first compare the whole block with the window at once,
+    # then compare remaining points one by one with frontier points found in this block
+    bs=i.get('block_size',256)
+
+    for b in range(0, len(o), bs):
+        blk=o[b:b+bs]
+
+        if lw>0:
+           q=v[blk][:,None,:]/w[None,:lw,:]
+           better=(q*sg>=ms)
+           blk=blk[~np.any(np.all(better, axis=2), axis=1)]
+
+        lw0=lw
+        for l0 in blk:
+            v0=v[l0]
+
+            if lw>lw0:
+               q=v0/w[lw0:lw]
+               better=(q*sg>=ms)
+               if np.any(np.all(better, axis=1)):
+                  continue
+
+            w[lw]=v0
+            lw+=1
+
+            keep[l0]=True
+
+    return keep.tolist()
+
+##############################################################################
+# internal function to find frontier of shards in parallel processes and merge them with final exact pass
+#
+# Only used when dominance is transitive (sweep and sfs), i.e. any global frontier point
+# is also on frontier of its shard (identical points keep the last one in both passes).
+
+def frontier_shards(i):
+
+    import time
+    import numpy as np
+
+    v=i['values']
+    nw=i['workers']
+
+    lp=v.shape[0]
+
+    t0=time.time()
+
+    # Contiguous shards keep original order of points (needed for identical points)
+    bounds=[(lp*k)//nw for k in range(0, nw+1)]
+
+    jobs=[]
+    for k in range(0, nw):
+        jobs.append({'algorithm':i['algorithm'],
+                     'values':v[bounds[k]:bounds[k+1]],
+                     'margins':i['margins'],
+                     'reverse':i['reverse'],
+                     'neutral':i.get('neutral',False)})
+
+    # Forked workers reuse already loaded module (fall back to threads if fork is not available)
+    import multiprocessing
+    pool=None
+    try:
+       ctx=multiprocessing.get_context('fork')
+       pool=ctx.Pool(nw)
+    except (AttributeError, ValueError):
+       pool=None
+
+    if pool==None:
+       from multiprocessing.pool import ThreadPool
+       pool=ThreadPool(nw)
+
+    try:
+       res=pool.map(frontier_shard, jobs)
+    finally:
+       pool.close()
+       pool.join()
+
+    idx=[]
+    for k in range(0, nw):
+        idx.append(bounds[k]+np.flatnonzero(res[k]))
+    idx=np.concatenate(idx)
+
+    t1=time.time()
+
+    # Final exact pass over local frontiers
+    job=dict(jobs[0])
+    job['values']=v[idx]
+
+    keep=np.zeros(lp, dtype=bool)
+    keep[idx[np.array(frontier_shard(job), dtype=bool)]]=True
+
+    return {'return':0, 'keep':keep.tolist(), 'shard_points':len(idx),
+                        'time_shards':t1-t0, 'time_merge':time.time()-t1}
+
+##############################################################################
+# internal function to find frontier of one shard (worker of frontier_shards)
+
+def frontier_shard(i):
+
+    if i['algorithm']=='sweep':
+       return frontier_sweep(i)
+
+    return frontier_sfs(i)
+
+##############################################################################
+# internal function to vectorize original greedy algorithm (same order dependent semantics)
+
+def frontier_vector(i):
+
+    import numpy as np
+
+    v=i['values']
+    m=i['margins']
+    rev=i['reverse']
+
+    lp,lk=v.shape
+
+    keep=np.ones(lp, dtype=bool)
+
+    with np.errstate(all='ignore'):
+       for l0 in range(0, lp):
+           v0=v[l0]
+
+           better=keep.copy()
+           better[l0]=False
+
+           for dim in range(0, lk):
+               x0=v0[dim]
+               if x0!=x0: continue # undefined value
+
+               v1=v[:,dim]
+
+               x1=np.where(v1==0, x0/10, v1)
+               x1=np.where(x1==0, 0.01, x1)
+
+               if rev[dim]:
+                  worse=(x0/x1)>m[dim]
+               elif x0==0:
+                  worse=(v1==v1)
+               else:
+                  worse=(x0/x1)<m[dim]
+
+               # Skip undefined values
+               worse&=(v1==v1)
+
+               better&=~worse
+
+               if not better.any(): break
+
+           if better.any():
+              keep[l0]=False
+
+    return keep.tolist()
+
+##############################################################################
+# internal function to find approximate frontier via epsilon-box dominance
+#
+# Points are bucketed into logarithmic grid cells (log(v)/log(1+epsilon)) and only one point
+# (closest to the lower corner of a cell) is kept per cell not dominated by other cells.
+# Any point is then within 1+epsilon factor (per dimension) from some kept point.
+# Number of kept points is bounded by the number of cells on the frontier of the grid
+# rather than by the number of points.
+
+def frontier_epsilon(i):
+
+    import numpy as np
+
+    v=i['values']
+    rev=i['reverse']
+
+    lp,lk=v.shape
+
+    eps=i['epsilon']
+    if type(eps)!=list: eps=[eps]*lk
+
+    w=np.empty(lk)
+    for dim in range(0, lk):
+        e=eps[dim] if dim<len(eps) else eps[-1]
+        e=float(e)
+        if e<=0:
+           return {'return':1, 'error':'epsilon should be positive'}
+        w[dim]=np.log1p(e)
+
+    x=np.log(v)
+    x=np.where(rev, -x, x)
+
+    cells=np.floor(x/w).astype(np.int64)
+
+    # Select one representative per cell (closest to lower corner, first one if equal):
+    # sort by cells and then by distance (sort is stable) and take first point of each cell
+    dist=np.sum(x/w-cells, axis=1)
+
+    keys=[dist]+[cells[:,dim] for dim in range(lk-1,-1,-1)]
+    o=np.lexsort(keys)
+
+    cs=cells[o]
+    first=np.ones(lp, dtype=bool)
+    first[1:]=np.any(cs[1:]!=cs[:-1], axis=1)
+
+    ucells=cs[first]
+    reps=o[first]
+
+    # Keep representatives of non-dominated cells (cells are unique)
+    front=frontier_cells(ucells)
+    kept=np.sort(reps[front])
+
+    keep=np.zeros(lp, dtype=bool)
+    keep[kept]=True
+
+    # Measure distance from all points (and thus from exact frontier) to kept points
+    dst=None
+    lkept=len(kept)
+    ec=i.get('epsilon_check',100000000)
+    if lp*lkept<=ec:
+       xk=x[kept]
+       bs=max(1, 1000000//max(1, lkept*lk))
+
+       d=0.0
+       for b in range(0, lp, bs):
+           xb=x[b:b+bs]
+           dd=np.max(xk[None,:,:]-xb[:,None,:], axis=2)
+           d=max(d, float(np.max(np.min(dd, axis=1))))
+
+       dst=float(np.exp(d))
+
+    return {'return':0, 'keep':keep.tolist(), 'epsilon_bound':np.exp(w).tolist(), 'epsilon_distance':dst}
+
+##############################################################################
+# internal function to find non-dominated unique integer cells via Sort-Filter-Skyline (mask in input order)
+
+def frontier_cells(c):
+
+    import numpy as np
+
+    lc,lk=c.shape
+
+    keys=[c[:,dim] for dim in range(lk-1,-1,-1)]
+    keys.append(np.sum(c, axis=1))
+    o=np.lexsort(keys)
+
+    w=np.empty((lc,lk), dtype=c.dtype)
+    lw=0
+
+    front=np.zeros(lc, dtype=bool)
+
+    bs=256
+    for b in range(0, lc, bs):
+        blk=o[b:b+bs]
+
+        if lw>0:
+           dom=np.all(w[None,:lw,:]<=c[blk][:,None,:], axis=2)
+           blk=blk[~np.any(dom, axis=1)]
+
+        lw0=lw
+        for l0 in blk:
+            c0=c[l0]
+
+            if lw>lw0 and np.any(np.all(w[lw0:lw]<=c0, axis=1)):
+               continue
+
+            w[lw]=c0
+            lw+=1
+
+            front[l0]=True
+
+    return front
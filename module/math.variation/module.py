@@ -13,6 +13,8 @@ ck=None # Will be updated by CK (initialized CK kernel)
 
 # Local settings
 
+kde_cache=None # LRU cache of already calculated densities and expected values (content hash -> output of analyze)
+
 ##############################################################################
 # Initialize module
 
@@ -47,6 +49,18 @@ def analyze(i):
 
               (skip_fail)           - if 'yes', do not fail, if SciPy and NumPy
                                       are not available
+
+              (kde_mode)            - 'exact' (default) - evaluate Gaussian KDE on all samples (O(samples*bins)),
+                                      'binned'          - linearly bin samples to a regular grid
+                                                          and convolve them with the kernel directly,
+                                      'fft'             - linearly bin samples to a regular grid
+                                                          and convolve them with the kernel via FFT
+              (grid_size)           - number of grid points for binned/fft modes (kde_grid_size from module meta by default,
+                                      increased automatically if the grid step is larger than half of the kernel bandwidth)
+
+              (use_cache)           - if 'no', do not reuse results for the same characteristics table
+                                      (cached by content hash of the table, bins, min, max, cov_factor, kde_mode and grid_size)
+              (cache_size)          - max number of cached results (kde_cache_size from module meta by default)
             }
 
     Output: {
@@ -65,6 +79,14 @@ def analyze(i):
 
               xlist2s    - list of sorted x values with peaks (max y -> hence 1st expected value)
               ylist2s    - list of sorted y density values with peaks
+
+              kde_mode             - used KDE mode
+
+              density_error_bound  - max absolute error of ylist with respect to 'exact' mode (0.0 for 'exact')
+              peak_error_bound     - max distance between the 1st expected value (xlist2s[0])
+                                     and the one calculated in 'exact' mode (0.0 for 'exact')
+
+              cached     - 'yes' if result was reused from cache
             }
 
     """
@@ -74,7 +96,6 @@ def analyze(i):
     has_deps=True
     try:
        from scipy.stats import gaussian_kde
-       from scipy.signal import argrelextrema
        import numpy as np
     except Exception as e: 
        has_deps=False
@@ -82,6 +103,25 @@ def analyze(i):
           return {'return':1, 'error':'Seems that some scientific python modules are not installed ('+format(e)+')'}
 
     ctable1=i['characteristics_table']
+
+    kde_mode=i.get('kde_mode','')
+    if kde_mode=='': kde_mode='exact'
+    if kde_mode not in ['exact','binned','fft']:
+       return {'return':1, 'error':'unknown KDE mode "'+kde_mode+'" (should be exact, binned or fft)'}
+
+    grid_size=i.get('grid_size','')
+    if grid_size=='': grid_size=cfg.get('kde_grid_size',2048)
+    grid_size=int(grid_size)
+
+    # Check if already calculated for the same table
+    ckey=''
+    if has_deps and i.get('use_cache','')!='no':
+       ckey=kde_cache_key(i, ctable1, kde_mode, grid_size)
+
+       rr=kde_cache_get(ckey)
+       if rr!=None:
+          return rr
+
     ctable=copy.deepcopy(ctable1) # since slightly changing it ...
 
     dmin=i.get('min',-1)
@@ -96,6 +136,8 @@ def analyze(i):
     xlist2s=[]
     ylist2s=[]
 
+    eps=0.0
+    perr=0.0
 
     dmin=i.get('min',-1.0)
     dmax=i.get('max',-1.0)
@@ -120,29 +162,23 @@ def analyze(i):
              ctable.append(0.0)
 
              try:
-                density = gaussian_kde(ctable)
-                xlist = np.linspace(dmin,dmax,bins)
+                if kde_mode=='exact':
+                   density = gaussian_kde(ctable)
+                   xlist = np.linspace(dmin,dmax,bins)
 
-                if cf!=-1 and cf!='':
-                   density.covariance_factor = lambda:cf
-                   density._compute_covariance()
+                   if cf!=-1 and cf!='':
+                      density.covariance_factor = lambda:cf
+                      density._compute_covariance()
 
-                ylist=density(xlist)
+                   ylist=density(xlist)
+                else:
+                   r=binned_kde({'samples':ctable, 'min':dmin, 'max':dmax, 'bins':bins,
+                                 'cov_factor':cf, 'kde_mode':kde_mode, 'grid_size':grid_size})
+                   xlist=r['xlist']
+                   ylist=r['ylist']
+                   eps=r['error_bound']
 
-                ylist5=[0.0]
-                for q in ylist:
-                    ylist5.append(q)
-                ylist5.append(0.0)
-
-                ylist6=np.array(ylist5)
-
-                xlistx=argrelextrema(ylist6, np.greater)[0] # np.less for local minima
-
-                xlistxx=[]
-                for q in xlistx:
-                    xlistxx.append(q-1)
-
-                xlistx=xlistxx
+                xlistx=density_maxima(ylist)
 
              except Exception as e:
                 x=format(e)
@@ -155,21 +191,403 @@ def analyze(i):
              ylist=[100.0]
              xlistx=[0]
 
-          # Convert from numpy to float
-          for q in range(0, len(xlist)):
-              xlist[q]=float(xlist[q])
-              ylist[q]=float(ylist[q])
+          r=density_peaks(xlist, ylist, xlistx, eps)
+          xlist=r['xlist']
+          ylist=r['ylist']
+          xlist2=r['xlist2']
+          ylist2=r['ylist2']
+          xlist2s=r['xlist2s']
+          ylist2s=r['ylist2s']
+          perr=r['peak_error_bound']
+
+    rr={'return':0, 'xlist':xlist, 'ylist':ylist,
+                    'xlist2':xlist2, 'ylist2':ylist2,
+                    'xlist2s':xlist2s, 'ylist2s':ylist2s,
+                    'kde_mode':kde_mode,
+                    'density_error_bound':eps,
+                    'peak_error_bound':perr}
+
+    # Cache result (least recently used results are removed first)
+    kde_cache_put(i, ckey, rr)
+
+    rr['cached']='no'
+
+    return rr
+
+##############################################################################
+# internal function to find indexes of local maxima of density
+
+def density_maxima(ylist):
+
+    import numpy as np
+    from scipy.signal import argrelextrema
+
+    ylist5=[0.0]
+    for q in ylist:
+        ylist5.append(q)
+    ylist5.append(0.0)
+
+    ylist6=np.array(ylist5)
+
+    xlistx=argrelextrema(ylist6, np.greater)[0] # np.less for local minima
+
+    xlistxx=[]
+    for q in xlistx:
+        xlistxx.append(q-1)
+
+    return xlistxx
+
+##############################################################################
+# internal function to convert density to floats and sort its peaks (expected values)
+
+def density_peaks(xlist, ylist, xlistx, eps):
+
+    xlist2=[]
+    ylist2=[]
+
+    xlist2s=[]
+    ylist2s=[]
 
-          if len(xlistx)>0:
-             for q in xlistx:
-                 xlist2.append(float(xlist[q]))
-                 ylist2.append(float(ylist[q]))
+    perr=0.0
 
-             ylist2s, xlist2s = (list(t) for t in zip(*sorted(zip(ylist2, xlist2),reverse=True)))
+    # Convert from numpy to float
+    for q in range(0, len(xlist)):
+        xlist[q]=float(xlist[q])
+        ylist[q]=float(ylist[q])
 
-    return {'return':0, 'xlist':xlist, 'ylist':ylist, 
+    if len(xlistx)>0:
+       for q in xlistx:
+           xlist2.append(float(xlist[q]))
+           ylist2.append(float(ylist[q]))
+
+       ylist2s, xlist2s = (list(t) for t in zip(*sorted(zip(ylist2, xlist2),reverse=True)))
+
+       # Exact 1st expected value can be any x where approximate density
+       # is not lower than the approximate max density minus 2*error
+       if eps>0:
+          for q in range(0, len(xlist)):
+              if ylist[q]>=ylist2s[0]-2*eps:
+                 dx=abs(xlist[q]-xlist2s[0])
+                 if dx>perr: perr=dx
+
+    return {'return':0, 'xlist':xlist, 'ylist':ylist,
                         'xlist2':xlist2, 'ylist2':ylist2,
-                        'xlist2s':xlist2s, 'ylist2s':ylist2s}
+                        'xlist2s':xlist2s, 'ylist2s':ylist2s,
+                        'peak_error_bound':perr}
+
+##############################################################################
+# internal function to get key of cached result (content hash of table and parameters of analyze)
+
+def kde_cache_key(i, ctable, kde_mode, grid_size):
+
+    import hashlib
+    import numpy as np
+
+    try:
+       h=hashlib.sha1(np.asarray(ctable, dtype=np.float64).tobytes())
+    except (TypeError, ValueError):
+       return ''
+
+    h.update(repr((i.get('bins',''), i.get('min',-1), i.get('max',-1), i.get('cov_factor',''), kde_mode, grid_size)).encode())
+
+    return h.hexdigest()
+
+##############################################################################
+# internal function to get cached result (or None)
+
+def kde_cache_get(ckey):
+
+    import copy
+
+    if ckey=='' or kde_cache==None or ckey not in kde_cache:
+       return None
+
+    # Move to the end as recently used (pop and insert to support Python 2)
+    rr=kde_cache.pop(ckey)
+    kde_cache[ckey]=rr
+
+    rr=copy.deepcopy(rr)
+    rr['cached']='yes'
+
+    return rr
+
+##############################################################################
+# internal function to cache result (least recently used results are removed first)
+
+def kde_cache_put(i, ckey, rr):
+
+    import copy
+    import collections
+
+    global kde_cache
+
+    if ckey=='': return
+
+    cs=i.get('cache_size','')
+    if cs=='': cs=cfg.get('kde_cache_size',1024)
+    cs=int(cs)
+
+    if cs>0:
+       if kde_cache==None: kde_cache=collections.OrderedDict()
+
+       kde_cache[ckey]=copy.deepcopy(rr)
+       while len(kde_cache)>cs:
+          kde_cache.popitem(last=False)
+
+    return
+
+##############################################################################
+# internal function to calculate Gaussian KDE via linear binning of samples to a regular grid
+# and convolution with the kernel (directly or via FFT)
+#
+# Since kernel is linearly interpolated between grid points for each sample
+# (and density between grid points for each x), absolute error is bounded by
+# 2 * step^2/8 * max|K''| = step^2 / (4*sqrt(2*pi)*h^3) plus kernel truncation
+
+def binned_kde(i):
+
+    import math
+    import numpy as np
+
+    x=np.asarray(i['samples'], dtype=np.float64)
+    n=len(x)
+
+    dmin=float(i['min'])
+    dmax=float(i['max'])
+    bins=int(i['bins'])
+    cf=float(i['cov_factor'])
+    mode=i['kde_mode']
+    gs=int(i['grid_size'])
+
+    # The same bandwidth as in scipy.stats.gaussian_kde (Scott's factor if cov_factor is -1)
+    if cf==-1: cf=n**(-0.2)
+    h=cf*math.sqrt(np.var(x, ddof=1))
+    if h==0 or math.isnan(h):
+       raise Exception('singular matrix')
+
+    tail=6*h # kernel is truncated after 6 bandwidths
+
+    gmin=min(float(x.min()), dmin)-tail
+    gmax=max(float(x.max()), dmax)+tail
+
+    # Grid step should not be larger than half of the bandwidth
+    gs=max(gs, int(math.ceil((gmax-gmin)/(0.5*h)))+1)
+    gs=min(gs, 1<<22)
+
+    delta=(gmax-gmin)/(gs-1)
+
+    # Linear binning
+    t=(x-gmin)/delta
+    j=np.floor(t).astype(np.int64)
+    j=np.clip(j, 0, gs-2)
+    w=t-j
+
+    c=np.bincount(j, weights=1.0-w, minlength=gs)+np.bincount(j+1, weights=w, minlength=gs)
+
+    # Kernel on grid
+    l=int(math.ceil(tail/delta))
+    l=min(l, gs-1)
+    kx=np.arange(-l, l+1)*delta
+    kern=np.exp(-0.5*(kx/h)**2)/(math.sqrt(2*math.pi)*h*n)
+
+    if mode=='fft':
+       m=len(c)+len(kern)-1
+       nf=1
+       while nf<m: nf*=2
+       y=np.fft.irfft(np.fft.rfft(c, nf)*np.fft.rfft(kern, nf), nf)[l:l+gs]
+       y=np.maximum(y, 0.0)
+    else:
+       y=np.convolve(c, kern)[l:l+gs]
+
+    xlist=np.linspace(dmin,dmax,bins)
+    ylist=np.interp(xlist, gmin+np.arange(gs)*delta, y)
+
+    eps=delta*delta/(4*math.sqrt(2*math.pi)*h**3)
+    eps+=math.exp(-0.5*(l*delta/h)**2)/(math.sqrt(2*math.pi)*h)
+    if mode=='fft':
+       eps+=1e-12*float(y.max())
+
+    return {'return':0, 'xlist':xlist, 'ylist':ylist, 'error_bound':eps}
+
+##############################################################################
+# analyze variation of multiple characteristics tables at once
+
+def analyze_batch(i):
+    """
+    Input:  {
+              characteristics_tables - dict of characteristics tables (lists) for multiple keys
+
+              (bins)                 - number of bins (int, default = 100)
+              (cov_factor)           - float covariance factor (0.5 by default)
+
+              (kde_mode)             - 'exact' (default), 'binned' or 'fft' (see "analyze");
+                                       in 'exact' mode, densities of all tables are evaluated at once
+                                       (vectorized over tables), otherwise tables are analyzed one by one
+              (grid_size)            - number of grid points for binned/fft modes
+
+              (skip_fail)            - if 'yes', do not fail, if SciPy and NumPy
+                                       are not available
+
+              (use_cache)            - if 'no', do not reuse results for the same characteristics table
+              (cache_size)           - max number of cached results
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              results      - dict with output of "analyze" for each key of characteristics_tables
+              cache_hits   - number of results reused from cache
+            }
+
+    """
+
+    ct=i['characteristics_tables']
+
+    kde_mode=i.get('kde_mode','')
+    if kde_mode=='': kde_mode='exact'
+
+    grid_size=i.get('grid_size','')
+    if grid_size=='': grid_size=cfg.get('kde_grid_size',2048)
+    grid_size=int(grid_size)
+
+    bins=i.get('bins','')
+    if bins=='': bins=100
+    bins=int(bins)
+
+    import math
+
+    has_deps=True
+    try:
+       import numpy as np
+    except Exception:
+       has_deps=False
+
+    res={}
+    hits=0
+
+    batch=[] # tables with densities evaluated at once
+
+    for k in ct:
+        ctable=ct[k]
+
+        ii={'characteristics_table':ctable,
+            'bins':i.get('bins',''),
+            'cov_factor':i.get('cov_factor',''),
+            'kde_mode':i.get('kde_mode',''),
+            'grid_size':i.get('grid_size',''),
+            'skip_fail':i.get('skip_fail',''),
+            'use_cache':i.get('use_cache',''),
+            'cache_size':i.get('cache_size','')}
+
+        # Exact densities of tables with non-zero variance are evaluated together
+        # (the rest, including singular cases, is processed by "analyze")
+        if has_deps and kde_mode=='exact' and len(ctable)>1:
+           ckey=''
+           if i.get('use_cache','')!='no':
+              ckey=kde_cache_key(ii, ctable, kde_mode, grid_size)
+
+              rr=kde_cache_get(ckey)
+              if rr!=None:
+                 hits+=1
+                 del(rr['return'])
+                 res[k]=rr
+                 continue
+
+           try:
+              x=np.asarray([0.0]+list(ctable)+[0.0], dtype=np.float64)
+           except (TypeError, ValueError):
+              x=None
+
+           if x is not None and np.all(np.isfinite(x)):
+              cf=ii['cov_factor']
+              if cf=='': cf=0.5
+              cf=float(cf)
+              if cf==-1: cf=len(x)**(-0.2) # Scott's factor as in scipy.stats.gaussian_kde
+
+              h=cf*math.sqrt(np.var(x, ddof=1))
+              if h>0 and not math.isinf(h):
+                 batch.append({'key':k, 'cache_key':ckey, 'input':ii, 'samples':x, 'bandwidth':h,
+                               'min':min(ctable), 'max':max(ctable)})
+                 continue
+
+        r=analyze(ii)
+        if r['return']>0: return r
+
+        if r.get('cached','')=='yes': hits+=1
+
+        del(r['return'])
+        res[k]=r
+
+    if len(batch)>0:
+       r=exact_kde_batch({'tables':batch, 'bins':bins})
+       if r['return']>0: return r
+
+       for q in range(0, len(batch)):
+           b=batch[q]
+
+           xlist=r['xlists'][q]
+           ylist=r['ylists'][q]
+
+           rr=density_peaks(xlist, ylist, density_maxima(ylist), 0.0)
+
+           rr['kde_mode']=kde_mode
+           rr['density_error_bound']=0.0
+
+           kde_cache_put(b['input'], b['cache_key'], rr)
+
+           del(rr['return'])
+           rr['cached']='no'
+
+           res[b['key']]=rr
+
+    results={}
+    for k in ct:
+        results[k]=res[k]
+
+    return {'return':0, 'results':results, 'cache_hits':hits}
+
+##############################################################################
+# internal function to evaluate Gaussian KDE of multiple tables at once
+#
+# Kernels of all samples of all tables are evaluated on grids of their tables
+# in chunks of rows of one NumPy array and summed per table
+# (the same density as scipy.stats.gaussian_kde with given bandwidth)
+
+def exact_kde_batch(i):
+
+    import math
+    import numpy as np
+
+    tables=i['tables']
+    bins=i['bins']
+
+    nt=len(tables)
+
+    xs=np.array([np.linspace(t['min'], t['max'], bins) for t in tables])
+    hs=np.array([t['bandwidth'] for t in tables])
+    ns=np.array([len(t['samples']) for t in tables])
+
+    s=np.concatenate([t['samples'] for t in tables])
+    seg=np.repeat(np.arange(nt), ns)
+
+    y=np.zeros((nt, bins))
+
+    step=max(1, (1<<20)//bins)
+    for a in range(0, len(s), step):
+        sg=seg[a:a+step]
+
+        z=(xs[sg]-s[a:a+step, None])/hs[sg, None]
+        e=np.exp(-0.5*z*z)
+
+        # Sum kernels per table (tables are contiguous in a chunk)
+        st=np.flatnonzero(np.r_[True, sg[1:]!=sg[:-1]])
+        y[sg[st]]+=np.add.reduceat(e, st, axis=0)
+
+    y/=(math.sqrt(2*math.pi)*hs*ns)[:, None]
+
+    return {'return':0, 'xlists':[xs[q] for q in range(nt)], 'ylists':[y[q] for q in range(nt)]}
 
 ##############################################################################
 # analyze speedup (prepared by Anton Lokhmotov)
@@ -154,6 +154,15 @@ def build(i):
                 (characteristics_flat_keys_index)       - add all flat keys starting from this index 
                                                           (for example, ##features#)
 
+                (stream)                                - if 'yes', take features and characteristics of points in one pass
+                                                          via "experiment iter_points" instead of building experiment tables
+                                                          (points of all selected entries; *_flat_keys_index and other options
+                                                          of "experiment get" are not supported);
+                                                          only with csv_file, points are written to CSV one by one
+                                                          without keeping them in memory; otherwise feature and
+                                                          characteristics tables are still built in memory (model modules
+                                                          need whole tables), i.e. only one pass over points is saved
+
               Model:
                 model_module_uoa                        - model module
                 model_name                              - model name
@@ -210,6 +219,52 @@ def build(i):
 
     ftable=i.get('ftable',[])
     fkeys=i.get('fkeys',[])
+
+    ctable=i.get('ctable',[])
+    ckeys=i.get('ckeys',[])
+
+    # Stream points of experiments (if requested)
+    if i.get('stream','')=='yes' and len(ftable)==0 and len(ctable)==0:
+       cfkl=i.get('characteristics_flat_keys_list',[])
+
+       if len(ffkl)==0 or len(cfkl)==0:
+          return {'return':1, 'error':'features_flat_keys_list and characteristics_flat_keys_list should be specified for stream mode'}
+
+       iis=copy.deepcopy(i)
+       iis['action']='iter_points'
+       iis['module_uoa']=cfg['module_deps']['experiment']
+       iis['flat_keys_list']=ffkl+cfkl
+       r=ck.access(iis)
+       if r['return']>0: return r
+
+       pts=filter_points(r['points'], ffkl+cfkl, rpwn)
+
+       if cf!='':
+          r=ck.access({'action':'convert_table_to_csv',
+                       'module_uoa':cfg['module_deps']['experiment'],
+                       'points':pts,
+                       'keys':ffkl+cfkl,
+                       'file_name':cf,
+                       'csv_no_header':'no',
+                       'csv_separator':';',
+                       'csv_decimal_mark':'.'})
+          if r['return']>0: return r
+
+          return {'return':0}
+
+       # Model modules need whole tables (only values of requested keys are kept)
+       for q in pts:
+           if q['return']>0: return q
+
+           ftable.append([q['flat'][k] for k in ffkl])
+           ctable.append([q['flat'][k] for k in cfkl])
+
+       if len(ftable)==0:
+          return {'return':1, 'error':'no points found'}
+
+       fkeys=ffkl
+       ckeys=cfkl
+
     if len(ftable)==0:
        iif=copy.deepcopy(i)
        iif['action']='get'
@@ -225,8 +280,6 @@ def build(i):
           return {'return':1, 'error':'no points found'}
 
     # Get table through experiment module for characteristics
-    ctable=i.get('ctable',[])
-    ckeys=i.get('ckeys',[])
     if len(ctable)==0:
        iic=copy.deepcopy(i)
        iic['action']='get'
@@ -362,6 +415,22 @@ def build(i):
 
     return r
 
+##############################################################################
+# internal generator to skip points with None values of given keys (if requested)
+
+def filter_points(pts, keys, rpwn):
+
+    for q in pts:
+        if q['return']==0 and rpwn=='yes':
+           skip=False
+           for k in keys:
+               if q['flat'].get(k, None)==None:
+                  skip=True
+                  break
+           if skip: continue
+
+        yield q
+
 ##############################################################################
 # validate model (universal)
 